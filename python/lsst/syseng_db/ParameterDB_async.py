@@ -0,0 +1,201 @@
+"""
+Non-blocking versions of the query functions, for servers built around an
+event loop (e.g. the Tornado server in web_interface/).  Each function
+submits the corresponding query to a bounded pool of worker threads and
+immediately returns a concurrent.futures.Future which resolves to the
+query's result (or raises its exception).  Inside a Tornado coroutine,
+
+    results = yield keyword_query_async(db_name, 'v_0_0', ['velocity'])
+
+waits for the query without blocking the event loop, and yielding a list
+of futures runs the queries in parallel.  (Under Python 3, asyncio code can
+await asyncio.wrap_future() of the same futures.)
+
+The worker threads run the usual query functions, so each query checks out
+its own connection from the connection pool in ParameterDB_query and uses
+the result cache when it is enabled.  By default there are as many workers
+as the pool allows connections to one database, so workers never wait for
+a connection.
+
+This module needs concurrent.futures (the 'futures' package under
+Python 2); without it, the functions raise a RuntimeError.
+"""
+
+import threading
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+from ParameterDB_query import _global_connection_pool
+from ParameterDB_query import get_table_names, get_parameter_names
+from ParameterDB_query import get_xml_files, keyword_query, name_query
+from ParameterDB_query import range_query, token_query
+from ParameterDB_diff import diff_versions
+from ParameterDB_versions import keyword_query_versions, name_query_versions
+from ParameterDB_search import search_query
+from ParameterDB_keys import key_numbers_query
+from ParameterDB_saved import saved_query
+
+__all__ = ["set_query_workers", "shutdown_query_executor",
+           "get_table_names_async", "get_parameter_names_async",
+           "get_xml_files_async", "keyword_query_async", "name_query_async",
+           "range_query_async", "token_query_async", "diff_versions_async",
+           "keyword_query_versions_async", "name_query_versions_async",
+           "search_query_async", "key_numbers_query_async",
+           "saved_query_async"]
+
+
+_executor_lock = threading.Lock()
+_executor = None
+_max_workers = None
+
+
+def set_query_workers(max_workers):
+    """
+    Set the number of worker threads running queries submitted by the
+    functions in this module (by default, the maximum number of connections
+    the connection pool opens to one database).  Takes effect the next time
+    the executor is started, i.e. after shutdown_query_executor().
+    """
+    global _max_workers
+    _max_workers = max_workers
+
+
+def _query_executor():
+    """
+    Return the executor running the queries, starting it if necessary
+    """
+    global _executor
+    if ThreadPoolExecutor is None:
+        raise RuntimeError("The asynchronous query functions need "
+                           "concurrent.futures; install the 'futures' "
+                           "package")
+    with _executor_lock:
+        if _executor is None:
+            max_workers = _max_workers
+            if max_workers is None:
+                max_workers = _global_connection_pool.max_connections
+            _executor = ThreadPoolExecutor(max_workers=max_workers)
+        return _executor
+
+
+def shutdown_query_executor(wait=True):
+    """
+    Stop the worker threads once the queries already submitted are done
+    (waiting for them if wait is True).  A new executor is started if more
+    queries are submitted.
+    """
+    global _executor
+    with _executor_lock:
+        executor = _executor
+        _executor = None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def get_table_names_async(db_name):
+    """
+    Run get_table_names(db_name) on the query executor; returns a Future
+    """
+    return _query_executor().submit(get_table_names, db_name)
+
+
+def get_parameter_names_async(db_name, table_name):
+    """
+    Run get_parameter_names on the query executor; returns a Future
+    """
+    return _query_executor().submit(get_parameter_names, db_name, table_name)
+
+
+def get_xml_files_async(db_name, table_name):
+    """
+    Run get_xml_files on the query executor; returns a Future
+    """
+    return _query_executor().submit(get_xml_files, db_name, table_name)
+
+
+def keyword_query_async(db_name, table_name, keyword_list, xml_list=None,
+                        mode='substring'):
+    """
+    Run keyword_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(keyword_query, db_name, table_name,
+                                    keyword_list, xml_list=xml_list, mode=mode)
+
+
+def name_query_async(db_name, table_name, param_name_list):
+    """
+    Run name_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(name_query, db_name, table_name,
+                                    param_name_list)
+
+
+def range_query_async(db_name, table_name, field, lo, hi, xml_list=None):
+    """
+    Run range_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(range_query, db_name, table_name, field,
+                                    lo, hi, xml_list=xml_list)
+
+
+def token_query_async(db_name, table_name, keyword_list, xml_list=None,
+                      fuzzy=True, limit=100):
+    """
+    Run token_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(token_query, db_name, table_name,
+                                    keyword_list, xml_list=xml_list,
+                                    fuzzy=fuzzy, limit=limit)
+
+
+def diff_versions_async(db_name, old_table, new_table, xml_list=None):
+    """
+    Run diff_versions on the query executor; returns a Future
+    """
+    return _query_executor().submit(diff_versions, db_name, old_table,
+                                    new_table, xml_list=xml_list)
+
+
+def keyword_query_versions_async(db_name, table_list, keyword_list,
+                                 xml_list=None):
+    """
+    Run keyword_query_versions on the query executor; returns a Future
+    """
+    return _query_executor().submit(keyword_query_versions, db_name,
+                                    table_list, keyword_list,
+                                    xml_list=xml_list)
+
+
+def name_query_versions_async(db_name, table_list, param_name_list):
+    """
+    Run name_query_versions on the query executor; returns a Future
+    """
+    return _query_executor().submit(name_query_versions, db_name, table_list,
+                                    param_name_list)
+
+
+def search_query_async(db_name, table_name, query_string, xml_list=None):
+    """
+    Run search_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(search_query, db_name, table_name,
+                                    query_string, xml_list=xml_list)
+
+
+def key_numbers_query_async(db_name, table_name, key_list):
+    """
+    Run key_numbers_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(key_numbers_query, db_name, table_name,
+                                    key_list)
+
+
+def saved_query_async(db_name, table_name, name, definition=None):
+    """
+    Run saved_query on the query executor; returns a Future
+    """
+    return _query_executor().submit(saved_query, db_name, table_name, name,
+                                    definition=definition)
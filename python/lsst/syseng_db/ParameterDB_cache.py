@@ -0,0 +1,261 @@
+"""
+An optional cache of the results of the query functions in ParameterDB_query
+(and diff_versions), for servers such as the web interface which run the
+same queries over and over against a database that rarely changes.
+
+The cache is disabled until enable_result_cache() is called.  Results are
+keyed on the query function, the absolute path of the database, and the
+arguments of the query (table name, keywords, xml_list and so on) as bound
+to the function's parameters, so that calls passing the same values
+positionally, by keyword or through the defaults share a result.  Every
+result remembers the state of the database file when it was computed (see
+_database_state), and which database the queries against the file were
+actually sent to (e.g. the in-memory snapshot served by serve_from_memory);
+if either has changed since, e.g. because a new version was loaded, a
+shadow build replaced the file or a new snapshot was loaded, the result is
+discarded rather than returned.
+
+Separately, cached_statement memoizes the functions which build the SQL
+text of the queries, so that every query of the same shape (same table,
+number of keywords, number of .xml files and so on) runs the very same
+string and SQLite's statement cache can reuse the compiled statement.
+"""
+
+import os
+import time
+import inspect
+import threading
+import functools
+from collections import OrderedDict
+
+__all__ = ["enable_result_cache", "disable_result_cache",
+           "result_cache_stats"]
+
+
+def _database_state(db_name):
+    """
+    Return a tuple which changes whenever the database db_name is written
+    to or replaced: the device, inode, size and modification time of the
+    file, and the size and modification time of its WAL file (where
+    commits land first in WAL mode).
+
+    PRAGMA data_version is not used because its value is only meaningful
+    for a single connection, while queries are spread over the connections
+    of a pool.
+    """
+    state = []
+    for file_name in (db_name, db_name+"-wal"):
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            state.append(None)
+            continue
+        state.append((stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime))
+    return tuple(state)
+
+
+def _freeze(value):
+    """
+    Convert value (an argument of a query function) into something that
+    can be used in a dict key: lists become tuples
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple([_freeze(vv) for vv in value])
+    if isinstance(value, dict):
+        return tuple(sorted([(kk, _freeze(vv)) for kk, vv in value.items()]))
+    return value
+
+
+def _call_key(function, db_name, args, kwargs):
+    """
+    Return the key of the cached result of function(db_name, *args,
+    **kwargs): the name of function and the value of each of its
+    parameters (defaults included), with db_name made absolute
+    """
+    call_args = inspect.getcallargs(function, db_name, *args, **kwargs)
+    call_args[inspect.getargspec(function).args[0]] = os.path.abspath(db_name)
+    return (function.__name__, _freeze(call_args))
+
+
+def _copy_result(value):
+    """
+    Return a copy of a cached result which the caller may modify (lists
+    and dicts are copied; the Parameters in them are shared)
+    """
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict([(kk, _copy_result(vv)) for kk, vv in value.items()])
+    return value
+
+
+class result_cache(object):
+    """
+    A thread-safe least-recently-used cache of query results.  At most
+    max_entries results are kept; results older than ttl seconds are
+    discarded (ttl=None keeps results until they are evicted or the
+    database changes).
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = False
+        # a function returning the name of the database the queries made
+        # against a file go to (see connection_pool.resolve in
+        # ParameterDB_query); None if they always go to the file itself
+        self.resolver = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits':0, 'misses':0, 'evictions':0, 'invalidations':0}
+
+    def state(self, db_name):
+        """
+        Return the state of the database db_name which a cached result must
+        have been computed in to be returned: the database its queries are
+        sent to (the absolute path of db_name unless they are redirected),
+        and _database_state(db_name)
+        """
+        resolved = db_name
+        if self.resolver is not None:
+            resolved = self.resolver(db_name)
+        if resolved == db_name:
+            resolved = os.path.abspath(db_name)
+        return (resolved, _database_state(db_name))
+
+    def get(self, key, state):
+        """
+        Return a tuple (True, result) if a result for key computed while the
+        database was in state is cached, (False, None) otherwise
+        """
+        with self._lock:
+            if key in self._entries:
+                old_state, created, value = self._entries.pop(key)
+                expired = self.ttl is not None and time.time()-created > self.ttl
+                if old_state == state and not expired:
+                    self._entries[key] = (old_state, created, value)
+                    self._stats['hits'] += 1
+                    return True, value
+                self._stats['invalidations'] += 1
+            self._stats['misses'] += 1
+            return False, None
+
+    def put(self, key, state, value):
+        """
+        Store the result value for key, computed while the database was in
+        state, evicting the least recently used results if necessary
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (state, time.time(), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """
+        Discard all cached results and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def stats(self):
+        """
+        Return a dict of the counters 'hits', 'misses', 'evictions' (results
+        dropped to respect max_entries) and 'invalidations' (results found
+        to be stale), along with the current number of results ('size')
+        """
+        with self._lock:
+            output = dict(self._stats)
+            output['size'] = len(self._entries)
+        return output
+
+_global_result_cache = result_cache()
+
+
+def cached_query(function):
+    """
+    Decorator routing calls to the query function function, whose first
+    argument is the name of the database file, through the global result
+    cache when it is enabled
+    """
+
+    @functools.wraps(function)
+    def wrapper(db_name, *args, **kwargs):
+        cache = _global_result_cache
+        if not cache.enabled:
+            return function(db_name, *args, **kwargs)
+
+        key = _call_key(function, db_name, args, kwargs)
+        state = cache.state(db_name)
+        found, value = cache.get(key, state)
+        if not found:
+            value = function(db_name, *args, **kwargs)
+            cache.put(key, state, value)
+        return _copy_result(value)
+
+    return wrapper
+
+
+# the largest number of statements kept by each function decorated with
+# cached_statement; the cache is emptied when it fills up
+statement_cache_size = 512
+
+
+def cached_statement(function):
+    """
+    Decorator caching the SQL text returned by function, which must depend
+    only on its (hashable) positional arguments describing the shape of a
+    query.  The undecorated function is available as the attribute
+    uncached (e.g. for benchmarks).
+    """
+    statements = {}
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        try:
+            return statements[args]
+        except KeyError:
+            pass
+        statement = function(*args)
+        if len(statements) >= statement_cache_size:
+            statements.clear()
+        return statements.setdefault(args, statement)
+
+    wrapper.uncached = function
+    return wrapper
+
+
+def enable_result_cache(max_entries=1024, ttl=300.0):
+    """
+    Start caching the results of the query functions.  At most max_entries
+    results are kept (least recently used results are evicted first), and
+    no result is reused more than ttl seconds after it was computed
+    (ttl=None for no limit).  Results are never reused once the database
+    they came from has changed.
+    """
+    _global_result_cache.max_entries = max_entries
+    _global_result_cache.ttl = ttl
+    _global_result_cache.enabled = True
+
+
+def disable_result_cache():
+    """
+    Stop caching query results, discarding those already cached and
+    resetting the counters reported by result_cache_stats
+    """
+    _global_result_cache.enabled = False
+    _global_result_cache.clear()
+
+
+def result_cache_stats():
+    """
+    Return a dict containing the number of cache 'hits' and 'misses' since
+    the cache was enabled, the number of results 'evictions' (dropped to
+    make room) and 'invalidations' (found to be stale because the database
+    changed or the result expired), and the number of results currently
+    cached ('size')
+    """
+    return _global_result_cache.stats()
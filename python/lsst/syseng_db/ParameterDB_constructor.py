@@ -1,42 +1,255 @@
 import sqlite3
 import os
+import time
+import json
+import hashlib
+import multiprocessing
+from contextlib import contextmanager
 
 from ParameterTree import ParameterTree
+from ParameterList import ParameterList
+from ParameterDB_tokens import name_tokens, _trigrams
+from ParameterDB_schema import manifest_table, sources_table, units_table
+from ParameterDB_schema import records_table, membership_table
+from ParameterDB_schema import fts_table, fts_content_view
+from ParameterDB_schema import token_table, trigram_table
+from ParameterDB_schema import value_columns, numeric_column
+from ParameterDB_schema import catalog_table
+from ParameterDB_saved import _create_saved_tables
+from ParameterDB_saved import _materialize_saved_queries, _forget_saved_queries
 
-__all__ = ["db_from_param_list", "db_from_xml_file", "syseng_db_config"]
+__all__ = ["db_from_param_list", "db_from_xml_file", "syseng_db_config",
+           "parameters_from_xml_files", "db_from_xml_files",
+           "file_content_hash"]
 
 syseng_db_config = {
                     "db_dir":os.path.join(os.getenv("SYSENG_DB_DIR"), "db"),
                     "db_name":"LSST_parameter_sqlite.db"
                     }
 
-def db_from_param_list(param_list, table_name):
+def _db_file_name():
     """
-    Read in a list of Parameter objects and write them into an SQLite database
-    table.  The database file name will be specified by the global dict
-    syseng_db_config.  Specifically, the file name will be
+    Return the full path to the database specified by syseng_db_config
+    """
+    return os.path.join(syseng_db_config["db_dir"],
+                        syseng_db_config["db_name"])
 
-    os.path.join(syseng_db_config['db_dir'], syseng_db_config['db_name'])
 
-    The name of the table to be constructed is specified by the second
-    argument to this function.
+def _create_storage(cursor):
     """
+    Create (if they do not already exist) the tables shared by all model
+    versions: the lookup tables, records_table and membership_table (see
+    ParameterDB_schema).
+    """
+    cursor.execute("""CREATE TABLE IF NOT EXISTS %s (id INTEGER PRIMARY KEY, """
+                   % sources_table + """source text UNIQUE)""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS %s (id INTEGER PRIMARY KEY, """
+                   % units_table + """units text UNIQUE)""")
 
-    file_name = os.path.join(syseng_db_config["db_dir"],
-                             syseng_db_config["db_name"])
+    cmd = """CREATE TABLE IF NOT EXISTS %s (id INTEGER PRIMARY KEY, """ \
+        % records_table \
+        + """content_hash text UNIQUE, name text, defaultValue text, """ \
+        + """upperValue text, lowerValue text, units_id integer, """ \
+        + """docstring text, source_id integer, """ \
+        + ", ".join(["%s real" % numeric_column(column)
+                     for column in value_columns]) + ")"
 
-    conn = sqlite3.connect(file_name)
+    cursor.execute(cmd)
 
-    cc = conn.cursor()
+    cursor.execute("""CREATE TABLE IF NOT EXISTS %s (version text, """
+                   % membership_table + """record_id integer)""")
+
+
+def _create_table(cursor, table_name):
+    """
+    Create the model version table_name to hold Parameters: a view named
+    table_name selecting the members of the version from records_table
+    (see ParameterDB_schema).  Raises an exception if table_name already
+    exists.
+    """
+    _create_storage(cursor)
+
+    cmd = """CREATE VIEW %s AS SELECT r.name AS name, """ % table_name \
+        + """r.defaultValue AS defaultValue, r.upperValue AS upperValue, """ \
+        + """r.lowerValue AS lowerValue, u.units AS units, """ \
+        + """r.docstring AS docstring, s.source AS source """ \
+        + """FROM %s m JOIN %s r ON r.id = m.record_id """ \
+        % (membership_table, records_table) \
+        + """LEFT JOIN %s u ON u.id = r.units_id """ % units_table \
+        + """LEFT JOIN %s s ON s.id = r.source_id """ % sources_table \
+        + """WHERE m.version = '%s'""" % table_name.replace("'", "''")
+
+    cursor.execute(cmd)
+
+
+def _create_indexes(cursor):
+    """
+    Create (if they do not already exist) the indexes on the tables shared
+    by all model versions: the members of each version, and the name (both
+    exact and case-insensitive), source, numeric values, full-text index
+    (see _create_fulltext_index) and token index (see _create_token_index)
+    of each record.  These are first created
+    after the first version is loaded, which is much faster than updating
+    them row-by-row.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS %s_version ON %s "
+                   "(version, record_id)" % (membership_table, membership_table))
+    cursor.execute("CREATE INDEX IF NOT EXISTS %s_record ON %s (record_id)"
+                   % (membership_table, membership_table))
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS %s_name ON %s (name)"
+                   % (records_table, records_table))
+    cursor.execute("CREATE INDEX IF NOT EXISTS %s_name_nocase ON %s "
+                   "(name COLLATE NOCASE)" % (records_table, records_table))
+    cursor.execute("CREATE INDEX IF NOT EXISTS %s_source ON %s (source_id)"
+                   % (records_table, records_table))
+    for column in value_columns:
+        cursor.execute("CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)"
+                       % (records_table, numeric_column(column),
+                          records_table, numeric_column(column)))
+    _create_fulltext_index(cursor)
+    _create_token_index(cursor)
+
+    # without statistics the planner prefers scanning a whole version's
+    # membership over the much more selective indexes on records_table
+    cursor.execute("ANALYZE")
+
+
+def _create_fulltext_index(cursor):
+    """
+    Build the FTS5 index fts_table over the names and docstrings of the
+    records, along with the triggers that keep it in step with later
+    inserts and deletes.  Does nothing if the index already exists.
+
+    If the SQLite library was built without FTS5, no index is built and
+    keyword_query's 'fulltext' mode will not be available.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE name=?", (fts_table,))
+    if len(cursor.fetchall()) > 0:
+        return
 
-    cmd = """CREATE TABLE %s (name text, defaultValue text, """ % table_name \
-        + """upperValue text, lowerValue text, units text, docstring text, """ \
-        + """source text)"""
+    cursor.execute("CREATE VIEW IF NOT EXISTS %s AS SELECT id, name, "
+                   "NULLIF(docstring, 'NULL') AS docstring FROM %s"
+                   % (fts_content_view, records_table))
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE %s USING fts5(name, docstring, "
+                       "content='%s', content_rowid='id', prefix='2 3')"
+                       % (fts_table, fts_content_view))
+    except sqlite3.OperationalError:
+        cursor.execute("DROP VIEW %s" % fts_content_view)
+        return
 
-    cc.execute(cmd)
+    cursor.execute("INSERT INTO %s (%s) VALUES('rebuild')"
+                   % (fts_table, fts_table))
 
-    conn.commit()
+    cursor.execute("CREATE TRIGGER %s_insert AFTER INSERT ON %s BEGIN "
+                   "INSERT INTO %s (rowid, name, docstring) VALUES(new.id, "
+                   "new.name, NULLIF(new.docstring, 'NULL')); END"
+                   % (fts_table, records_table, fts_table))
+    cursor.execute("CREATE TRIGGER %s_delete AFTER DELETE ON %s BEGIN "
+                   "INSERT INTO %s (%s, rowid, name, docstring) "
+                   "VALUES('delete', old.id, old.name, "
+                   "NULLIF(old.docstring, 'NULL')); END"
+                   % (fts_table, records_table, fts_table, fts_table))
 
+
+def _has_table(cursor, table_name):
+    """
+    Return True if the table table_name exists in the database connected to
+    cursor
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE name=?",
+                   (table_name,))
+    return len(cursor.fetchall()) > 0
+
+
+def _index_tokens(cursor, record_list):
+    """
+    Add the tokens of the names of the records in record_list, a list of
+    (id, name) tuples, to token_table, and the trigrams of any new tokens to
+    trigram_table
+    """
+    token_rows = []
+    token_set = set()
+    for record_id, name in record_list:
+        tokens = set(name_tokens(name))
+        for token in tokens:
+            token_rows.append((token, record_id, len(tokens)))
+        token_set.update(tokens)
+
+    cursor.executemany("INSERT INTO %s (token, record_id, n_tokens) "
+                       "VALUES(?, ?, ?)" % token_table, token_rows)
+
+    # trigram_table is keyed on (trigram, token), so the trigrams of tokens
+    # seen before are ignored
+    cursor.executemany("INSERT OR IGNORE INTO %s (trigram, token) "
+                       "VALUES(?, ?)" % trigram_table,
+                       [(trigram, token) for token in token_set
+                        for trigram in _trigrams(token)])
+
+
+def _create_token_index(cursor):
+    """
+    Build the token index (token_table and trigram_table, see
+    ParameterDB_schema and ParameterDB_tokens) over the names of the
+    records.  Does nothing if the index already exists; from then on,
+    _RecordTable and _delete_orphan_records keep it up to date.
+    """
+    if _has_table(cursor, token_table):
+        return
+
+    cursor.execute("CREATE TABLE %s (token text, record_id integer, "
+                   "n_tokens integer)" % token_table)
+    cursor.execute("CREATE TABLE %s (trigram text, token text, "
+                   "PRIMARY KEY (trigram, token)) WITHOUT ROWID"
+                   % trigram_table)
+
+    cursor.execute("SELECT id, name FROM %s" % records_table)
+    _index_tokens(cursor, cursor.fetchall())
+
+    cursor.execute("CREATE INDEX %s_token ON %s (token, record_id)"
+                   % (token_table, token_table))
+    cursor.execute("CREATE INDEX %s_record ON %s (record_id)"
+                   % (token_table, token_table))
+
+
+class _LookupTable(object):
+    """
+    Maps the values stored in one of the lookup tables (sources_table or
+    units_table) to their integer keys, adding values to the table the
+    first time they are seen.
+    """
+
+    def __init__(self, cursor, table_name, column):
+        """
+        cursor -- a cursor dedicated to this lookup table
+        table_name -- the lookup table
+        column -- the name of the column holding the values
+        """
+        self._cursor = cursor
+        self._table_name = table_name
+        self._column = column
+        self._id_dict = {}
+        cursor.execute("SELECT id, %s FROM %s" % (column, table_name))
+        for key, value in cursor.fetchall():
+            self._id_dict[value] = key
+
+    def key(self, value):
+        """
+        Return the integer key of value
+        """
+        if value not in self._id_dict:
+            self._cursor.execute("INSERT INTO %s (%s) VALUES(?)"
+                                 % (self._table_name, self._column), (value,))
+            self._id_dict[value] = self._cursor.lastrowid
+        return self._id_dict[value]
+
+
+def _parameter_rows(param_list):
+    """
+    Generator converting the Parameters in param_list into tuples ready to
+    be inserted into a table created by _create_table
+    """
     for param in param_list:
         name = param.name
         if 'defaultValue' in param.values:
@@ -69,11 +282,425 @@ def db_from_param_list(param_list, table_name):
         else:
             source = 'NULL'
 
-        cc.execute("""INSERT INTO %s VALUES(?, ?, ?, ?, ?, ?, ?)""" % table_name,
-                   (name, default, upper, lower, units, doc, source))
+        yield (name, default, upper, lower, units, doc, source)
+
+
+def _to_real(value):
+    """
+    Return the text value converted to a float, or None if it is not a
+    number (including the 'NULL' placeholder for missing values)
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _record_hash(row):
+    """
+    Return the SHA-1 hex digest identifying a record, computed from the
+    tuple of text fields produced by _parameter_rows
+    """
+    hasher = hashlib.sha1()
+    for value in row:
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        hasher.update(value)
+        hasher.update(b'\x1f')
+    return hasher.hexdigest()
+
+
+class _RecordTable(object):
+    """
+    Maps the content hashes of the rows of records_table to their ids,
+    adding records the first time they are seen.  New records are assigned
+    ids here and written in batches with executemany(), so flush() must be
+    called once all of the records have been passed to key().  The names of
+    the new records are added to the token index if it exists.
+    """
+
+    record_columns = ("id", "content_hash", "name", "defaultValue",
+                      "upperValue", "lowerValue", "units_id", "docstring",
+                      "source_id") \
+                     + tuple([numeric_column(column) for column in value_columns])
+
+    def __init__(self, cursor, batch_size=10000):
+        """
+        cursor -- a cursor dedicated to records_table
+        batch_size -- the number of new records to accumulate before
+                      writing them
+        """
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._pending = []
+        self._id_dict = {}
+        cursor.execute("SELECT content_hash, id FROM %s" % records_table)
+        next_id = 1
+        for content_hash, key in cursor.fetchall():
+            self._id_dict[content_hash] = key
+            next_id = max(next_id, key+1)
+        self._next_id = next_id
+        self._index_tokens = _has_table(cursor, token_table)
+
+    def key(self, content_hash, record):
+        """
+        Return the id of the record identified by content_hash; record is
+        the tuple of the remaining values in record_columns, used if the
+        record does not exist yet
+        """
+        if content_hash not in self._id_dict:
+            self._id_dict[content_hash] = self._next_id
+            self._pending.append((self._next_id, content_hash) + record)
+            self._next_id += 1
+            if len(self._pending) >= self._batch_size:
+                self.flush()
+        return self._id_dict[content_hash]
+
+    def flush(self):
+        """
+        Write any records that have not been written yet
+        """
+        if len(self._pending) > 0:
+            self._cursor.executemany("INSERT INTO %s (%s) VALUES(%s)"
+                                     % (records_table,
+                                        ", ".join(self.record_columns),
+                                        ", ".join(["?"]*len(self.record_columns))),
+                                     self._pending)
+            if self._index_tokens:
+                _index_tokens(self._cursor,
+                              [(row[0], row[2]) for row in self._pending])
+            self._pending = []
+
+
+def _insert_parameters(cursor, param_list, table_name, bulk=False):
+    """
+    Add the Parameters in param_list to the model version table_name using
+    cursor, storing any Parameter not already in records_table.  Does not
+    commit.
+
+    If bulk is True, all of the rows are handed to a single executemany()
+    call rather than being inserted one execute() at a time.
+    """
+    conn = cursor.connection
+    units_ids = _LookupTable(conn.cursor(), units_table, 'units')
+    source_ids = _LookupTable(conn.cursor(), sources_table, 'source')
+    record_ids = _RecordTable(conn.cursor())
+
+    def membership_rows():
+        for row in _parameter_rows(param_list):
+            name, default, upper, lower, units, doc, source = row
+            record = (name, default, upper, lower, units_ids.key(units), doc,
+                      source_ids.key(source), _to_real(default),
+                      _to_real(upper), _to_real(lower))
+            yield (table_name, record_ids.key(_record_hash(row), record))
+
+    cmd = """INSERT INTO %s (version, record_id) VALUES(?, ?)""" \
+          % membership_table
+
+    if bulk:
+        cursor.executemany(cmd, membership_rows())
+    else:
+        for row in membership_rows():
+            cursor.execute(cmd, row)
+
+    record_ids.flush()
+
+
+def _delete_source(cursor, table_name, source):
+    """
+    Remove the Parameters read from the .xml file source from the model
+    version table_name.  The records themselves are left for
+    _delete_orphan_records.
+    """
+    cursor.execute("DELETE FROM %s WHERE version=? AND record_id IN "
+                   "(SELECT r.id FROM %s r JOIN %s s ON s.id = r.source_id "
+                   "WHERE s.source=?)"
+                   % (membership_table, records_table, sources_table),
+                   (table_name, source))
+
+
+def _delete_orphan_records(cursor):
+    """
+    Delete the records which no longer belong to any model version, along
+    with their tokens (and the trigrams of tokens no record has any more)
+    """
+    cursor.execute("DELETE FROM %s WHERE NOT EXISTS (SELECT 1 FROM %s m "
+                   "WHERE m.record_id = %s.id)"
+                   % (records_table, membership_table, records_table))
+
+    if _has_table(cursor, token_table):
+        cursor.execute("DELETE FROM %s WHERE NOT EXISTS (SELECT 1 FROM %s r "
+                       "WHERE r.id = %s.record_id)"
+                       % (token_table, records_table, token_table))
+        cursor.execute("DELETE FROM %s WHERE NOT EXISTS (SELECT 1 FROM %s t "
+                       "WHERE t.token = %s.token)"
+                       % (trigram_table, token_table, trigram_table))
+
+
+# pragmas used while bulk loading; see _bulk_load_pragmas
+bulk_load_pragmas = [("journal_mode", "MEMORY"),
+                     ("synchronous", "OFF"),
+                     ("cache_size", "-262144"),
+                     ("temp_store", "MEMORY")]
+
+
+def _update_catalog(cursor, table_name):
+    """
+    Write the row of catalog_table describing the model version table_name
+    (see ParameterDB_schema), replacing any row written before.  The content
+    hash is the SHA-1 hex digest of the sorted content hashes of the
+    version's records, so it only depends on the Parameters in the version.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS %s (version text PRIMARY KEY, "
+                   "n_parameters int, sources text, build_time real, "
+                   "content_hash text)" % catalog_table)
+
+    hasher = hashlib.sha1()
+    n_parameters = 0
+    cursor.execute("SELECT r.content_hash FROM %s m JOIN %s r "
+                   "ON r.id = m.record_id WHERE m.version = ? "
+                   "ORDER BY r.content_hash" % (membership_table, records_table),
+                   (table_name,))
+    for row in cursor.fetchall():
+        hasher.update(row[0].encode('utf-8') + b'\n')
+        n_parameters += 1
+
+    cursor.execute("SELECT source FROM %s WHERE id IN "
+                   "(SELECT r.source_id FROM %s m JOIN %s r "
+                   "ON r.id = m.record_id WHERE m.version = ?)"
+                   % (sources_table, membership_table, records_table),
+                   (table_name,))
+    sources = sorted([row[0] for row in cursor.fetchall()],
+                     key=lambda s: s.lower())
+
+    cursor.execute("INSERT OR REPLACE INTO %s VALUES(?, ?, ?, ?, ?)"
+                   % catalog_table,
+                   (table_name, n_parameters, json.dumps(sources), time.time(),
+                    hasher.hexdigest()))
+
+
+@contextmanager
+def _bulk_load_pragmas(conn, bulk=True):
+    """
+    Context manager switching the connection conn to the pragmas in
+    bulk_load_pragmas (no rollback journal on disk, no fsync, a 256 MB page
+    cache and in-memory temporary storage) for the duration of a build.
+    The previous settings are restored afterwards, even if the build fails.
+
+    A crash in the middle of a bulk load can leave the database file
+    corrupt, so this should only be used for builds that can be redone.
+
+    A database in WAL mode keeps its journal mode, since switching it out of
+    WAL mode would block its readers (or fail while they are connected).
+
+    If bulk is False, this does nothing.
+    """
+    if not bulk:
+        yield
+        return
+
+    cc = conn.cursor()
+    old_settings = []
+    for pragma, value in bulk_load_pragmas:
+        cc.execute("PRAGMA %s" % pragma)
+        old_value = cc.fetchone()[0]
+        if pragma == "journal_mode" and str(old_value).lower() == "wal":
+            continue
+        old_settings.append((pragma, old_value))
+        cc.execute("PRAGMA %s = %s" % (pragma, value))
+
+    try:
+        yield
+    finally:
+        # the journal mode cannot be changed inside a transaction; anything
+        # the build meant to keep has already been committed
+        conn.rollback()
+        for pragma, value in old_settings:
+            cc.execute("PRAGMA %s = %s" % (pragma, value))
+
 
-    conn.commit()
-    conn.close()
+def _check_bulk_wal(bulk, wal):
+    """
+    Raise a RuntimeError if a build asks for both bulk and wal
+    """
+    if bulk and wal:
+        raise RuntimeError("A bulk load cannot be combined with wal=True; "
+                           "its in-memory journal would take the database "
+                           "out of WAL mode while it runs")
+
+
+# suffix appended to the database file name to get the name of the file
+# written by a shadow build; see _build_file
+shadow_suffix = ".shadow"
+
+
+def _remove_database(file_name):
+    """
+    Delete the database file file_name along with any journal or WAL files
+    SQLite left next to it
+    """
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(file_name+suffix):
+            os.unlink(file_name+suffix)
+
+
+def _set_journal_mode(file_name, mode):
+    """
+    Switch the database file_name to the journal mode mode (e.g. 'WAL' or
+    'DELETE').  Raises a RuntimeError if SQLite refuses (e.g. because other
+    connections prevent leaving WAL mode).
+    """
+    conn = sqlite3.connect(file_name)
+    try:
+        cc = conn.cursor()
+        cc.execute("PRAGMA journal_mode = %s" % mode)
+        result = str(cc.fetchone()[0])
+    finally:
+        conn.close()
+    if result.lower() != mode.lower():
+        raise RuntimeError("Could not switch %s to journal mode %s "
+                           "(it is in mode %s)" % (file_name, mode, result))
+
+
+def _copy_database(file_name, copy_name):
+    """
+    Write a consistent copy of the database file_name to copy_name, which
+    must not exist.  Readers of file_name are not disturbed.
+    """
+    conn = sqlite3.connect(file_name)
+    try:
+        conn.execute("VACUUM INTO ?", (copy_name,))
+    finally:
+        conn.close()
+
+
+def _validate_database(file_name, table_name):
+    """
+    Check that the database file_name is intact and that its model version
+    table_name can be read, raising a RuntimeError if not
+    """
+    conn = sqlite3.connect(file_name)
+    try:
+        cc = conn.cursor()
+        cc.execute("PRAGMA integrity_check")
+        results = [str(row[0]) for row in cc.fetchall()]
+        if results != ['ok']:
+            raise RuntimeError("%s failed its integrity check: %s"
+                               % (file_name, "; ".join(results)))
+        if _table_type(cc, table_name) is None:
+            raise RuntimeError("%s does not contain the table %s"
+                               % (file_name, table_name))
+        cc.execute("SELECT count(*) FROM %s" % table_name)
+        cc.fetchall()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _build_file(table_name, shadow=False, wal=False):
+    """
+    Context manager yielding the name of the database file a build of the
+    model version table_name should write to.
+
+    If shadow is False, this is the database specified by syseng_db_config
+    itself.  If wal is also True, that database is first switched to WAL
+    mode, so that readers connected during the build keep seeing the
+    database as it was before the build started.
+
+    If shadow is True, a copy of the database (or nothing, if it does not
+    exist yet) is made in a file named with shadow_suffix, and that is the
+    file the build writes to.  If the build succeeds, the shadow file is
+    checked with _validate_database and renamed over the database in one
+    atomic step.  Readers connected to the old file keep reading it until
+    they reconnect; ParameterDB_query.connection_pool compares the inode of
+    the file (see _file_identity) before handing out an idle connection and
+    reopens connections to a replaced file.  If the build or the validation
+    fails, the shadow file is deleted and the database is left untouched.
+
+    A shadow build leaves the database in the default (rollback journal)
+    mode, and cannot replace a database that has a WAL file, since that
+    file would be applied to the new database.
+    """
+    db_file = _db_file_name()
+
+    if not shadow:
+        if wal:
+            _set_journal_mode(db_file, 'WAL')
+        yield db_file
+        return
+
+    if wal:
+        raise RuntimeError("A shadow build does not use WAL mode; "
+                           "readers are never blocked by it")
+
+    def check_no_wal():
+        if os.path.exists(db_file+"-wal"):
+            raise RuntimeError("%s has a WAL file; close its connections "
+                               "or switch it out of WAL mode before a shadow "
+                               "build" % db_file)
+
+    check_no_wal()
+    shadow_file = db_file + shadow_suffix
+    _remove_database(shadow_file)
+    try:
+        if os.path.exists(db_file):
+            _copy_database(db_file, shadow_file)
+        yield shadow_file
+        _validate_database(shadow_file, table_name)
+        _set_journal_mode(shadow_file, 'DELETE')
+        check_no_wal()
+        os.rename(shadow_file, db_file)
+    finally:
+        _remove_database(shadow_file)
+
+
+def db_from_param_list(param_list, table_name, bulk=False, shadow=False,
+                       wal=False):
+    """
+    Read in a list of Parameter objects and write them into an SQLite database
+    table.  The database file name will be specified by the global dict
+    syseng_db_config.  Specifically, the file name will be
+
+    os.path.join(syseng_db_config['db_dir'], syseng_db_config['db_name'])
+
+    The name of the table to be constructed is specified by the second
+    argument to this function.
+
+    param_list can be any iterable of Parameters (e.g. a generator).  If
+    bulk is True, the rows are inserted with a single executemany() in one
+    transaction under the pragmas in bulk_load_pragmas, which are reset to
+    their previous values once the table is built.
+
+    If shadow is True, the table is built in a copy of the database which
+    replaces it only once the build has succeeded.  If wal is True, the
+    database is switched to WAL mode before the table is built in place.
+    See _build_file for details.  bulk and wal cannot be combined: the
+    bulk-load pragmas would take the database out of WAL mode for the
+    duration of the build.
+    """
+    _check_bulk_wal(bulk, wal)
+
+    with _build_file(table_name, shadow=shadow, wal=wal) as file_name:
+        conn = sqlite3.connect(file_name)
+
+        try:
+            with _bulk_load_pragmas(conn, bulk=bulk):
+                cc = conn.cursor()
+
+                _create_table(cc, table_name)
+
+                conn.commit()
+
+                _insert_parameters(cc, param_list, table_name, bulk=bulk)
+
+                conn.commit()
+
+                _create_indexes(cc)
+                _update_catalog(cc, table_name)
+
+                conn.commit()
+        finally:
+            conn.close()
 
 
 def db_from_xml_file(file_name, table_name):
@@ -89,5 +716,236 @@ def db_from_xml_file(file_name, table_name):
         raise RuntimeError("You did not specify a .xml file.\n"
                            + "If you did, make sure it ends with '.xml'")
 
-    tree = ParameterTree(file_name)
-    db_from_param_list(tree.parameter_list, table_name)
+    db_from_xml_files([file_name], table_name)
+
+
+def file_content_hash(file_name):
+    """
+    Return the SHA-1 hex digest of the contents of the file file_name
+    """
+    hasher = hashlib.sha1()
+    with open(file_name, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _table_type(cursor, table_name):
+    """
+    Return 'view' if the model version table_name exists in the database
+    connected to cursor, 'table' if it exists in the layout written before
+    versions were stored as views, and None if it does not exist.
+    """
+    cursor.execute("SELECT type FROM sqlite_master WHERE name=?",
+                   (table_name,))
+    results = cursor.fetchall()
+    if len(results) == 0:
+        return None
+    return str(results[0][0])
+
+
+def db_from_xml_files(file_list, table_name, update=False, n_jobs=1,
+                      timing_handle=None, bulk=False, shadow=False, wal=False,
+                      saved_queries=None):
+    """
+    Load the .xml files specified by file_list into the table table_name of
+    the database specified by syseng_db_config, recording the hash of each
+    file's contents in the manifest table.
+
+    If update is False, table_name must not already exist (just as with
+    db_from_param_list).
+
+    If update is True and table_name already exists, only the .xml files
+    whose contents differ from those recorded in the manifest (or which are
+    new) are parsed.  The rows coming from those files, and from any files
+    in the manifest that are no longer in file_list, are replaced in a
+    single transaction.  If table_name does not exist yet, it is built from
+    scratch.  A table built before the manifest existed is treated as
+    having unknown hashes for all of its sources, so every file is
+    re-parsed once.
+
+    n_jobs and timing_handle are passed to parameters_from_xml_files.  bulk,
+    shadow and wal have the same meaning as in db_from_param_list (and bulk
+    and wal cannot be combined either).
+
+    If saved_queries (a dict as returned by read_saved_queries) is not
+    None, every saved query in it is evaluated against table_name and its
+    results stored in the same transaction as the rows of the build (see
+    ParameterDB_saved), so that readers never see saved results which do
+    not match the rows, and a failed materialization rolls the whole
+    build back.  Otherwise, any results saved for table_name before are
+    deleted, in that same transaction, if the
+    build changes it.
+
+    Returns a dict with keys 'added', 'changed', 'removed' and 'unchanged',
+    each mapping to a sorted list of .xml file names (without directories).
+    """
+
+    _check_bulk_wal(bulk, wal)
+
+    file_dict = {}
+    for file_name in file_list:
+        file_dict[os.path.basename(file_name)] = file_name
+
+    hash_dict = {}
+    for source in file_dict:
+        hash_dict[source] = file_content_hash(file_dict[source])
+
+    with _build_file(table_name, shadow=shadow, wal=wal) as file_name:
+        summary = _load_xml_files(file_name, file_dict, hash_dict, table_name,
+                                  update=update, n_jobs=n_jobs,
+                                  timing_handle=timing_handle, bulk=bulk,
+                                  saved_queries=saved_queries)
+
+    return summary
+
+
+def _load_xml_files(file_name, file_dict, hash_dict, table_name, update=False,
+                    n_jobs=1, timing_handle=None, bulk=False,
+                    saved_queries=None):
+    """
+    Do the work of db_from_xml_files in the database file file_name.
+    file_dict maps the names of the .xml files to load (without directories)
+    to their full paths and hash_dict maps them to the hashes of their
+    contents.  The other arguments are as in db_from_xml_files.
+    """
+    conn = sqlite3.connect(file_name)
+    try:
+        with _bulk_load_pragmas(conn, bulk=bulk):
+            cc = conn.cursor()
+            cc.execute("CREATE TABLE IF NOT EXISTS %s (version text, "
+                       "source text, content_hash text, "
+                       "PRIMARY KEY (version, source))" % manifest_table)
+            # created up front: a CREATE TABLE would commit the transaction
+            # the saved results are written in
+            _create_saved_tables(cc)
+            conn.commit()
+
+            old_hash_dict = {}
+            table_type = _table_type(cc, table_name)
+            if update and table_type == 'table':
+                raise RuntimeError("%s was built by an older version of "
+                                   "syseng_db and cannot be updated; "
+                                   "rebuild it instead" % table_name)
+            elif update and table_type is not None:
+                cc.execute("SELECT source, content_hash FROM %s WHERE version=?"
+                           % manifest_table, (table_name,))
+                for source, content_hash in cc.fetchall():
+                    old_hash_dict[source] = content_hash
+
+                if len(old_hash_dict) == 0:
+                    cc.execute("SELECT DISTINCT source FROM %s" % table_name)
+                    for row in cc.fetchall():
+                        old_hash_dict[row[0]] = None
+            else:
+                _create_table(cc, table_name)
+                conn.commit()
+
+            summary = {'added':[], 'changed':[], 'removed':[], 'unchanged':[]}
+            for source in hash_dict:
+                if source not in old_hash_dict:
+                    summary['added'].append(source)
+                elif old_hash_dict[source] != hash_dict[source]:
+                    summary['changed'].append(source)
+                else:
+                    summary['unchanged'].append(source)
+            for source in old_hash_dict:
+                if source not in hash_dict:
+                    summary['removed'].append(source)
+            for key in summary:
+                summary[key].sort()
+
+            to_parse = summary['added'] + summary['changed']
+            to_delete = summary['changed'] + summary['removed']
+
+            with conn:
+                for source in to_delete:
+                    _delete_source(cc, table_name, source)
+                    cc.execute("DELETE FROM %s WHERE version=? AND source=?"
+                               % manifest_table, (table_name, source))
+                if len(to_delete) > 0:
+                    _delete_orphan_records(cc)
+
+                param_generator = parameters_from_xml_files(
+                                      [file_dict[source] for source in to_parse],
+                                      n_jobs=n_jobs, timing_handle=timing_handle)
+                _insert_parameters(cc, param_generator, table_name,
+                                   bulk=bulk)
+
+                for source in to_parse:
+                    cc.execute("INSERT OR REPLACE INTO %s VALUES(?, ?, ?)"
+                               % manifest_table,
+                               (table_name, source, hash_dict[source]))
+
+                if saved_queries is not None:
+                    _materialize_saved_queries(cc, table_name, saved_queries)
+                elif len(to_parse+to_delete) > 0:
+                    _forget_saved_queries(cc, table_name)
+
+            _create_indexes(cc)
+            _update_catalog(cc, table_name)
+            conn.commit()
+    finally:
+        conn.close()
+
+    return summary
+
+
+def _parse_xml_file(file_name):
+    """
+    Read the .xml file specified by file_name in streaming mode.  Returns
+    a tuple containing file_name, a ParameterList of the Parameters read
+    from it, and the time in seconds that it took to read them.
+
+    This is the unit of work handed to the worker processes of
+    parameters_from_xml_files, so it must stay a module-level function.
+    Its result is pickled back to the parent process, which is why the
+    Parameters are returned in the compact column-oriented form.
+    """
+    t_start = time.time()
+    tree = ParameterTree(file_name, streaming=True)
+    return file_name, ParameterList(tree.parameter_list), time.time()-t_start
+
+
+def parameters_from_xml_files(file_list, n_jobs=1, timing_handle=None):
+    """
+    Generator yielding all of the Parameters contained in the .xml files
+    specified by file_list, suitable for passing straight to
+    db_from_param_list.
+
+    If n_jobs is greater than one, the files are parsed in a pool of n_jobs
+    worker processes.  Parameters are still yielded file-by-file in the
+    order of file_list (and in the same order within each file), so the
+    resulting database is identical to one built serially.
+
+    If timing_handle is not None, a line reporting the number of Parameters
+    read from each file and the time it took will be written to it
+    (e.g. timing_handle=sys.stdout).
+    """
+
+    def report(file_name, param_list, elapsed):
+        if timing_handle is not None:
+            timing_handle.write("%s: %d parameters in %.3f seconds\n"
+                                % (os.path.basename(file_name),
+                                   len(param_list), elapsed))
+
+    if n_jobs <= 1 or len(file_list) <= 1:
+        for file_name in file_list:
+            file_name, param_list, elapsed = _parse_xml_file(file_name)
+            report(file_name, param_list, elapsed)
+            for param in param_list.parameters():
+                yield param
+        return
+
+    pool = multiprocessing.Pool(processes=min(n_jobs, len(file_list)))
+    try:
+        for file_name, param_list, elapsed in pool.imap(_parse_xml_file,
+                                                        file_list,
+                                                        chunksize=1):
+            report(file_name, param_list, elapsed)
+            for param in param_list.parameters():
+                yield param
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
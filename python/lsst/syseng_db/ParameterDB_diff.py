@@ -0,0 +1,135 @@
+import os
+
+from ParameterDB_schema import records_table, membership_table
+from ParameterDB_schema import sources_table, units_table
+from ParameterDB_query import _global_connection_pool, _is_view
+from ParameterDB_query import _convert_row_to_parameter
+from ParameterDB_cache import cached_query
+
+__all__ = ["diff_versions", "diff_fields"]
+
+# the fields compared when a Parameter exists in both versions
+diff_fields = ("defaultValue", "upperValue", "lowerValue", "units", "docstring")
+
+
+def _record_columns(alias, units_alias):
+    """
+    Return the SQL selecting the columns in parameter_columns for the
+    record aliased alias, whose units are joined as units_alias and whose
+    source is joined as 's'
+    """
+    return "%s.name, %s.defaultValue, %s.upperValue, %s.lowerValue, " \
+           % (alias, alias, alias, alias) \
+           + "%s.units, %s.docstring, s.source" % (units_alias, alias)
+
+
+def _source_condition(xml_list, list_of_chars):
+    """
+    Return an SQL condition limiting the source joined as 's' to the .xml
+    files in xml_list (an empty string if xml_list is empty or None),
+    appending the values to bind to list_of_chars
+    """
+    if xml_list is None or len(xml_list)==0:
+        return ""
+    list_of_chars.extend(["{}".format(xml_file) for xml_file in xml_list])
+    return " AND s.source IN (%s)" % ", ".join(["?"]*len(xml_list))
+
+
+def _one_sided(cursor, version, other_version, xml_list):
+    """
+    Return the Parameters of version with no Parameter of the same name
+    and source in other_version
+    """
+    list_of_chars = [version]
+    cmd = "SELECT %s FROM %s m JOIN %s r ON r.id = m.record_id " \
+          % (_record_columns("r", "u"), membership_table, records_table) \
+        + "LEFT JOIN %s u ON u.id = r.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = r.source_id " % sources_table \
+        + "WHERE m.version = ?"
+    cmd += _source_condition(xml_list, list_of_chars)
+    cmd += " AND NOT EXISTS (SELECT 1 FROM %s r2 JOIN %s m2 " \
+           % (records_table, membership_table) \
+         + "ON m2.record_id = r2.id WHERE r2.name = r.name " \
+         + "AND r2.source_id = r.source_id AND m2.version = ?)"
+    list_of_chars.append(other_version)
+
+    cursor.execute(cmd, tuple(list_of_chars))
+    return [_convert_row_to_parameter(rr) for rr in cursor.fetchall()]
+
+
+def _modified(cursor, old_version, new_version, xml_list):
+    """
+    Return a list of (old Parameter, new Parameter, list of changed fields)
+    for the Parameters whose name and source exist in both versions but
+    whose contents differ
+    """
+    list_of_chars = [new_version, old_version]
+    cmd = "SELECT %s, %s " % (_record_columns("ro", "uo"),
+                              _record_columns("rn", "un")) \
+        + "FROM %s mo JOIN %s ro ON ro.id = mo.record_id " \
+          % (membership_table, records_table) \
+        + "JOIN %s rn ON rn.name = ro.name " % records_table \
+        + "AND rn.source_id = ro.source_id AND rn.id != ro.id " \
+        + "JOIN %s mn ON mn.record_id = rn.id AND mn.version = ? " \
+          % membership_table \
+        + "LEFT JOIN %s uo ON uo.id = ro.units_id " % units_table \
+        + "LEFT JOIN %s un ON un.id = rn.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = ro.source_id " % sources_table \
+        + "WHERE mo.version = ?"
+    cmd += _source_condition(xml_list, list_of_chars)
+
+    cursor.execute(cmd, tuple(list_of_chars))
+    output = []
+    for row in cursor.fetchall():
+        old_row = row[:7]
+        new_row = row[7:]
+        changed = [field for ii, field in zip((1, 2, 3, 4, 5), diff_fields)
+                   if old_row[ii] != new_row[ii]]
+        output.append((_convert_row_to_parameter(old_row),
+                       _convert_row_to_parameter(new_row), changed))
+    return output
+
+
+@cached_query
+def diff_versions(db_name, old_table, new_table, xml_list=None):
+    """
+    Compare the model versions old_table and new_table in the database
+    db_name.  Parameters are matched by name and source .xml file.
+    Returns a dict with the keys
+
+    'added' -- a list of the Parameters only in new_table
+    'removed' -- a list of the Parameters only in old_table
+    'modified' -- a list of (old Parameter, new Parameter, changed) tuples
+                  for the Parameters in both versions whose contents differ,
+                  where changed is a list of the fields (from diff_fields)
+                  that differ
+
+    Each list is alphabetized by name (case-insensitive).
+
+    Option to limit the comparison to data from .xml files specified in
+    xml_list.
+
+    Since identical Parameters share a record (see ParameterDB_schema), the
+    comparison is made with indexed joins on the records of the two
+    versions, so it is only available for versions loaded by this version
+    of syseng_db.
+    """
+
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exist" % db_name)
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        for table_name in (old_table, new_table):
+            if not _is_view(cursor, table_name):
+                raise RuntimeError("%s cannot be compared; " % table_name
+                                   + "rebuild it to use diff_versions")
+
+        added = _one_sided(cursor, new_table, old_table, xml_list)
+        removed = _one_sided(cursor, old_table, new_table, xml_list)
+        modified = _modified(cursor, old_table, new_table, xml_list)
+
+    by_name = lambda pp: (pp.name.lower(), pp.source)
+    return {'added':sorted(added, key=by_name),
+            'removed':sorted(removed, key=by_name),
+            'modified':sorted(modified, key=lambda rr: by_name(rr[0]))}
@@ -0,0 +1,83 @@
+"""
+Key numbers: a fixed list of Parameters, each named together with the .xml
+file it is read from, looked up in a model version all at once (e.g. for
+the key numbers page of the web interface).  The list is kept in a text
+file with one Parameter per line,
+
+    # comment
+    m1OuterCa = Telescope Requirements_v1.xml
+    slewSettle_time = Telescope Requirements_v1.xml
+
+read by read_key_numbers, and key_numbers_query finds all of them with a
+single exact-match query on the indexed names.
+"""
+
+import os
+
+from ParameterDB_cache import cached_query
+from ParameterDB_query import _global_connection_pool, _name_query_sql
+from ParameterDB_query import _lazy_parameter_factory, name_query_chunk_size
+
+__all__ = ["read_key_numbers", "key_numbers_query"]
+
+
+def read_key_numbers(file_name):
+    """
+    Read the key numbers file file_name (see the module docstring).  Returns
+    a list of (name, .xml file) tuples in the order of the file.  Raises a
+    RuntimeError if a line cannot be read.
+    """
+    key_list = []
+    with open(file_name, 'r') as input_file:
+        for line_number, line in enumerate(input_file):
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            words = line.split('=', 1)
+            if len(words) != 2 or len(words[0].strip()) == 0 \
+               or len(words[1].strip()) == 0:
+                raise RuntimeError("Line %d of %s is not 'name = .xml file'"
+                                   % (line_number+1, file_name))
+            key_list.append((words[0].strip(), words[1].strip()))
+    return key_list
+
+
+@cached_query
+def key_numbers_query(db_name, table_name, key_list):
+    """
+    Query the database db_name and table table_name for the Parameters in
+    key_list, a list of (name, .xml file) tuples as returned by
+    read_key_numbers.  Returns a list of Parameter objects (LazyParameters)
+    in the order of key_list; a Parameter matches a key when both its name
+    and its .xml file do, exactly.  Keys with no match are left out.
+
+    All of the names are looked up with one statement (for up to
+    name_query_chunk_size keys), answered from the index on the names.
+    """
+
+    if len(key_list) == 0:
+        return []
+
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    name_list = []
+    for name, source in key_list:
+        if name not in name_list:
+            name_list.append(name)
+
+    found = {}
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _lazy_parameter_factory
+        for i_start in range(0, len(name_list), name_query_chunk_size):
+            chunk = name_list[i_start:i_start+name_query_chunk_size]
+            cursor.execute(_name_query_sql(table_name, len(chunk)),
+                           tuple(chunk))
+            for param in cursor.fetchall():
+                found.setdefault((param.name, param.source), []).append(param)
+
+    output = []
+    for key in key_list:
+        output.extend(found.pop(tuple(key), []))
+    return output
@@ -0,0 +1,382 @@
+"""
+An in-memory serving mode for read-only servers such as the web interface.
+serve_from_memory(db_name) copies the database db_name (or only some of its
+model versions) into an in-memory SQLite database, builds the indexes there,
+and redirects the connection pool in ParameterDB_query to it, so that every
+query function called with db_name reads memory instead of the file.
+
+The copy is a snapshot.  When a query is made more than check_interval
+seconds after the file was last looked at, and the file has changed since
+the snapshot was taken (see _database_state in ParameterDB_cache), a new
+snapshot is loaded and replaces the old one.  Queries keep using the old
+snapshot while the new one is loaded, and if loading fails (e.g. because
+the file is being rebuilt in place) the old snapshot is served until the
+next attempt.
+
+The in-memory databases are opened through SQLite URIs (with the memdb VFS
+where the SQLite library provides it, a shared cache otherwise) so that the
+connections of the pool share one copy.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from ParameterDB_schema import is_internal_table, manifest_table
+from ParameterDB_schema import catalog_table
+from ParameterDB_schema import sources_table, units_table
+from ParameterDB_schema import records_table, membership_table
+from ParameterDB_schema import saved_queries_table, saved_results_table
+from ParameterDB_cache import _database_state
+from ParameterDB_query import _global_connection_pool
+from ParameterDB_constructor import _create_table
+from ParameterDB_constructor import _create_indexes, _has_table
+from ParameterDB_saved import _create_saved_tables
+
+__all__ = ["serve_from_memory", "stop_serving_from_memory",
+           "memory_snapshot_stats"]
+
+
+_snapshot_counter = [0]
+_snapshot_counter_lock = threading.Lock()
+
+
+def _memory_uris():
+    """
+    Return the URIs to try, in order, for a new in-memory database: one
+    using the memdb VFS (SQLite 3.36 and later), then one using a shared
+    cache
+    """
+    with _snapshot_counter_lock:
+        _snapshot_counter[0] += 1
+        name = "syseng_snapshot_%d_%d" % (os.getpid(), _snapshot_counter[0])
+    return ["file:/%s?vfs=memdb" % name,
+            "file:%s?mode=memory&cache=shared" % name]
+
+
+def _connect_uri(uri):
+    """
+    Open a connection to the SQLite URI uri, raising a RuntimeError if the
+    sqlite3 module cannot open URIs
+    """
+    try:
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    except TypeError:
+        # the sqlite3 module of Python 2 has no uri argument, but the SQLite
+        # library still interprets URIs if it was built to
+        conn = sqlite3.connect(uri, check_same_thread=False)
+        if os.path.exists(uri):
+            conn.close()
+            os.unlink(uri)
+            raise RuntimeError("The SQLite library cannot open URIs, "
+                               "so databases cannot be served from memory")
+    return conn
+
+
+def _open_memory_database():
+    """
+    Return a tuple containing a connection to a new in-memory database
+    (which lasts until that connection and any other connections to it are
+    closed) and its URI
+    """
+    for uri in _memory_uris():
+        conn = _connect_uri(uri)
+        try:
+            conn.execute("CREATE TABLE syseng_probe (x integer)")
+            conn.execute("DROP TABLE syseng_probe")
+        except sqlite3.OperationalError:
+            # e.g. no memdb VFS in this SQLite library
+            conn.close()
+            continue
+        return conn, uri
+    raise RuntimeError("Could not create an in-memory database")
+
+
+def _list_versions(cursor, schema):
+    """
+    Return the names of the model versions in the database schema (main or
+    an attached database)
+    """
+    cursor.execute("SELECT name FROM %s.sqlite_master "
+                   "WHERE type IN ('table', 'view')" % schema)
+    return sorted([str(row[0]) for row in cursor.fetchall()
+                   if not is_internal_table(str(row[0]))])
+
+
+def _internal_tables(cursor, schema):
+    """
+    Return the names of the tables maintained by syseng_db in the database
+    schema
+    """
+    cursor.execute("SELECT name FROM %s.sqlite_master WHERE type='table'"
+                   % schema)
+    return [str(row[0]) for row in cursor.fetchall()
+            if is_internal_table(str(row[0]))]
+
+
+def _common_columns(cursor, table_name):
+    """
+    Return the columns table_name has both in the file (main) and in the
+    in-memory copy (mem), which may have been created by a newer version of
+    syseng_db than the file
+    """
+    columns = {}
+    for schema in ('main', 'mem'):
+        cursor.execute("PRAGMA %s.table_info(%s)" % (schema, table_name))
+        columns[schema] = [str(row[1]) for row in cursor.fetchall()]
+    return [column for column in columns['mem']
+            if column in columns['main']]
+
+
+def _copy_versions(conn, uri, db_name, versions):
+    """
+    Copy the model versions in the list versions (all of them if None)
+    from the database file db_name into the empty in-memory database uri,
+    connected to conn, then build the indexes.  Only the records belonging
+    to those versions are copied.  Returns the list of versions copied.
+
+    The copy is made by a connection to the file with the in-memory database
+    attached, since an attached database is opened with the VFS of the main
+    database unless its URI names another.
+    """
+    # the transactions are managed here rather than by the sqlite3 module
+    conn.isolation_level = None
+    memory_cursor = conn.cursor()
+
+    disk = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        cursor = disk.cursor()
+        cursor.execute("ATTACH DATABASE ? AS mem", (uri,))
+        # one transaction, so that everything is read from the same state of
+        # the file
+        cursor.execute("BEGIN")
+        try:
+            available = _list_versions(cursor, 'main')
+            if versions is None:
+                versions = available
+            for version in versions:
+                if version not in available:
+                    raise RuntimeError("%s is not a model version in %s"
+                                       % (version, db_name))
+
+            view_list = []
+            for version in versions:
+                cursor.execute("SELECT type FROM main.sqlite_master "
+                               "WHERE name=?", (version,))
+                if str(cursor.fetchone()[0]) == 'view':
+                    view_list.append(version)
+                else:
+                    # a version written before versions were stored as views
+                    cursor.execute("CREATE TABLE mem.%s AS SELECT * "
+                                   "FROM main.%s" % (version, version))
+
+            if len(view_list) > 0:
+                for version in view_list:
+                    _create_table(memory_cursor, version)
+                _create_saved_tables(memory_cursor)
+
+                columns = ", ".join(_common_columns(cursor, membership_table))
+                cursor.execute("INSERT INTO mem.%s (%s) SELECT %s FROM "
+                               "main.%s WHERE version IN (%s)"
+                               % (membership_table, columns, columns,
+                                  membership_table,
+                                  ", ".join(["?"]*len(view_list))),
+                               tuple(view_list))
+                columns = ", ".join(_common_columns(cursor, records_table))
+                cursor.execute("INSERT INTO mem.%s (%s) SELECT %s FROM "
+                               "main.%s WHERE id IN (SELECT record_id FROM "
+                               "mem.%s)" % (records_table, columns, columns,
+                                            records_table, membership_table))
+                for table_name in (sources_table, units_table):
+                    columns = ", ".join(_common_columns(cursor, table_name))
+                    cursor.execute("INSERT INTO mem.%s (%s) SELECT %s FROM "
+                                   "main.%s" % (table_name, columns, columns,
+                                                table_name))
+
+                if saved_queries_table in _internal_tables(cursor, 'main'):
+                    for table_name in (saved_queries_table,
+                                       saved_results_table):
+                        cursor.execute("INSERT INTO mem.%s SELECT * FROM "
+                                       "main.%s WHERE version IN (%s)"
+                                       % (table_name, table_name,
+                                          ", ".join(["?"]*len(view_list))),
+                                       tuple(view_list))
+
+            internal_tables = _internal_tables(cursor, 'main')
+            for table_name in (manifest_table, catalog_table):
+                if table_name in internal_tables:
+                    cursor.execute("CREATE TABLE mem.%s AS SELECT * "
+                                   "FROM main.%s WHERE version IN (%s)"
+                                   % (table_name, table_name,
+                                      ", ".join(["?"]*len(versions))),
+                                   tuple(versions))
+
+            cursor.execute("COMMIT")
+        except:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        disk.close()
+
+    if len(view_list) > 0:
+        memory_cursor.execute("BEGIN")
+        _create_indexes(memory_cursor)
+        memory_cursor.execute("COMMIT")
+    return list(versions)
+
+
+class _MemorySnapshot(object):
+    """
+    The in-memory copy of a database file served by serve_from_memory, and
+    the logic deciding when to replace it.  Its method current() is the
+    resolver handed to connection_pool.redirect().
+    """
+
+    def __init__(self, db_name, versions, check_interval):
+        self.db_name = db_name
+        self.versions = versions
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = time.time()
+        self._keeper = None
+        self._uri = None
+        self._stats = {'reloads':0, 'failed_reloads':0, 'last_error':None}
+        self._load()
+
+    def _load(self):
+        """
+        Load a new snapshot of the file and start serving it
+        """
+        t_start = time.time()
+        state = _database_state(self.db_name)
+        conn, uri = _open_memory_database()
+        try:
+            if self.versions is None and hasattr(conn, 'backup'):
+                # the sqlite3 module of Python 3 exposes SQLite's online
+                # backup API, which copies the whole file page by page
+                disk = sqlite3.connect(self.db_name)
+                try:
+                    disk.backup(conn)
+                finally:
+                    disk.close()
+                cursor = conn.cursor()
+                loaded_versions = _list_versions(cursor, 'main')
+                if _has_table(cursor, records_table):
+                    _create_indexes(cursor)
+                    conn.commit()
+            else:
+                loaded_versions = _copy_versions(conn, uri, self.db_name,
+                                                 self.versions)
+        except:
+            conn.close()
+            raise
+
+        old_keeper = self._keeper
+        self._keeper = conn
+        self._uri = uri
+        self._state = state
+        self._stats['loaded_versions'] = loaded_versions
+        self._stats['load_time'] = time.time()-t_start
+        self._stats['loaded_at'] = time.time()
+
+        if old_keeper is not None:
+            # idle connections to the old snapshot are closed now, and those
+            # in use when they are returned; the old snapshot disappears
+            # with the last of them
+            _global_connection_pool.close()
+            old_keeper.close()
+
+    def current(self):
+        """
+        Return the URI of the snapshot to query, first replacing the snapshot
+        if the file has changed (looking at most once every check_interval
+        seconds, and only in one thread at a time)
+        """
+        now = time.time()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            if _database_state(self.db_name) != self._state \
+               and self._lock.acquire(False):
+                try:
+                    self._load()
+                    self._stats['reloads'] += 1
+                except (sqlite3.Error, RuntimeError, OSError), w:
+                    self._stats['failed_reloads'] += 1
+                    self._stats['last_error'] = str(w)
+                finally:
+                    self._lock.release()
+        return self._uri
+
+    def stats(self):
+        output = dict(self._stats)
+        output['uri'] = self._uri
+        return output
+
+    def close(self):
+        if self._keeper is not None:
+            _global_connection_pool.close()
+            self._keeper.close()
+            self._keeper = None
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def serve_from_memory(db_name, versions=None, check_interval=1.0):
+    """
+    Serve the queries made against the database file db_name from an
+    in-memory copy of it containing the model versions in the list versions
+    (all of them if None; the query functions then only see those
+    versions).  The copy is indexed as the file is, and is replaced by a new
+    copy when the file changes, which is checked at most once every
+    check_interval seconds.
+
+    Calling serve_from_memory again for the same file replaces its copy.
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exist" % db_name)
+
+    snapshot = _MemorySnapshot(db_name, versions, check_interval)
+    with _snapshots_lock:
+        old_snapshot = _snapshots.get(db_name)
+        _snapshots[db_name] = snapshot
+        _global_connection_pool.redirect(db_name, snapshot.current)
+    if old_snapshot is not None:
+        old_snapshot.close()
+
+
+def stop_serving_from_memory(db_name=None):
+    """
+    Go back to querying the file db_name (every file served from memory if
+    None) and free its in-memory copy
+    """
+    with _snapshots_lock:
+        if db_name is None:
+            name_list = list(_snapshots)
+        else:
+            name_list = [db_name]
+        snapshot_list = []
+        for name in name_list:
+            if name in _snapshots:
+                _global_connection_pool.redirect(name, None)
+                snapshot_list.append(_snapshots.pop(name))
+    for snapshot in snapshot_list:
+        snapshot.close()
+
+
+def memory_snapshot_stats(db_name):
+    """
+    Return a dict describing the in-memory copy of db_name: the versions it
+    holds ('loaded_versions'), when it was loaded ('loaded_at') and how many
+    seconds that took ('load_time'), the number of times it was replaced
+    because the file changed ('reloads') or could not be replaced
+    ('failed_reloads', with the last error in 'last_error'), and its 'uri'.
+    Returns None if db_name is not served from memory.
+    """
+    with _snapshots_lock:
+        snapshot = _snapshots.get(db_name)
+    if snapshot is None:
+        return None
+    return snapshot.stats()
@@ -1,43 +1,370 @@
 import sqlite3
 import os
+import json
+import time
+import threading
+from contextlib import contextmanager
 
-from ParameterTree import Parameter
+from ParameterTree import Parameter, value_names, _encode_value
+from ParameterDB_schema import is_internal_table, sources_table, units_table
+from ParameterDB_schema import records_table, membership_table, fts_table
+from ParameterDB_schema import token_table, trigram_table
+from ParameterDB_schema import parameter_columns, catalog_table
+from ParameterDB_schema import value_columns, numeric_column
+from ParameterDB_cache import cached_query, cached_statement, _database_state
+from ParameterDB_cache import _global_result_cache
+from ParameterDB_tokens import name_tokens, _trigrams, _similarity, _highlight
 
-__all__ = ["get_table_names", "get_column_names",
-           "get_parameter_names", "get_xml_files",
-           "keyword_query", "name_query"]
+__all__ = ["connection_pool", "close_connections", "get_table_names", "get_column_names",
+           "get_parameter_names", "get_xml_files", "get_catalog",
+           "catalog_cache_stats",
+           "keyword_query", "name_query", "RankedParameter",
+           "LazyParameter", "range_query", "token_query"]
 
-class connection_cache(object):
+
+class RankedParameter(Parameter):
     """
-    This is essentially a thin wrapper around a dict of database connections.
-    When users want to connect to a SQLite database, they can use the
-    connect() method provided in this class and any existing connection
-    to that file will be used.  If non exists, a new connection will be
-    opened and stored for future use.
+    A Parameter returned by a ranked search (e.g. keyword_query in
+    'fulltext' mode).  In addition to the usual properties it carries
+
+    rank -- the score of the match, more negative being a better match
+            (the BM25 score computed by SQLite for keyword_query, the
+            negated token score for token_query)
+    snippet -- an excerpt of the name or docstring with the matching
+               terms in [brackets]
     """
 
-    def __init__(self):
-        self._connection_dict = {}
+    __slots__ = ('_rank', '_snippet')
 
-    def connect(self, file_name):
+    def __init__(self, name, rank=None, snippet=None, **kwargs):
         """
-        Return a connection to the database specified by file_name.  If one
-        already exists, use that.  If not, open one, store it for future use,
-        and return it.
+        rank and snippet are as described above; all other arguments
+        are passed on to Parameter
         """
-        if file_name in self._connection_dict:
-            return self._connection_dict[file_name]
+        super(RankedParameter, self).__init__(name, **kwargs)
+        self._rank = rank
+        self._snippet = snippet
+
+    @property
+    def rank(self):
+        return self._rank
+
+    @property
+    def snippet(self):
+        return self._snippet
+
+
+class LazyParameter(Parameter):
+    """
+    A Parameter read from a row of the database (a tuple of the columns in
+    parameter_columns) which is only decoded as its properties are read:
+    the 'NULL' placeholders are checked, the values dict assembled and the
+    source trimmed when they are asked for, so callers that only look at
+    names pay next to nothing for the other fields.  Apart from being built
+    from a row, a LazyParameter behaves as a Parameter (write_param()
+    included).
+
+    The query functions make them with the row factory
+    _lazy_parameter_factory, so no intermediate tuple is kept per row.
+    """
+
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getstate__(self):
+        return {'_row': tuple(self._row)}
+
+    @property
+    def name(self):
+        return self._row[0]
+
+    @property
+    def doc(self):
+        doc = self._row[5]
+        if doc == 'NULL':
+            return None
+        return doc
+
+    @property
+    def units(self):
+        units = self._row[4]
+        if units is None or units == 'NULL':
+            return ''
+        return units
+
+    @property
+    def source(self):
+        source = self._row[6]
+        if source is None or source == 'NULL':
+            return None
+        return source.split('/')[-1]
+
+    @property
+    def values(self):
+        output = {}
+        for ii, val_name in enumerate(value_names):
+            vv = self._row[ii+1]
+            if vv is not None:
+                output[val_name] = _encode_value(vv)
+        return output
+
 
-        conn = sqlite3.connect(file_name)
-        self._connection_dict[file_name] = conn
+def _lazy_parameter_factory(cursor, row):
+    """
+    Row factory (see sqlite3.Cursor.row_factory) turning the rows of a
+    statement selecting the columns in parameter_columns into LazyParameters
+    """
+    return LazyParameter(row)
+
+def _file_identity(file_name):
+    """
+    Return a tuple identifying the file file_name on disk, which changes when
+    the file is replaced by another, e.g. by a shadow build in
+    ParameterDB_constructor (None if the file does not exist)
+    """
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+class connection_pool(object):
+    """
+    A thread-safe pool of read-only connections to SQLite database files.
+    Users check a connection out with
+
+        with pool.connection(file_name) as conn:
+            ...
+
+    and it is returned to the pool at the end of the with block, so each
+    connection is only ever used by one thread at a time and concurrent
+    queries (e.g. from the request threads of the web interface) run in
+    parallel on separate connections.
+
+    At most max_connections connections to each file are open at once;
+    connection() waits up to timeout seconds for one to be returned before
+    raising a RuntimeError.
+
+    Connections are opened read-only (in SQLite's read-only URI mode where
+    the sqlite3 module supports it, and with PRAGMA query_only in any case)
+    with the pragmas in reader_pragmas and a memory map of mmap_size bytes.
+    Before an idle connection is handed out it is checked: if the file has
+    been replaced since the connection was opened, or the connection no
+    longer answers a trivial query, it is closed and a new one is opened.
+
+    A file may be redirected to another database (see redirect()), e.g. an
+    in-memory copy of it served by ParameterDB_memory.
+    """
+
+    # the number of compiled statements each connection keeps for reuse;
+    # the query functions build one SQL string per query shape (see
+    # cached_statement), so this bounds the shapes served without
+    # recompiling
+    cached_statements = 256
+
+    # pragmas applied to every connection opened by the pool
+    reader_pragmas = [("query_only", "ON"),
+                      ("temp_store", "MEMORY"),
+                      ("cache_size", "-16384")]
+
+    def __init__(self, max_connections=8, mmap_size=268435456, timeout=30.0):
+        """
+        max_connections -- the maximum number of connections open to each
+                           database file
+        mmap_size -- the number of bytes of each database file to map into
+                     memory (0 disables memory mapping)
+        timeout -- the number of seconds connection() waits for a free
+                   connection
+        """
+        self._max_connections = max_connections
+        self._mmap_size = mmap_size
+        self._timeout = timeout
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = {}
+        self._in_use = {}
+        self._generation = 0
+        self._redirects = {}
+
+    @property
+    def max_connections(self):
+        """
+        The maximum number of connections open to each database file
+        """
+        return self._max_connections
+
+    def redirect(self, file_name, resolver):
+        """
+        Serve connection(file_name) with connections to the database named
+        by resolver(), a function called every time a connection to
+        file_name is requested which returns a file name or an SQLite URI
+        (starting with 'file:').  resolver=None removes the redirection.
+        """
+        with self._condition:
+            if resolver is None:
+                self._redirects.pop(file_name, None)
+            else:
+                self._redirects[file_name] = resolver
+
+    def _open(self, file_name):
+        """
+        Open a new read-only connection to file_name (a file name, or an
+        SQLite URI given by a redirection)
+        """
+        if file_name.startswith("file:"):
+            uri = file_name
+        else:
+            uri = "file:%s?mode=ro" % os.path.abspath(file_name) \
+                  .replace("%", "%25").replace("?", "%3f").replace("#", "%23")
+        try:
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        except TypeError:
+            # the sqlite3 module of Python 2 cannot open URIs; query_only
+            # (set below) still keeps the connection from writing
+            conn = sqlite3.connect(file_name, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+
+        cursor = conn.cursor()
+        for pragma, value in self.reader_pragmas:
+            cursor.execute("PRAGMA %s = %s" % (pragma, value))
+        cursor.execute("PRAGMA mmap_size = %d" % self._mmap_size)
+        cursor.fetchall()
         return conn
 
-_global_connection_cache = connection_cache()
+    @staticmethod
+    def _is_healthy(conn):
+        """
+        Return True if conn can still run a query
+        """
+        try:
+            conn.execute("SELECT 1").fetchall()
+        except sqlite3.Error:
+            return False
+        return True
 
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
 
-def _convert_row_to_parameter(row):
+    def _checkout(self, file_name):
+        """
+        Reserve a connection to file_name, returning a tuple containing the
+        connection (None if a new one needs to be opened), the identity of
+        the file when it was opened, and the pool generation it belongs to
+        """
+        deadline = time.time() + self._timeout
+        with self._condition:
+            while True:
+                idle = self._idle.setdefault(file_name, [])
+                in_use = self._in_use.get(file_name, 0)
+                if len(idle) > 0:
+                    self._in_use[file_name] = in_use + 1
+                    return idle.pop()
+                if in_use < self._max_connections:
+                    self._in_use[file_name] = in_use + 1
+                    return (None, None, self._generation)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError("Timed out waiting for a connection "
+                                       "to %s" % file_name)
+                self._condition.wait(remaining)
+
+    def _checkin(self, file_name, conn, identity, generation):
+        """
+        Return a connection reserved by _checkout (conn may be None if it
+        could not be opened)
+        """
+        with self._condition:
+            self._in_use[file_name] -= 1
+            if conn is not None and generation == self._generation:
+                self._idle[file_name].append((conn, identity, generation))
+                conn = None
+            self._condition.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def resolve(self, file_name):
+        """
+        Return the name of the database connection(file_name) connects to:
+        file_name itself unless it is redirected (see redirect())
+        """
+        resolver = self._redirects.get(file_name)
+        if resolver is not None:
+            return resolver()
+        return file_name
+
+    @contextmanager
+    def connection(self, file_name):
+        """
+        Context manager checking out a connection to the database file_name
+        for the duration of a with block
+        """
+        file_name = self.resolve(file_name)
+
+        conn, identity, generation = self._checkout(file_name)
+        try:
+            current_identity = _file_identity(file_name)
+            if conn is not None and (identity != current_identity
+                                     or not self._is_healthy(conn)):
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                identity = current_identity
+                conn = self._open(file_name)
+            yield conn
+        finally:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    self._close_quietly(conn)
+                    conn = None
+            self._checkin(file_name, conn, identity, generation)
+
+    def close(self):
+        """
+        Close all of the idle connections in the pool.  Connections checked
+        out at the time are closed when they are returned.  The pool can
+        still be used afterwards; it opens new connections as needed.
+        """
+        with self._condition:
+            self._generation += 1
+            to_close = []
+            for file_name in self._idle:
+                to_close.extend([conn for conn, identity, generation
+                                 in self._idle[file_name]])
+                self._idle[file_name] = []
+        for conn in to_close:
+            self._close_quietly(conn)
+
+_global_connection_pool = connection_pool()
+
+# results cached while the queries against a file went to another database
+# (e.g. an in-memory snapshot which has since been replaced) are stale
+_global_result_cache.resolver = _global_connection_pool.resolve
+
+
+def close_connections():
+    """
+    Close all of the idle connections the query functions in this module
+    have open (e.g. when shutting down a server).  Connections are reopened
+    as needed if the query functions are called again.
+    """
+    _global_connection_pool.close()
+
+
+def _convert_row_to_parameter(row, parameter_class=Parameter, **kwargs):
     """
     Convert a raw of our SQLite database into a Parameter object.
+
+    parameter_class may be a subclass of Parameter to create instead, in
+    which case any additional keyword arguments are passed to it.
     """
     name = row[0]
     values = {'defaultValue':row[1],
@@ -59,24 +386,252 @@ def _convert_row_to_parameter(row):
     else:
         source = None
 
-    return Parameter(name, doc=doc, units=units, values=values, source=source)
+    return parameter_class(name, doc=doc, units=units, values=values,
+                           source=source, **kwargs)
+
+def _is_view(cursor, table_name):
+    """
+    Return True if the model version table_name is stored as a view over
+    records_table (see ParameterDB_schema); False if it is a plain table
+    written by an older version of syseng_db.
+    """
+    cursor.execute("SELECT type FROM sqlite_master WHERE name=?",
+                   (table_name,))
+    results = cursor.fetchall()
+    return len(results) > 0 and str(results[0][0]) == 'view'
+
+
+class catalog_cache(object):
+    """
+    A thread-safe, process-level cache of the catalog of each database: the
+    model versions it contains and, for each of them, the number of
+    Parameters, the .xml files they came from, when the version was built
+    and the hash of its contents, as written to catalog_table at ingest
+    (see ParameterDB_schema).
+
+    The catalog of a database is read once (one statement on sqlite_master
+    and one on catalog_table) and kept until the database changes, as
+    told by _database_state and by the database connection_pool redirects
+    it to (e.g. a new in-memory snapshot).  Versions written before
+    catalog_table existed have no row in it; their .xml files are found
+    with a scan of the version the first time they are asked for.  The
+    names of the Parameters in a version are likewise read the first time
+    they are asked for and kept until the database changes.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._catalogs = {}
+        self._stats = {'hits':0, 'loads':0}
+
+    def _state(self, db_name):
+        """
+        Return a tuple which changes whenever the catalog of db_name may
+        have changed
+        """
+        return (self._pool.resolve(db_name), _database_state(db_name))
+
+    def _load(self, db_name):
+        """
+        Read the catalog of db_name; returns a dict mapping each version to
+        a dict of its entries (None where unknown)
+        """
+        catalog = {}
+        with self._pool.connection(db_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, type FROM sqlite_master "
+                           "WHERE type IN ('table', 'view')")
+            has_catalog = False
+            for name, table_type in cursor.fetchall():
+                name = str(name)
+                if name == catalog_table:
+                    has_catalog = True
+                if not is_internal_table(name):
+                    catalog[name] = {'n_parameters':None, 'sources':None,
+                                     'build_time':None, 'content_hash':None,
+                                     'names':None,
+                                     'is_view':str(table_type) == 'view'}
+            if has_catalog:
+                cursor.execute("SELECT version, n_parameters, sources, "
+                               "build_time, content_hash FROM %s"
+                               % catalog_table)
+                for version, n_parameters, sources, build_time, \
+                    content_hash in cursor.fetchall():
+                    entry = catalog.get(str(version))
+                    if entry is None or not entry['is_view']:
+                        continue
+                    entry['n_parameters'] = n_parameters
+                    entry['sources'] = [str(ss) for ss in json.loads(sources)]
+                    entry['build_time'] = build_time
+                    entry['content_hash'] = str(content_hash)
+        return catalog
+
+    def _current(self, db_name):
+        """
+        Return the (state, catalog) kept for db_name, reading the catalog
+        again if the database has changed
+        """
+        state = self._state(db_name)
+        with self._lock:
+            kept = self._catalogs.get(db_name)
+            if kept is not None and kept[0] == state:
+                self._stats['hits'] += 1
+                return kept
+
+        if state[1][0] is None:
+            raise RuntimeError("Database %s does not exist" % db_name)
+
+        kept = (state, self._load(db_name))
+        with self._lock:
+            self._stats['loads'] += 1
+            self._catalogs[db_name] = kept
+        return kept
+
+    def versions(self, db_name):
+        """
+        Return the names of the model versions in db_name, sorted
+        case-insensitively
+        """
+        catalog = self._current(db_name)[1]
+        return sorted(catalog, key=lambda s: s.lower())
+
+    def catalog(self, db_name):
+        """
+        Return a dict mapping each model version in db_name to a dict of
+        'n_parameters', 'sources', 'build_time' and 'content_hash' (None for
+        versions without a row in catalog_table)
+        """
+        catalog = self._current(db_name)[1]
+        output = {}
+        for version in catalog:
+            output[version] = dict([(key, catalog[version][key]) for key in
+                                    ('n_parameters', 'sources', 'build_time',
+                                     'content_hash')])
+            if output[version]['sources'] is not None:
+                output[version]['sources'] = list(output[version]['sources'])
+        return output
+
+    def _entry(self, db_name, table_name, key, scan):
+        """
+        Return the entry key of the version table_name of db_name, computing
+        it with scan(cursor, table_name) if it is not known yet
+        """
+        catalog = self._current(db_name)[1]
+        if table_name not in catalog:
+            raise RuntimeError("%s is not a model version in %s"
+                               % (table_name, db_name))
+        entry = catalog[table_name]
+        found = entry[key]
+        if found is None:
+            with self._pool.connection(db_name) as conn:
+                found = scan(conn.cursor(), table_name)
+            with self._lock:
+                entry[key] = found
+        return found
+
+    def sources(self, db_name, table_name):
+        """
+        Return the .xml files the version table_name of db_name was read
+        from, sorted case-insensitively
+        """
+        return list(self._entry(db_name, table_name, 'sources', _scan_sources))
+
+    def parameter_names(self, db_name, table_name):
+        """
+        Return the names of the Parameters in the version table_name of
+        db_name, sorted case-insensitively
+        """
+        return list(self._entry(db_name, table_name, 'names', _scan_names))
+
+    def clear(self):
+        """
+        Discard all of the catalogs kept and reset the counters
+        """
+        with self._lock:
+            self._catalogs.clear()
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def stats(self):
+        """
+        Return a dict of the counters 'hits' (catalogs found up to date) and
+        'loads' (catalogs read from a database)
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+def _scan_sources(cursor, table_name):
+    """
+    Return the sorted list of the .xml files the version table_name was
+    read from, found by scanning the version
+    """
+    if _is_view(cursor, table_name):
+        # collect the distinct source keys before looking them up rather
+        # than joining every row to the lookup table
+        cursor.execute("SELECT source FROM %s WHERE id IN "
+                       "(SELECT r.source_id FROM %s m JOIN %s r "
+                       "ON r.id = m.record_id WHERE m.version = ?)"
+                       % (sources_table, membership_table, records_table),
+                       (table_name,))
+    else:
+        cursor.execute("SELECT DISTINCT source FROM %s" % table_name)
+    raw_results = cursor.fetchall()
+    return sorted([str(rr[0]) for rr in raw_results], key=lambda s: s.lower())
+
+
+def _scan_names(cursor, table_name):
+    """
+    Return the sorted list of the distinct names of the Parameters in the
+    version table_name
+    """
+    cursor.execute("SELECT DISTINCT name FROM %s" % table_name)
+    raw_results = cursor.fetchall()
+    return sorted([str(rr[0]) for rr in raw_results], key=lambda s: s.lower())
+
+_global_catalog_cache = catalog_cache(_global_connection_pool)
+
 
 def get_table_names(db_name):
     """
     Return as list of the names of the tables on the database specified by
-    db_name.
+    db_name.  Model versions stored as views are included; the tables
+    behind them and the other bookkeeping tables maintained by syseng_db
+    (see ParameterDB_schema) are not.
+
+    The names are read from the catalog cache, which only reads them from
+    the database again when it has changed.
     """
+    return _global_catalog_cache.versions(db_name)
 
-    if not os.path.exists(db_name):
-        raise RuntimeError("Database %s does not exist" % db_name)
 
-    cursor = _global_connection_cache.connect(db_name).cursor()
-    query = "SELECT name FROM sqlite_master WHERE type='table'"
-    cursor.execute(query)
-    results = cursor.fetchall()
-    return sorted([str(rr[0]) for rr in results], key=lambda s: s.lower())
+def get_catalog(db_name):
+    """
+    Return a dict mapping the name of each model version in the database
+    db_name to a dict describing it, written when the version was built:
+
+    'n_parameters' -- the number of Parameters in the version
+    'sources' -- the sorted list of the .xml files they came from
+    'build_time' -- when the version was built (seconds since the epoch)
+    'content_hash' -- a hash of the Parameters in the version, equal for
+                      versions containing the same Parameters
+
+    The entries are None for versions built by older versions of syseng_db.
+    """
+    return _global_catalog_cache.catalog(db_name)
+
+
+def catalog_cache_stats():
+    """
+    Return a dict containing the number of times the catalog cache was
+    found up to date ('hits') and the number of times a catalog was read
+    from a database ('loads')
+    """
+    return _global_catalog_cache.stats()
 
 
+@cached_query
 def get_column_names(db_name, table_name):
     """
     Return a list of the names of the rows in the table specified by
@@ -88,26 +643,21 @@ def get_column_names(db_name, table_name):
 
     if ')' in table_name:
         raise RuntimeError("%s is not a valid table_name" % table_name)
-    cursor = _global_connection_cache.connect(db_name).cursor()
-    cursor.execute("PRAGMA table_info(%s)" % table_name)
-    raw_results = cursor.fetchall()
-    return [str(rr[1]) for rr in raw_results]
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(%s)" % table_name)
+        raw_results = cursor.fetchall()
+        return [str(rr[1]) for rr in raw_results]
 
 
 def get_parameter_names(db_name, table_name):
     """
     Return a list of all of the parameters contained in the table specified
     by table_name in the database specified by db_name.
-    """
-    if not os.path.exists(db_name):
-        raise RuntimeError("Database %s does not exist" % db_name)
-    if ')' in table_name:
-        raise RuntimeError("%S is not a valid table_name" % table_name)
 
-    cursor = _global_connection_cache.connect(db_name).cursor()
-    cursor.execute("SELECT DISTINCT name FROM %s" % table_name)
-    raw_results = cursor.fetchall()
-    return sorted([str(rr[0]) for rr in raw_results], key=lambda s: s.lower())
+    The names are kept by the catalog cache until the database changes.
+    """
+    return _global_catalog_cache.parameter_names(db_name, table_name)
 
 
 def get_xml_files(db_name, table_name):
@@ -115,105 +665,530 @@ def get_xml_files(db_name, table_name):
     Return a list of all of the xml files from which came the data
     in the table specified by table_name in the database specified
     by db_name.
+
+    The list is read from the catalog written when the table was built,
+    and kept by the catalog cache until the database changes.
     """
+    return _global_catalog_cache.sources(db_name, table_name)
+
+
+def _get_parameters_from_db(db_name, cmd, char_tuple):
+    """
+    Query the database db_name with the SELECT statement cmd (reading the
+    columns in parameter_columns) and the tuple of variables char_tuple.
+    Returns a list of LazyParameters alphabetized by name (case
+    insensitive)
+    """
+
     if not os.path.exists(db_name):
-        raise RuntimeError("Database %s does not exist" % db_name)
-    if ')' in table_name:
-        raise RuntimeError("%S is not a valid table_name" % table_name)
+        raise RuntimeError("Database %s does not exists" % db_name)
 
-    cursor = _global_connection_cache.connect(db_name).cursor()
-    cursor.execute("SELECT DISTINCT source FROM %s" % table_name)
-    raw_results = cursor.fetchall()
-    return sorted([str(rr[0]) for rr in raw_results], key=lambda s: s.lower())
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _lazy_parameter_factory
+        cursor.execute(cmd, char_tuple)
+        results = cursor.fetchall()
+
+    return sorted(results, key=lambda pp: pp.name.lower())
+
+
+def _normalized_select(select_list=None):
+    """
+    Return the beginning of a SELECT statement (up to and including a WHERE
+    clause selecting a model version, whose name is the first value to
+    bind) reading the columns in parameter_columns straight from
+    records_table (aliased 'p') and the lookup tables, for queries that need
+    columns the version's view does not expose.  select_list replaces the
+    columns read if it is not None (e.g. 'p.id').
+    """
+    if select_list is None:
+        select_list = "p.name, p.defaultValue, p.upperValue, " \
+                      "p.lowerValue, u.units, p.docstring, s.source"
+    return "SELECT %s " % select_list \
+        + "FROM %s m JOIN %s p ON p.id = m.record_id " \
+          % (membership_table, records_table) \
+        + "LEFT JOIN %s u ON u.id = p.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = p.source_id " % sources_table \
+        + "WHERE m.version = ?"
 
 
-def _get_parameters_from_db(db_name, table_name, where_statement, char_tuple):
+def _xml_values(xml_list):
     """
-    Query the database db_name and table table_name according to the where
-    statement specified by the string where_statement and the tuple of
-    variables char_tuple.  Returns a lit of Parameter objects alphabetized by
-    name (case insensitive)
+    Return the list of values to bind for the .xml files in xml_list (which
+    may be None)
     """
+    if xml_list is None:
+        return []
+    return ["{}".format(xml_file) for xml_file in xml_list]
+
 
-    if where_statement.count('?') != len(char_tuple):
-        raise RuntimeError("Something is wrong\n" +
-                           "You did not pass as many strings as placeholders \n" +
-                           "In your WHERE statement in _get_paramters_from_db")
+def _source_filter(n_xml):
+    """
+    Return an SQL condition limiting a query built on _normalized_select to
+    n_xml .xml files (an empty string if n_xml is 0)
+    """
+    if n_xml == 0:
+        return ""
+    return " AND s.source IN (%s)" % ", ".join(["?"]*n_xml)
 
+
+def _fulltext_match_expression(keyword_list):
+    """
+    Convert a list of keywords into an FTS5 match expression which matches
+    any of the keywords (or any word starting with one of them).  Each
+    keyword is quoted so that characters with a meaning in the FTS5 query
+    syntax are searched for literally.
+    """
+    term_list = []
+    for kw in keyword_list:
+        if len(kw.strip()) > 0:
+            term_list.append('"%s"*' % kw.replace('"', '""'))
+    return " OR ".join(term_list)
+
+
+@cached_statement
+def _fulltext_sql(n_xml):
+    """
+    Return the statement run by _fulltext_query for n_xml .xml files; the
+    values to bind are the match expression, the model version and the
+    .xml files
+    """
+    fts = fts_table
+    cmd = "SELECT p.name, p.defaultValue, p.upperValue, p.lowerValue, " \
+        + "u.units, p.docstring, s.source, bm25(%s, 10.0, 1.0) AS rank, " % fts \
+        + "snippet(%s, -1, '[', ']', '...', 12) " % fts \
+        + "FROM %s JOIN %s p ON p.id = %s.rowid " \
+          % (fts, records_table, fts) \
+        + "JOIN %s m ON m.record_id = p.id " % membership_table \
+        + "LEFT JOIN %s u ON u.id = p.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = p.source_id " % sources_table \
+        + "WHERE %s MATCH ? AND m.version = ?" % fts \
+        + _source_filter(n_xml) \
+        + " ORDER BY rank, p.name COLLATE NOCASE"
+    return cmd
+
+
+def _fulltext_query(db_name, table_name, keyword_list, xml_list):
+    """
+    Run keyword_query in 'fulltext' mode against the FTS5 index of the
+    records, keeping those in the model version table_name.  Returns a list
+    of RankedParameters ordered by relevance.
+    """
     if not os.path.exists(db_name):
         raise RuntimeError("Database %s does not exists" % db_name)
 
-    cmd = "SELECT * from %s" % table_name
+    fts = fts_table
+    match_expression = _fulltext_match_expression(keyword_list)
 
-    cursor = _global_connection_cache.connect(db_name).cursor()
+    xml_values = _xml_values(xml_list)
+    list_of_chars = [match_expression, table_name] + xml_values
+    cmd = _fulltext_sql(len(xml_values))
 
-    cmd+=where_statement
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE name=?", (fts,))
+        if len(cursor.fetchall()) == 0 or not _is_view(cursor, table_name):
+            raise RuntimeError("%s has no full-text index; " % table_name
+                               + "rebuild it to use 'fulltext' mode")
 
-    cursor.execute(cmd, char_tuple)
-    results = cursor.fetchall()
-    return [_convert_row_to_parameter(rr)
-            for rr in sorted(results, key=lambda rr: rr[0].lower())]
+        if len(match_expression) == 0:
+            return []
+
+        cursor.execute(cmd, tuple(list_of_chars))
+        results = cursor.fetchall()
+
+    output = []
+    for row in results:
+        param = _convert_row_to_parameter(row)
+        output.append(RankedParameter(param.name, rank=row[7],
+                                      snippet=row[8], doc=param.doc,
+                                      units=param.units, values=param.values,
+                                      source=param.source))
+    return output
+
+
+@cached_statement
+def _keyword_condition_sql(n_keywords, n_xml):
+    """
+    Return the SQL condition built by _keyword_condition for n_keywords
+    keywords and n_xml .xml files
+    """
+    if n_keywords == 0:
+        raise RuntimeError("keyword_list must contain at least one keyword")
+
+    like_statement = "( " \
+        + " OR ".join(["name LIKE ? OR docstring like ?"]*n_keywords) + " )"
+
+    if n_xml==1:
+        like_statement += " AND source = ?"
+    elif n_xml>1:
+        like_statement += " AND ( " + " OR ".join(["source = ?"]*n_xml) + " )"
+
+    return like_statement
 
 
-def keyword_query(db_name, table_name, keyword_list, xml_list=None):
+def _keyword_condition(keyword_list, xml_list):
+    """
+    Return the SQL condition used by keyword_query in 'substring' mode to
+    select the Parameters whose names or docstrings contain one of the
+    keywords in keyword_list (and, if xml_list is not None or empty, which
+    come from one of the .xml files in xml_list), along with the list of
+    values to bind.  The condition is the same string for every call with
+    the same number of keywords and .xml files.
+    """
+    list_of_chars = []
+    for kw in keyword_list:
+        pattern = "%{}%".format(kw)
+        list_of_chars.append(pattern)
+        list_of_chars.append(pattern)
+    xml_values = _xml_values(xml_list)
+    list_of_chars.extend(xml_values)
+
+    return (_keyword_condition_sql(len(keyword_list), len(xml_values)),
+            list_of_chars)
+
+
+@cached_statement
+def _keyword_query_sql(table_name, n_keywords, n_xml):
+    """
+    Return the statement run by keyword_query in 'substring' mode against
+    the table table_name for n_keywords keywords and n_xml .xml files
+    """
+    return "SELECT %s from %s WHERE " % (", ".join(parameter_columns),
+                                         table_name) \
+        + _keyword_condition_sql(n_keywords, n_xml)
+
+
+@cached_query
+def keyword_query(db_name, table_name, keyword_list, xml_list=None,
+                  mode='substring'):
     """
     Query the database db_name and table table_name for all Parameters
     whose names or docstrings contain one of the keywords specified in
-    keyword_list.  Returns a list of Parameter objects.  Parameters are
-    alphabetized by name (case-insensitive).
+    keyword_list.  Returns a list of Parameter objects (LazyParameters, or
+    RankedParameters in the ranked modes).  Parameters are alphabetized by
+    name (case-insensitive).
 
     Option to limit search to data from .xml files specified in
     xml_list.
+
+    mode selects how keywords are matched:
+
+    'substring' (default) -- a keyword matches anywhere inside a name or
+    docstring, ignoring case (so 'red' matches 'desired')
+
+    'fulltext' -- uses the version's FTS5 index.  A keyword matches whole
+    words in a name or docstring, or the start of a word (so 'red' matches
+    'redshift' but not 'desired'; a keyword of several words matches that
+    phrase).  Results are RankedParameters ordered by relevance (BM25, with
+    matches in the name weighted above matches in the docstring) rather
+    than alphabetically.
+
+    'token' -- runs token_query with its default options: keywords match
+    the camelCase/underscore/digit tokens of the names, tolerating typos.
+    Results are RankedParameters ordered by relevance.
     """
 
-    like_statement = None
-    formatted_kw_list = []
-    list_of_chars = []
-    for kw in keyword_list:
-        list_of_chars.append("%{}%".format(kw))
-        list_of_chars.append("%{}%".format(kw))
-        if like_statement is None:
-            like_statement = " WHERE ( name LIKE ? OR docstring like ?"
-        else:
-            like_statement += " OR name LIKE ? OR docstring like ?"
-    like_statement += " )"
+    if mode == 'fulltext':
+        return _fulltext_query(db_name, table_name, keyword_list, xml_list)
+    elif mode == 'token':
+        return token_query(db_name, table_name, keyword_list,
+                           xml_list=xml_list)
+    elif mode != 'substring':
+        raise RuntimeError("%s is not a valid keyword_query mode" % mode)
+
+    like_statement, list_of_chars = _keyword_condition(keyword_list, xml_list)
+    cmd = _keyword_query_sql(table_name, len(keyword_list),
+                             len(_xml_values(xml_list)))
+    return _get_parameters_from_db(db_name, cmd, tuple(list_of_chars))
 
-    if xml_list is not None and len(xml_list)>0:
-        if len(xml_list)==1:
-            like_statement += " AND source = ?"
-            list_of_chars.append("{}".format(xml_list[0]))
-        else:
-            like_statement += " AND ( source = ?"
-            list_of_chars.append("{}".format(xml_list[0]))
 
-            for xml_file in xml_list[1:]:
-                like_statement += " OR source = ?"
-                list_of_chars.append("{}".format(xml_file))
-            like_statement += " )"
+# the largest number of names name_query binds in a single IN list; well
+# below the limit of 999 bound variables in older SQLite libraries
+name_query_chunk_size = 500
 
-    return _get_parameters_from_db(db_name, table_name,
-                                   like_statement, tuple(list_of_chars))
 
+@cached_statement
+def _name_query_sql(table_name, n_names):
+    """
+    Return the statement run by name_query against the table table_name to
+    look up n_names names
+    """
+    return "SELECT %s from %s WHERE name IN (%s)" \
+           % (", ".join(parameter_columns), table_name,
+              ", ".join(["?"]*n_names))
 
+
+@cached_query
 def name_query(db_name, table_name, param_name_list):
     """
     Query the database db_name and table table_name for all Parameters whose
     names are specified by the list param_name_list.  Returns a list of Parameter
-    objects.  Parameters are alphabetized by name (case-insensitive).
+    objects (LazyParameters).  Parameters are alphabetized by name
+    (case-insensitive).
+
+    param_name_list may be arbitrarily long: the names are looked up
+    name_query_chunk_size at a time with IN lists, each of which is answered
+    from the index on the names.
     """
 
     if len(param_name_list)==0:
         return []
 
-    list_of_chars = []
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
 
-    where_statement = None
+    name_list = []
+    name_set = set()
     for param_name in param_name_list:
-        list_of_chars.append("{}".format(param_name))
-        if where_statement is None:
-            where_statement = " WHERE name = ?"
-        else:
-            where_statement += "OR name =?"
+        param_name = "{}".format(param_name)
+        if param_name not in name_set:
+            name_set.add(param_name)
+            name_list.append(param_name)
+
+    results = []
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _lazy_parameter_factory
+        for i_start in range(0, len(name_list), name_query_chunk_size):
+            chunk = name_list[i_start:i_start+name_query_chunk_size]
+            cursor.execute(_name_query_sql(table_name, len(chunk)),
+                           tuple(chunk))
+            results.extend(cursor.fetchall())
+
+    return sorted(results, key=lambda pp: pp.name.lower())
+
+
+@cached_statement
+def _range_sql(field, has_lo, has_hi, n_xml):
+    """
+    Return the statement run by range_query on the value field, with a lower
+    and/or upper bound as indicated by has_lo and has_hi, for n_xml .xml
+    files.  The values to bind are the model version, the bounds and the
+    .xml files.
+    """
+    column = "p.%s" % numeric_column(field)
+    cmd = _normalized_select() + " AND %s IS NOT NULL" % column
+    if has_lo:
+        cmd += " AND %s >= ?" % column
+    if has_hi:
+        cmd += " AND %s <= ?" % column
+    cmd += _source_filter(n_xml)
+    cmd += " ORDER BY p.name COLLATE NOCASE"
+    return cmd
+
+
+@cached_query
+def range_query(db_name, table_name, field, lo, hi, xml_list=None):
+    """
+    Query the database db_name and table table_name for all Parameters
+    whose value field (one of 'defaultValue', 'upperValue', 'lowerValue')
+    is a number between lo and hi (inclusive).  Either bound may be None to
+    leave that end of the range open.  Values which are not numbers (e.g.
+    'TBD', or missing values) never match.  Returns a list of Parameter
+    objects (LazyParameters).  Parameters are alphabetized by name
+    (case-insensitive).
+
+    Option to limit search to data from .xml files specified in
+    xml_list.
+
+    The comparison runs in SQLite against the indexed numeric copies of the
+    values stored when the version was loaded, so it is only available for
+    versions loaded by this version of syseng_db.
+    """
+
+    if field not in value_columns:
+        raise RuntimeError("%s is not one of %s" % (field, str(value_columns)))
+
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    list_of_chars = [table_name]
+    if lo is not None:
+        list_of_chars.append(float(lo))
+    if hi is not None:
+        list_of_chars.append(float(hi))
+    xml_values = _xml_values(xml_list)
+    list_of_chars.extend(xml_values)
+    cmd = _range_sql(field, lo is not None, hi is not None, len(xml_values))
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        if not _is_view(cursor, table_name):
+            raise RuntimeError("%s has no numeric values; " % table_name
+                               + "rebuild it to use range_query")
+
+        cursor.row_factory = _lazy_parameter_factory
+        cursor.execute(cmd, tuple(list_of_chars))
+        results = cursor.fetchall()
+
+    return results
+
+
+# the smallest similarity (see ParameterDB_tokens) at which token_query
+# takes a token to be a misspelling of a keyword
+token_similarity_threshold = 0.4
+
+# the largest number of tokens token_query tries for each token of the
+# keywords (the best-scoring ones are kept)
+token_candidate_limit = 100
+
+
+@cached_statement
+def _trigram_sql(n_trigrams):
+    """
+    Return the statement counting, for every token sharing at least one of
+    n_trigrams trigrams, how many it shares; the values to bind are the
+    trigrams and the smallest count of interest
+    """
+    return "SELECT token, count(*) FROM %s WHERE trigram IN (%s) " \
+           % (trigram_table, ", ".join(["?"]*n_trigrams)) \
+        + "GROUP BY token HAVING count(*) >= ?"
+
+
+@cached_statement
+def _token_query_sql(n_xml, has_limit):
+    """
+    Return the statement scoring and reading the Parameters of a model
+    version for token_query, keeping those from n_xml .xml files and, if
+    has_limit is True, only the best ones.  The values to bind are a JSON
+    array of [keyword token index, token, score] candidates (see
+    _token_candidates), the version, the .xml files and the limit.
+
+    Each record's score is the sum over the keyword tokens of its best
+    candidate token, plus 0.1 times the share of its tokens that matched.
+    """
+    cmd = "WITH candidates(keyword, token, score) AS " \
+        + "(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), " \
+        + "json_extract(value, '$[2]') FROM json_each(?)), " \
+        + "hits(record_id, n_tokens, score) AS " \
+        + "(SELECT t.record_id, t.n_tokens, max(c.score) FROM candidates c " \
+        + "JOIN %s t ON t.token = c.token " % token_table \
+        + "JOIN %s m ON m.record_id = t.record_id " % membership_table \
+        + "WHERE m.version = ? GROUP BY t.record_id, c.keyword) " \
+        + "SELECT p.name, p.defaultValue, p.upperValue, p.lowerValue, " \
+        + "u.units, p.docstring, s.source, " \
+        + "sum(h.score) + 0.1*count(*)/h.n_tokens AS score " \
+        + "FROM hits h JOIN %s p ON p.id = h.record_id " % records_table \
+        + "LEFT JOIN %s u ON u.id = p.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = p.source_id " % sources_table
+    if n_xml > 0:
+        cmd += "WHERE s.source IN (%s) " % ", ".join(["?"]*n_xml)
+    cmd += "GROUP BY h.record_id " \
+        + "ORDER BY score DESC, p.name COLLATE NOCASE, p.name, h.record_id"
+    if has_limit:
+        cmd += " LIMIT ?"
+    return cmd
+
+
+def _token_candidates(cursor, keyword_token, fuzzy):
+    """
+    Return a dict mapping the indexed tokens which match keyword_token to
+    their scores: 1 for the token itself, between 0.5 and 0.9 for tokens it
+    is the beginning of (at least two characters long), and 0.8 times the
+    similarity for tokens at least token_similarity_threshold similar to it
+    (if fuzzy is True; keywords of three characters or more).  Only the
+    token_candidate_limit best-scoring tokens are kept.
+    """
+    scores = {keyword_token: 1.0}
+
+    if len(keyword_token) >= 2:
+        # every token starting with keyword_token has the trigram made of
+        # the padding and its first character, and (as tokens only contain
+        # lower-case letters and digits) sorts before this upper bound
+        upper = keyword_token[:-1] + chr(ord(keyword_token[-1])+1)
+        cursor.execute("SELECT token FROM %s WHERE trigram = ? AND token > ? "
+                       "AND token < ?" % trigram_table,
+                       ("  " + keyword_token[0], keyword_token, upper))
+        for row in cursor.fetchall():
+            token = str(row[0])
+            scores[token] = 0.5 + 0.4*len(keyword_token)/float(len(token))
+
+    if fuzzy and len(keyword_token) >= 3:
+        keyword_trigrams = _trigrams(keyword_token)
+        min_shared = int(token_similarity_threshold*len(keyword_trigrams))
+        cursor.execute(_trigram_sql(len(keyword_trigrams)),
+                       tuple(keyword_trigrams) + (max(min_shared, 1),))
+        for row in cursor.fetchall():
+            token = str(row[0])
+            similarity = _similarity(keyword_trigrams, token)
+            if similarity >= token_similarity_threshold:
+                scores[token] = max(scores.get(token, 0.0), 0.8*similarity)
+
+    if len(scores) > token_candidate_limit:
+        best = sorted(scores, key=lambda token: -scores[token])
+        scores = dict([(token, scores[token])
+                       for token in best[:token_candidate_limit]])
+    return scores
+
+
+@cached_query
+def token_query(db_name, table_name, keyword_list, xml_list=None,
+                fuzzy=True, limit=100):
+    """
+    Query the database db_name and table table_name for the Parameters
+    whose names contain the tokens of the keywords in keyword_list, using
+    the token index built when the version was loaded (see
+    ParameterDB_tokens).  Names and keywords alike are split on camelCase,
+    underscores and digits, so 'settle time', 'settleTime' and
+    'settle_time' all find slewSettle_time.  A keyword token also matches
+    the tokens it is the beginning of ('sett' finds 'settle') and, if fuzzy
+    is True, tokens it is a misspelling of ('setle', 'setlte').
+
+    Each Parameter is scored by adding up, for each keyword token, its best
+    match among the Parameter's tokens (1 for an exact match, less for a
+    prefix or a misspelling), plus a little for the share of its name's
+    tokens that matched.  Returns a list of at most limit (all of them if
+    None) RankedParameters, best first, whose rank is the negated score and
+    whose snippet is the name with the matching tokens in [brackets].
+
+    Option to limit search to data from .xml files specified in
+    xml_list.
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    keyword_tokens = []
+    for kw in keyword_list:
+        for token in name_tokens(kw):
+            if token not in keyword_tokens:
+                keyword_tokens.append(token)
+
+    xml_values = _xml_values(xml_list)
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE name=?",
+                       (token_table,))
+        if len(cursor.fetchall()) == 0 or not _is_view(cursor, table_name):
+            raise RuntimeError("%s has no token index; " % table_name
+                               + "rebuild it to use token_query")
+
+        if len(keyword_tokens) == 0:
+            return []
+
+        candidate_list = [_token_candidates(cursor, token, fuzzy)
+                          for token in keyword_tokens]
+        candidate_json = json.dumps([[ii, token, score]
+                                     for ii, candidates
+                                     in enumerate(candidate_list)
+                                     for token, score in candidates.items()])
+
+        list_of_chars = [candidate_json, table_name] + xml_values
+        if limit is not None:
+            list_of_chars.append(limit)
+        cursor.execute(_token_query_sql(len(xml_values), limit is not None),
+                       tuple(list_of_chars))
+        results = cursor.fetchall()
 
-    return _get_parameters_from_db(db_name, table_name,
-                                   where_statement, tuple(list_of_chars))
+    token_set = set([token for candidates in candidate_list
+                     for token in candidates])
+    output = []
+    for row in results:
+        param = _convert_row_to_parameter(row)
+        output.append(RankedParameter(param.name, rank=-row[7],
+                                      snippet=_highlight(param.name, token_set),
+                                      doc=param.doc, units=param.units,
+                                      values=param.values,
+                                      source=param.source))
+    return output
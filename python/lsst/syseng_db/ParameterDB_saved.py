@@ -0,0 +1,271 @@
+"""
+Saved queries: named queries (e.g. the pages of the web interface) which
+are evaluated once per model version when the version is loaded, rather
+than every time they are asked for.  The registry of saved queries is a
+JSON file mapping each name to its definition, which is either a search
+in the query language of ParameterDB_search, optionally limited to some
+.xml files,
+
+    {"throughput": {"search": "throughput"},
+     "optical_system_m1": {"search": "m1",
+                           "xml_list": ["Telescope Requirements_v1.xml"]},
+     "key_numbers": {"key_numbers": "../web_interface/key_numbers.txt"}}
+
+or a key numbers file (see ParameterDB_keys; relative paths are taken
+from the directory of the registry).  A family of searches differing only
+in their search term can be listed as one entry with 'search_each',
+
+    {"optical_system": {"search_each": ["m1", "m2"],
+                        "xml_list": ["Telescope Requirements_v1.xml"]}}
+
+which stands for the searches "optical_system_m1" ({"search": "m1",
+"xml_list": [...]}) and "optical_system_m2".  read_saved_queries reads the
+registry.  db_from_xml_files(..., saved_queries=...) materializes the
+result of every saved query for the version it builds, in the same
+transaction as the build, into saved_queries_table and saved_results_table
+(see ParameterDB_schema), and saved_query reads a materialized result back
+with a single indexed lookup.
+
+Any build of a version which does not materialize the saved queries
+forgets the results saved for it, so saved_query never returns results
+that are out of date; callers can fall back on the live query.
+"""
+
+import os
+import json
+
+from ParameterDB_schema import records_table, sources_table, units_table
+from ParameterDB_schema import saved_queries_table, saved_results_table
+from ParameterDB_cache import cached_query
+from ParameterDB_query import _global_connection_pool, _is_view
+from ParameterDB_query import _lazy_parameter_factory, _normalized_select
+from ParameterDB_query import _source_filter, _xml_values
+from ParameterDB_query import name_query_chunk_size
+from ParameterDB_search import compile_search
+from ParameterDB_keys import read_key_numbers
+
+__all__ = ["read_saved_queries", "saved_query", "saved_query_names"]
+
+
+def read_saved_queries(file_name):
+    """
+    Read the registry of saved queries file_name (see the module docstring).
+    Returns a dict mapping the name of each saved query to its definition,
+    with 'search_each' entries expanded into one search per term and key
+    numbers files replaced by the list of (name, .xml file) keys they
+    contain.  Raises a RuntimeError if a definition cannot be used.
+    """
+    with open(file_name, 'r') as input_file:
+        registry = json.load(input_file)
+
+    root_dir = os.path.dirname(os.path.abspath(file_name))
+    query_dict = {}
+    for name in registry:
+        definition = registry[name]
+        if not isinstance(definition, dict):
+            raise RuntimeError("Saved query %s in %s is not a JSON object"
+                               % (name, file_name))
+        if 'search' in definition:
+            compile_search(definition['search'])
+            query_dict[str(name)] = definition
+        elif 'search_each' in definition:
+            for term in definition['search_each']:
+                compile_search(term)
+                search = dict(definition)
+                del search['search_each']
+                search['search'] = term
+                query_dict[str(name) + '_' + str(term)] = search
+        elif 'key_numbers' in definition:
+            key_file = os.path.join(root_dir, definition['key_numbers'])
+            query_dict[str(name)] = {'key_numbers': read_key_numbers(key_file)}
+        else:
+            raise RuntimeError("Saved query %s in %s has none of 'search', "
+                               "'search_each' and 'key_numbers'"
+                               % (name, file_name))
+    return query_dict
+
+
+def _create_saved_tables(cursor):
+    """
+    Create saved_queries_table and saved_results_table in the database
+    connected to cursor, if they do not exist yet
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS %s (version text, name text, "
+                   "definition text, n_results int, "
+                   "PRIMARY KEY (version, name))" % saved_queries_table)
+    cursor.execute("CREATE TABLE IF NOT EXISTS %s (version text, name text, "
+                   "position int, record_id int, "
+                   "PRIMARY KEY (version, name, position)) WITHOUT ROWID"
+                   % saved_results_table)
+
+
+def _forget_saved_queries(cursor, table_name):
+    """
+    Delete the results saved for the model version table_name, if any
+    """
+    for saved_table in (saved_queries_table, saved_results_table):
+        cursor.execute("SELECT name FROM sqlite_master WHERE name=?",
+                       (saved_table,))
+        if len(cursor.fetchall()) > 0:
+            cursor.execute("DELETE FROM %s WHERE version=?" % saved_table,
+                           (table_name,))
+
+
+def _search_record_ids(cursor, table_name, definition):
+    """
+    Return the ids in records_table of the results of the search
+    definition, alphabetized by name (case-insensitive) as in search_query
+    """
+    condition, condition_chars = compile_search(definition['search'])
+    xml_values = _xml_values(definition.get('xml_list'))
+    cursor.execute(_normalized_select('p.id') + " AND " + condition
+                   + _source_filter(len(xml_values))
+                   + " ORDER BY p.name COLLATE NOCASE",
+                   tuple([table_name] + condition_chars + xml_values))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _key_record_ids(cursor, table_name, key_list):
+    """
+    Return the ids in records_table of the results of the key numbers
+    key_list, in the order of key_list as in key_numbers_query
+    """
+    name_list = []
+    for name, source in key_list:
+        if name not in name_list:
+            name_list.append(name)
+
+    found = {}
+    for i_start in range(0, len(name_list), name_query_chunk_size):
+        chunk = name_list[i_start:i_start+name_query_chunk_size]
+        cursor.execute(_normalized_select('p.id, p.name, s.source')
+                       + " AND p.name IN (%s)" % ",".join(["?"]*len(chunk)),
+                       tuple([table_name] + chunk))
+        for record_id, name, source in cursor.fetchall():
+            if source is not None:
+                source = os.path.basename(source)
+            found.setdefault((name, source), []).append(record_id)
+
+    output = []
+    for key in key_list:
+        output.extend(found.pop(tuple(key), []))
+    return output
+
+
+def _materialize_saved_queries(cursor, table_name, query_dict):
+    """
+    Evaluate every saved query in query_dict (as returned by
+    read_saved_queries) against the model version table_name and store the
+    results in saved_queries_table and saved_results_table, replacing
+    whatever was saved for table_name before.  Only runs DML statements,
+    so that it can be part of the transaction of a build; the tables must
+    already exist (see _create_saved_tables).  Does not commit.
+    """
+    if not _is_view(cursor, table_name):
+        raise RuntimeError("Saved queries cannot be materialized for %s; "
+                           % table_name + "rebuild it to use them")
+
+    _forget_saved_queries(cursor, table_name)
+
+    for name in sorted(query_dict):
+        definition = query_dict[name]
+        if 'search' in definition:
+            id_list = _search_record_ids(cursor, table_name, definition)
+        else:
+            id_list = _key_record_ids(cursor, table_name,
+                                      definition['key_numbers'])
+
+        cursor.execute("INSERT INTO %s VALUES(?, ?, ?, ?)"
+                       % saved_queries_table,
+                       (table_name, name, json.dumps(definition, sort_keys=True),
+                        len(id_list)))
+        cursor.executemany("INSERT INTO %s VALUES(?, ?, ?, ?)"
+                           % saved_results_table,
+                           [(table_name, name, position, record_id)
+                            for position, record_id in enumerate(id_list)])
+
+
+def _saved_query_sql():
+    """
+    Return the statement reading the results saved for one (version, name)
+    in order, with the columns in parameter_columns
+    """
+    return "SELECT p.name, p.defaultValue, p.upperValue, p.lowerValue, " \
+        + "u.units, p.docstring, s.source " \
+        + "FROM %s r JOIN %s p ON p.id = r.record_id " \
+          % (saved_results_table, records_table) \
+        + "LEFT JOIN %s u ON u.id = p.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = p.source_id " % sources_table \
+        + "WHERE r.version = ? AND r.name = ? ORDER BY r.position"
+
+
+def _has_saved_tables(cursor):
+    """
+    Return True if the database connected to cursor has saved_queries_table
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE name=?",
+                   (saved_queries_table,))
+    return len(cursor.fetchall()) > 0
+
+
+@cached_query
+def saved_query_names(db_name, table_name):
+    """
+    Return the sorted list of the names of the saved queries materialized
+    for the model version table_name in the database db_name
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        if not _has_saved_tables(cursor):
+            return []
+        cursor.execute("SELECT name FROM %s WHERE version=? ORDER BY name"
+                       % saved_queries_table, (table_name,))
+        return [str(row[0]) for row in cursor.fetchall()]
+
+
+@cached_query
+def saved_query(db_name, table_name, name, definition=None):
+    """
+    Return the results of the saved query name, as materialized for the
+    model version table_name of the database db_name when it was loaded: a
+    list of Parameter objects (LazyParameters) in the order the query
+    returned them.
+
+    If definition (as returned by read_saved_queries) is given, the results
+    are only returned if they were materialized for that very definition,
+    so that a caller whose idea of the query has changed since the version
+    was loaded (e.g. an edited key numbers file) does not get stale results.
+
+    Raises a RuntimeError if name has not been materialized for table_name
+    (e.g. because the version was loaded without the registry of saved
+    queries), or was materialized for another definition; callers can then
+    fall back on the live query.
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        if _has_saved_tables(cursor):
+            cursor.execute("SELECT definition FROM %s WHERE version=? AND name=?"
+                           % saved_queries_table, (table_name, name))
+            saved = cursor.fetchall()
+        else:
+            saved = []
+        if len(saved) == 0:
+            raise RuntimeError("%s has not been saved for %s"
+                               % (name, table_name))
+        stored_definition = saved[0][0]
+        if definition is not None and \
+           stored_definition != json.dumps(definition, sort_keys=True):
+            raise RuntimeError("%s was saved for %s with another definition"
+                               % (name, table_name))
+
+        cursor.row_factory = _lazy_parameter_factory
+        cursor.execute(_saved_query_sql(), (table_name, name))
+        results = cursor.fetchall()
+
+    return results
@@ -0,0 +1,92 @@
+"""
+Names of the tables that syseng_db keeps in a parameter database.  Each
+model version is presented to users as a view (named after the version)
+with the columns
+
+name, defaultValue, upperValue, lowerValue, units, docstring, source
+
+Parameters which are identical in several versions are only stored once.
+Every distinct Parameter is a row of records_table, identified by a hash
+of its contents, and membership_table lists the records belonging to each
+version.  records_table refers to the shared lookup tables sources_table
+and units_table by integer key and is indexed for full-text search by
+fts_table, and for token search by token_table and trigram_table.  The
+results of saved queries are kept in saved_queries_table and
+saved_results_table, and catalog_table describes each version.  All of
+these tables start with internal_prefix so that they can be told apart
+from model versions.
+
+Databases written before the views were introduced store each version as a
+plain table with the columns above; the query functions accept both.
+"""
+
+__all__ = ["internal_prefix", "manifest_table", "sources_table",
+           "units_table", "records_table", "membership_table", "fts_table",
+           "fts_content_view", "token_table", "trigram_table",
+           "saved_queries_table", "saved_results_table", "catalog_table",
+           "is_internal_table", "parameter_columns", "value_columns",
+           "numeric_column"]
+
+internal_prefix = "syseng_"
+
+# one row per (version, .xml file) recording the hash of the file's contents
+manifest_table = internal_prefix + "manifest"
+
+# lookup tables shared by all versions: (id INTEGER PRIMARY KEY, <value>)
+sources_table = internal_prefix + "sources"
+units_table = internal_prefix + "units"
+
+# one row per distinct Parameter, keyed by id and unique on content_hash
+records_table = internal_prefix + "records"
+
+# one row per (version, record_id) for each Parameter in each version
+membership_table = internal_prefix + "membership"
+
+# FTS5 index over the names and docstrings in records_table, and the view
+# it reads them from (with the 'NULL' placeholder docstrings blanked out)
+fts_table = internal_prefix + "fts"
+fts_content_view = internal_prefix + "fts_content"
+
+# one row per (token, record_id, n_tokens) for each of the distinct tokens
+# of the name of each record (see ParameterDB_tokens), n_tokens being the
+# number of them, and one row per (trigram, token) for each distinct token
+# in token_table
+token_table = internal_prefix + "tokens"
+trigram_table = internal_prefix + "trigrams"
+
+# one row per (version, name, definition, n_results) for each saved query
+# (see ParameterDB_saved) evaluated against each version, and one row per
+# (version, name, position, record_id) for each of its results, in order
+saved_queries_table = internal_prefix + "saved_queries"
+saved_results_table = internal_prefix + "saved_results"
+
+# one row per version stored as a view, written whenever it is built:
+# (version, n_parameters, sources (a JSON list of the .xml files),
+# build_time (seconds since the epoch), content_hash (of its records))
+catalog_table = internal_prefix + "catalog"
+
+# the columns of a model version, in order
+parameter_columns = ("name", "defaultValue", "upperValue", "lowerValue",
+                     "units", "docstring", "source")
+
+# the text columns holding a Parameter's values; records_table also stores
+# each of them parsed as a REAL in numeric_column(column)
+value_columns = ("defaultValue", "upperValue", "lowerValue")
+
+
+def numeric_column(column):
+    """
+    Return the name of the REAL column of records_table holding the numeric
+    value of the text column column (one of value_columns).  It is NULL
+    where the text is not a number.
+    """
+    return column + "_num"
+
+
+def is_internal_table(table_name):
+    """
+    Return True if table_name is one of the bookkeeping tables maintained by
+    syseng_db (or by SQLite itself) rather than a model version.
+    """
+    return table_name.startswith(internal_prefix) or \
+           table_name.startswith("sqlite_")
@@ -0,0 +1,305 @@
+"""
+A small query language for finding Parameters, compiled to a single
+parameterized SQL statement.  A query is made of terms combined with AND,
+OR and NOT (in capitals) and parentheses; terms written next to each other
+must all match, as if joined by AND.  NOT binds tighter than AND, which
+binds tighter than OR.  The terms are
+
+    velocity           a word (or "a quoted phrase") found anywhere in the
+                       name or docstring, as keyword_query does in
+                       'substring' mode
+    name:m1            the name contains m1 (ignoring case)
+    name:m1*           the name starts with m1 (ignoring case)
+    name=m1OuterCa     the name is exactly m1OuterCa (!= for the opposite)
+    doc:, source:, units:
+                       the same for the docstring, the .xml file and the
+                       units; 'docstring' may be written for 'doc'
+    upper > 10         the upperValue is a number greater than 10; the
+                       value fields are default (or defaultValue), upper
+                       (upperValue) and lower (lowerValue), and the
+                       comparisons <, <=, >, >=, = and !=
+
+so that, for example,
+
+    name:m1* AND (doc:asphere OR units:mm) NOT source:"Camera Requirements_v1.xml"
+
+finds the Parameters whose names start with m1, whose docstrings mention
+'asphere' or whose units contain 'mm', and which do not come from the
+camera requirements.
+
+The statement reads the normalized tables behind the model versions
+directly, so exact matches use the indexes on the names and sources,
+prefixes use the case-insensitive index on the names, and comparisons use
+the indexes on the numeric values.
+"""
+
+import os
+import re
+
+from ParameterDB_schema import numeric_column
+from ParameterDB_cache import cached_query
+from ParameterDB_query import _global_connection_pool, _is_view
+from ParameterDB_query import _lazy_parameter_factory, _normalized_select
+from ParameterDB_query import _source_filter, _xml_values
+
+__all__ = ["compile_search", "search_query"]
+
+
+# the SQL expression searched for each text field; missing docstrings,
+# units and sources are stored as the text 'NULL' and searched as empty
+_text_fields = {'name': "p.name",
+                'doc': "IFNULL(NULLIF(p.docstring, 'NULL'), '')",
+                'source': "IFNULL(NULLIF(s.source, 'NULL'), '')",
+                'units': "IFNULL(NULLIF(u.units, 'NULL'), '')"}
+
+_field_aliases = {'docstring': 'doc',
+                  'default': 'defaultValue',
+                  'upper': 'upperValue',
+                  'lower': 'lowerValue'}
+
+_numeric_fields = ('defaultValue', 'upperValue', 'lowerValue')
+
+_comparisons = {'<': '<', '<=': '<=', '>': '>', '>=': '>=', '=': '=',
+                '!=': '<>'}
+
+_token_pattern = re.compile(r'\s*(?:(?P<paren>[()])'
+                            r'|(?P<op>:|<=|>=|!=|<|>|=)'
+                            r'|"(?P<quoted>(?:[^"]|"")*)"'
+                            r'|(?P<word>[^\s()":<>=!]+))')
+
+
+def _tokenize(query_string):
+    """
+    Return the list of (kind, text) tuples making up query_string, kind
+    being 'paren', 'op', 'quoted' or 'word'
+    """
+    tokens = []
+    position = 0
+    query_string = query_string.rstrip()
+    while position < len(query_string):
+        match = _token_pattern.match(query_string, position)
+        if match is None:
+            raise RuntimeError("Cannot parse the query at '%s'"
+                               % query_string[position:].strip())
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'quoted':
+            text = text.replace('""', '"')
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """
+    Recursive-descent parser turning the tokens of a query into a tree of
+    tuples: ('or', a, b), ('and', a, b), ('not', a), ('text', value) for a
+    bare word or phrase, and ('field', field, op, value) for a field term
+    """
+
+    def __init__(self, tokens):
+        self._tokens = tokens
+        self._position = 0
+
+    def _peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self._position += 1
+        return token
+
+    def _is_keyword(self, token, keyword):
+        return token == ('word', keyword)
+
+    def parse(self):
+        if len(self._tokens) == 0:
+            raise RuntimeError("The query is empty")
+        tree = self._or()
+        if self._position < len(self._tokens):
+            raise RuntimeError("Unexpected '%s' in the query"
+                               % self._peek()[1])
+        return tree
+
+    def _or(self):
+        tree = self._and()
+        while self._is_keyword(self._peek(), 'OR'):
+            self._next()
+            tree = ('or', tree, self._and())
+        return tree
+
+    def _and(self):
+        tree = self._not()
+        while True:
+            token = self._peek()
+            if self._is_keyword(token, 'AND'):
+                self._next()
+            elif token[0] is None or token == ('paren', ')') \
+                 or self._is_keyword(token, 'OR'):
+                return tree
+            tree = ('and', tree, self._not())
+
+    def _not(self):
+        if self._is_keyword(self._peek(), 'NOT'):
+            self._next()
+            return ('not', self._not())
+        return self._atom()
+
+    def _atom(self):
+        kind, text = self._next()
+        if kind is None:
+            raise RuntimeError("The query ends unexpectedly")
+        if (kind, text) == ('paren', '('):
+            tree = self._or()
+            if self._next() != ('paren', ')'):
+                raise RuntimeError("Missing ')' in the query")
+            return tree
+        if kind == 'quoted':
+            return ('text', text)
+        if kind != 'word' or text in ('AND', 'OR', 'NOT'):
+            raise RuntimeError("Unexpected '%s' in the query" % text)
+
+        if self._peek()[0] != 'op':
+            return ('text', text)
+
+        op = self._next()[1]
+        value_kind, value = self._next()
+        if value_kind not in ('word', 'quoted'):
+            raise RuntimeError("Missing the value of %s%s in the query"
+                               % (text, op))
+        return ('field', text, op, value)
+
+
+def _like_pattern(value, prefix=False):
+    """
+    Return the LIKE pattern (escaped with backslashes) matching value
+    anywhere in a string, or at its beginning if prefix is True
+    """
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%') \
+                   .replace('_', '\\_')
+    if prefix:
+        return escaped + '%'
+    return '%' + escaped + '%'
+
+
+def _compile_field(field, op, value, list_of_chars):
+    """
+    Return the SQL condition for the term field op value, appending the
+    values to bind to list_of_chars
+    """
+    field = _field_aliases.get(field.lower(), field)
+    if field.lower() in _text_fields:
+        field = field.lower()
+        column = _text_fields[field]
+        if op == ':':
+            if field == 'name' and value.endswith('*') and len(value) > 1 \
+               and '*' not in value[:-1] and ord(value[-2]) < 127:
+                # a range on the case-insensitive index on the names
+                # finds the candidates; LIKE then checks them
+                prefix = value[:-1].lower()
+                upper = prefix[:-1] + chr(ord(prefix[-1])+1)
+                list_of_chars.extend([prefix, upper, _like_pattern(prefix,
+                                                                   prefix=True)])
+                return "(p.name COLLATE NOCASE >= ? AND " \
+                       "p.name COLLATE NOCASE < ? AND p.name LIKE ? ESCAPE '\\')"
+            if value.endswith('*') and len(value) > 1:
+                list_of_chars.append(_like_pattern(value[:-1], prefix=True))
+            else:
+                list_of_chars.append(_like_pattern(value))
+            return "%s LIKE ? ESCAPE '\\'" % column
+        if op in ('=', '!='):
+            list_of_chars.append(value)
+            if field == 'source':
+                column = "s.source"
+            elif field == 'units':
+                column = "u.units"
+            return "%s %s ?" % (column, _comparisons[op])
+        raise RuntimeError("%s can only be searched with ':', '=' or '!='"
+                           % field)
+
+    for numeric_field in _numeric_fields:
+        if field.lower() == numeric_field.lower():
+            if op not in _comparisons:
+                raise RuntimeError("%s can only be compared with "
+                                   "<, <=, >, >=, = or !=" % numeric_field)
+            try:
+                number = float(value)
+            except ValueError:
+                raise RuntimeError("%s is not a number" % value)
+            list_of_chars.append(number)
+            column = "p.%s" % numeric_column(numeric_field)
+            return "(%s IS NOT NULL AND %s %s ?)" % (column, column,
+                                                    _comparisons[op])
+
+    raise RuntimeError("%s is not a field that can be searched" % field)
+
+
+def _compile(tree, list_of_chars):
+    """
+    Return the SQL condition for the parse tree tree, appending the values
+    to bind to list_of_chars
+    """
+    if tree[0] in ('and', 'or'):
+        return "(%s %s %s)" % (_compile(tree[1], list_of_chars),
+                               tree[0].upper(),
+                               _compile(tree[2], list_of_chars))
+    if tree[0] == 'not':
+        return "NOT (%s)" % _compile(tree[1], list_of_chars)
+    if tree[0] == 'text':
+        pattern = _like_pattern(tree[1])
+        list_of_chars.extend([pattern, pattern])
+        return "(p.name LIKE ? ESCAPE '\\' OR %s LIKE ? ESCAPE '\\')" \
+               % _text_fields['doc']
+    return _compile_field(tree[1], tree[2], tree[3], list_of_chars)
+
+
+def compile_search(query_string):
+    """
+    Compile query_string, written in the query language described in the
+    module docstring, into an SQL condition on the columns selected by
+    search_query.  Returns the condition and the list of values to bind.
+    Raises a RuntimeError if the query cannot be parsed.
+    """
+    list_of_chars = []
+    tree = _Parser(_tokenize(query_string)).parse()
+    return _compile(tree, list_of_chars), list_of_chars
+
+
+@cached_query
+def search_query(db_name, table_name, query_string, xml_list=None):
+    """
+    Query the database db_name and table table_name for all Parameters
+    matching query_string, written in the query language described in the
+    module docstring (e.g. 'name:m1* AND upper > 10').  Returns a list of
+    LazyParameters alphabetized by name (case-insensitive).
+
+    Option to limit search to data from .xml files specified in
+    xml_list.
+
+    The whole query runs as a single SQL statement against the tables
+    behind the model versions, so it is only available for versions loaded
+    by this version of syseng_db.
+    """
+    condition, condition_chars = compile_search(query_string)
+
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exists" % db_name)
+
+    xml_values = _xml_values(xml_list)
+    cmd = _normalized_select() + " AND " + condition \
+        + _source_filter(len(xml_values)) + " ORDER BY p.name COLLATE NOCASE"
+
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        if not _is_view(cursor, table_name):
+            raise RuntimeError("%s cannot be searched with search_query; "
+                               % table_name + "rebuild it to use it")
+
+        cursor.row_factory = _lazy_parameter_factory
+        cursor.execute(cmd, tuple([table_name] + condition_chars
+                                  + xml_values))
+        results = cursor.fetchall()
+
+    return results
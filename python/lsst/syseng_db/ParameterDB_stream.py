@@ -0,0 +1,253 @@
+"""
+Streaming versions of keyword_query and name_query.  Rather than building
+and sorting every matching Parameter in memory, iter_keyword_query and
+iter_name_query let SQLite order the rows (by name, case-insensitive) and
+convert them to Parameters one at a time as they are iterated over.
+
+Both support keyset pagination: pass limit to stop after that many
+Parameters, then pass the iterator's cursor attribute back in to get the
+next page.  Each page is a fresh indexed query starting just after the last
+Parameter of the previous page, so paging through a large result set never
+holds more than one page in memory.
+"""
+
+import os
+import json
+import base64
+import heapq
+import string
+
+from ParameterDB_schema import records_table, membership_table
+from ParameterDB_schema import sources_table, units_table
+from ParameterDB_schema import parameter_columns
+from ParameterDB_query import _global_connection_pool, _is_view
+from ParameterDB_query import LazyParameter, _keyword_condition
+from ParameterDB_query import name_query_chunk_size
+
+__all__ = ["iter_keyword_query", "iter_name_query", "QueryIterator"]
+
+
+# folds ASCII capitals to lower case and leaves everything else alone, as
+# SQLite's NOCASE collation does
+_nocase_table = dict([(ord(cc), ord(cc.lower()))
+                      for cc in string.ascii_uppercase])
+
+
+def _sort_key(row):
+    """
+    Return the key by which the rows selected by _keyed_select are ordered:
+    the name (NOCASE), the name, and row_key
+    """
+    return (row[0].translate(_nocase_table), row[0], row[-1])
+
+
+def _encode_cursor(row):
+    """
+    Return the opaque cursor pointing just after row
+    """
+    return base64.urlsafe_b64encode(json.dumps([row[0], row[-1]]))
+
+
+def _decode_cursor(cursor):
+    """
+    Return the (name, row_key) tuple encoded in cursor by _encode_cursor
+    """
+    try:
+        name, row_key = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        raise RuntimeError("%s is not a valid query cursor" % str(cursor))
+    return name, row_key
+
+
+def _keyed_select(cursor, table_name, list_of_chars):
+    """
+    Return a SELECT statement (suitable for use as a subquery) reading the
+    columns in parameter_columns of the model version table_name, followed
+    by a column row_key which tells apart rows with the same name.  Values
+    to bind are appended to list_of_chars.
+    """
+    if not _is_view(cursor, table_name):
+        return "SELECT %s, rowid AS row_key FROM %s" \
+               % (", ".join(parameter_columns), table_name)
+
+    list_of_chars.append(table_name)
+    return "SELECT p.name AS name, p.defaultValue AS defaultValue, " \
+        + "p.upperValue AS upperValue, p.lowerValue AS lowerValue, " \
+        + "u.units AS units, p.docstring AS docstring, s.source AS source, " \
+        + "m.rowid AS row_key " \
+        + "FROM %s m JOIN %s p ON p.id = m.record_id " \
+          % (membership_table, records_table) \
+        + "LEFT JOIN %s u ON u.id = p.units_id " % units_table \
+        + "LEFT JOIN %s s ON s.id = p.source_id " % sources_table \
+        + "WHERE m.version = ?"
+
+
+def _iter_rows(db_name, table_name, condition_list, cursor, limit):
+    """
+    Generator yielding the rows of the model version table_name (as
+    selected by _keyed_select) which satisfy any of the conditions in
+    condition_list, a list of (SQL condition, list of values to bind)
+    tuples, ordered by _sort_key.  Only the rows after cursor (if not None)
+    are returned, and at most limit of them (if not None).
+
+    Each condition is run as a separate query on the same connection, and
+    their rows are merged; the conditions must not select the same rows.
+    """
+    with _global_connection_pool.connection(db_name) as conn:
+        stream_list = []
+        for condition, condition_chars in condition_list:
+            sql_cursor = conn.cursor()
+            list_of_chars = []
+            cmd = "SELECT %s, row_key FROM (%s) WHERE (%s)" \
+                  % (", ".join(parameter_columns),
+                     _keyed_select(sql_cursor, table_name, list_of_chars),
+                     condition)
+            list_of_chars.extend(condition_chars)
+            if cursor is not None:
+                name, row_key = _decode_cursor(cursor)
+                cmd += " AND (name COLLATE NOCASE, name, row_key) > (?, ?, ?)"
+                list_of_chars.extend([name, name, row_key])
+            cmd += " ORDER BY name COLLATE NOCASE, name, row_key"
+            if limit is not None:
+                cmd += " LIMIT ?"
+                list_of_chars.append(limit)
+            sql_cursor.execute(cmd, tuple(list_of_chars))
+            stream_list.append(sql_cursor)
+
+        if len(stream_list) == 1:
+            for row in stream_list[0]:
+                yield row
+            return
+
+        # each row is preceded by its (unique) key so that heapq.merge
+        # never compares the rows themselves
+        keyed_list = [((_sort_key(row), row) for row in stream)
+                      for stream in stream_list]
+        for key, row in heapq.merge(*keyed_list):
+            yield row
+
+
+class QueryIterator(object):
+    """
+    Iterator over the Parameters returned by iter_keyword_query and
+    iter_name_query.
+
+    Its attribute cursor is an opaque string marking the position just after
+    the last Parameter returned (None before the first one).  Once the
+    iterator stops, cursor is None if there are no more results; otherwise
+    (i.e. the iterator stopped because it reached its limit) passing cursor
+    back to the query function returns the next page.
+    """
+
+    def __init__(self, row_generator, limit):
+        """
+        row_generator -- a generator yielding at most limit+1 rows from
+                         _iter_rows
+        limit -- the number of Parameters to return (None for all of them)
+        """
+        self._rows = row_generator
+        self._limit = limit
+        self._count = 0
+        self.cursor = None
+
+    def __iter__(self):
+        return self
+
+    def _stop(self, has_more):
+        if not has_more:
+            self.cursor = None
+        self._rows.close()
+        raise StopIteration
+
+    def next(self):
+        try:
+            row = next(self._rows)
+        except StopIteration:
+            self._stop(False)
+
+        if self._limit is not None and self._count >= self._limit:
+            self._stop(True)
+
+        self._count += 1
+        self.cursor = _encode_cursor(row)
+        return LazyParameter(row)
+
+    __next__ = next
+
+    def close(self):
+        """
+        Release the database connection before the iterator is exhausted
+        """
+        self._rows.close()
+
+
+def _start(db_name, table_name, condition_list, cursor, limit):
+    """
+    Check the arguments shared by iter_keyword_query and iter_name_query and
+    return a QueryIterator over the rows selected by condition_list
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exist" % db_name)
+    if limit is not None and limit < 1:
+        raise RuntimeError("limit must be a positive number")
+    if cursor is not None:
+        _decode_cursor(cursor)
+
+    # one row more than requested tells QueryIterator whether there is a
+    # next page
+    sql_limit = None
+    if limit is not None:
+        sql_limit = limit+1
+    return QueryIterator(_iter_rows(db_name, table_name, condition_list,
+                                    cursor, sql_limit), limit)
+
+
+def iter_keyword_query(db_name, table_name, keyword_list, xml_list=None,
+                       limit=None, cursor=None):
+    """
+    Return a QueryIterator over the Parameters in the database db_name and
+    table table_name whose names or docstrings contain one of the keywords
+    in keyword_list, as keyword_query does in 'substring' mode.  The
+    Parameters are ordered by name (case-insensitive) and read from the
+    database as they are iterated over.
+
+    Option to limit search to data from .xml files specified in
+    xml_list.
+
+    If limit is not None, at most limit Parameters are returned; the
+    iterator's cursor attribute can then be passed as cursor to get the
+    Parameters following them.
+    """
+    condition, list_of_chars = _keyword_condition(keyword_list, xml_list)
+    return _start(db_name, table_name, [(condition, list_of_chars)], cursor,
+                  limit)
+
+
+def iter_name_query(db_name, table_name, param_name_list, limit=None,
+                    cursor=None):
+    """
+    Return a QueryIterator over the Parameters in the database db_name and
+    table table_name whose names are in param_name_list, as name_query does.
+    The Parameters are ordered by name (case-insensitive) and read from the
+    database as they are iterated over.
+
+    limit and cursor are as in iter_keyword_query.
+    """
+    name_list = []
+    name_set = set()
+    for param_name in param_name_list:
+        param_name = "{}".format(param_name)
+        if param_name not in name_set:
+            name_set.add(param_name)
+            name_list.append(param_name)
+
+    condition_list = []
+    for i_start in range(0, len(name_list), name_query_chunk_size):
+        chunk = name_list[i_start:i_start+name_query_chunk_size]
+        condition_list.append(("name IN (%s)" % ", ".join(["?"]*len(chunk)),
+                               chunk))
+
+    if len(condition_list) == 0:
+        condition_list.append(("0", []))
+
+    return _start(db_name, table_name, condition_list, cursor, limit)
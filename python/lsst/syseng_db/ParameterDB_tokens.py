@@ -0,0 +1,79 @@
+"""
+Splitting Parameter names into the tokens indexed by token_table (see
+ParameterDB_schema) and searched by token_query.  Names are identifiers
+such as slewSettle_time, m1OuterCa or nVisitExp; they are split at
+underscores and other punctuation, at changes of case (keeping runs of
+capitals such as 'CCD' together) and around runs of digits, and the tokens
+are folded to lower case, so that
+
+    slewSettle_time -> slew, settle, time
+    m1OuterCa       -> m, 1, outer, ca
+    CCDReadoutTime  -> ccd, readout, time
+
+Each distinct token is in turn broken into the trigrams stored in
+trigram_table, which let token_query find the tokens closest to a
+misspelled keyword.
+"""
+
+import re
+
+__all__ = ["name_tokens"]
+
+
+# a run of capitals followed by a capitalized word ('CCD' in 'CCDReadout'),
+# a capitalized or lower-case word, a run of capitals, or a run of digits
+_token_pattern = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def _token_spans(name):
+    """
+    Return a list of (token, start, end) tuples for the tokens of name, where
+    name[start:end] is the text the (lower-case) token was read from
+    """
+    return [(match.group().lower(), match.start(), match.end())
+            for match in _token_pattern.finditer(name)]
+
+
+def name_tokens(name):
+    """
+    Return the list of lower-case tokens making up the Parameter name name,
+    in order (see the module docstring)
+    """
+    return [token for token, start, end in _token_spans(name)]
+
+
+def _trigrams(token):
+    """
+    Return the set of trigrams of token, padded with two spaces in front and
+    one behind (as PostgreSQL's pg_trgm does) so that the beginning of a
+    token weighs more than its end, and short tokens have trigrams too
+    """
+    padded = "  " + token + " "
+    return set([padded[ii:ii+3] for ii in range(len(padded)-2)])
+
+
+def _similarity(keyword_trigrams, token):
+    """
+    Return the similarity (between 0 and 1) of the token token to a keyword
+    whose set of trigrams is keyword_trigrams: the number of trigrams they
+    share divided by the number of distinct trigrams between them
+    """
+    token_trigrams = _trigrams(token)
+    shared = len(keyword_trigrams & token_trigrams)
+    return float(shared)/(len(keyword_trigrams)+len(token_trigrams)-shared)
+
+
+def _highlight(name, tokens):
+    """
+    Return name with the parts from which the tokens in the set tokens were
+    read in [brackets]
+    """
+    pieces = []
+    last = 0
+    for token, start, end in _token_spans(name):
+        if token in tokens:
+            pieces.append(name[last:start])
+            pieces.append("[%s]" % name[start:end])
+            last = end
+    pieces.append(name[last:])
+    return "".join(pieces)
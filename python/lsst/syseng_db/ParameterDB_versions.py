@@ -0,0 +1,160 @@
+"""
+Queries spanning several model versions at once, e.g. to follow how the
+values of a parameter evolved.  Each query is a single UNION ALL statement
+with one branch per version, so the versions are searched in one round
+trip, and every Parameter returned is tagged with the version it came from.
+"""
+
+import os
+
+from ParameterTree import Parameter
+from ParameterDB_schema import parameter_columns
+from ParameterDB_cache import cached_query
+from ParameterDB_query import _global_connection_pool
+from ParameterDB_query import _convert_row_to_parameter, _keyword_condition
+from ParameterDB_query import get_table_names, name_query_chunk_size
+
+__all__ = ["VersionedParameter", "keyword_query_versions",
+           "name_query_versions"]
+
+
+class VersionedParameter(Parameter):
+    """
+    A Parameter returned by a query spanning several model versions.  In
+    addition to the usual properties it carries
+
+    version -- the name of the model version (table) it was found in
+    """
+
+    __slots__ = ('_version',)
+
+    def __init__(self, name, version=None, **kwargs):
+        """
+        version is as described above; all other arguments are passed on
+        to Parameter
+        """
+        super(VersionedParameter, self).__init__(name, **kwargs)
+        self._version = version
+
+    @property
+    def version(self):
+        return self._version
+
+
+def _version_list(db_name, table_list):
+    """
+    Return table_list, or all of the model versions in db_name if it is
+    None, raising a RuntimeError if any of them is not a model version
+    """
+    if not os.path.exists(db_name):
+        raise RuntimeError("Database %s does not exist" % db_name)
+
+    available = get_table_names(db_name)
+    if table_list is None:
+        return available
+
+    for table_name in table_list:
+        if table_name not in available:
+            raise RuntimeError("%s is not a model version in %s"
+                               % (table_name, db_name))
+    return list(table_list)
+
+
+def _union_query(cursor, table_list, condition, condition_chars,
+                 with_clause="", with_chars=()):
+    """
+    Select the Parameters satisfying the SQL condition (with the values
+    condition_chars to bind) from every model version in table_list with a
+    single UNION ALL statement, optionally preceded by with_clause (with the
+    values with_chars).  Returns the rows, each starting with the version.
+    """
+    branch = "SELECT ? AS version, %s FROM %%s WHERE (%s)" \
+             % (", ".join(parameter_columns), condition)
+
+    list_of_chars = list(with_chars)
+    for table_name in table_list:
+        list_of_chars.append(table_name)
+        list_of_chars.extend(condition_chars)
+
+    cmd = with_clause \
+        + " UNION ALL ".join([branch % table_name for table_name in table_list])
+    cursor.execute(cmd, tuple(list_of_chars))
+    return cursor.fetchall()
+
+
+def _to_versioned_parameters(rows, table_list):
+    """
+    Convert rows returned by _union_query into VersionedParameters ordered
+    by name (case-insensitive), then source, then the position of their
+    version in table_list
+    """
+    version_index = dict([(table_name, ix)
+                          for ix, table_name in enumerate(table_list)])
+    output = [_convert_row_to_parameter(row[1:],
+                                        parameter_class=VersionedParameter,
+                                        version=str(row[0]))
+              for row in rows]
+    return sorted(output, key=lambda pp: (pp.name.lower(), pp.source,
+                                          version_index[pp.version]))
+
+
+@cached_query
+def keyword_query_versions(db_name, table_list, keyword_list, xml_list=None):
+    """
+    Query the model versions in table_list (all of the versions in the
+    database db_name if None) for the Parameters whose names or docstrings
+    contain one of the keywords in keyword_list, as keyword_query does in
+    'substring' mode.  Returns a list of VersionedParameters ordered by name
+    (case-insensitive), then source, then version (in the order of
+    table_list).
+
+    Option to limit search to data from .xml files specified in
+    xml_list.
+    """
+    table_list = _version_list(db_name, table_list)
+    if len(table_list) == 0 or len(keyword_list) == 0:
+        return []
+
+    condition, list_of_chars = _keyword_condition(keyword_list, xml_list)
+    with _global_connection_pool.connection(db_name) as conn:
+        rows = _union_query(conn.cursor(), table_list, condition,
+                            list_of_chars)
+    return _to_versioned_parameters(rows, table_list)
+
+
+@cached_query
+def name_query_versions(db_name, table_list, param_name_list):
+    """
+    Query the model versions in table_list (all of the versions in the
+    database db_name if None) for the Parameters whose names are in
+    param_name_list, e.g. to see how their values changed from version to
+    version.  Returns a list of VersionedParameters ordered as by
+    keyword_query_versions.
+
+    The names are bound once per statement (in a common table expression
+    shared by all of the versions), name_query_chunk_size at a time.
+    """
+    table_list = _version_list(db_name, table_list)
+    if len(table_list) == 0 or len(param_name_list) == 0:
+        return []
+
+    name_list = []
+    name_set = set()
+    for param_name in param_name_list:
+        param_name = "{}".format(param_name)
+        if param_name not in name_set:
+            name_set.add(param_name)
+            name_list.append(param_name)
+
+    rows = []
+    with _global_connection_pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        for i_start in range(0, len(name_list), name_query_chunk_size):
+            chunk = name_list[i_start:i_start+name_query_chunk_size]
+            with_clause = "WITH wanted(wanted_name) AS (VALUES %s) " \
+                          % ", ".join(["(?)"]*len(chunk))
+            rows.extend(_union_query(cursor, table_list,
+                                     "name IN (SELECT wanted_name FROM wanted)",
+                                     [], with_clause=with_clause,
+                                     with_chars=chunk))
+    return _to_versioned_parameters(rows, table_list)
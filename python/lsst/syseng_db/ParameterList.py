@@ -0,0 +1,197 @@
+"""
+A column-oriented container for many Parameters.  Where a list of
+Parameters holds one object per Parameter, a ParameterList holds one list
+per field (names, docstrings, units, sources and the three values), and
+each distinct string is stored only once however many Parameters share it
+(units and sources are shared by thousands of Parameters, docstrings and
+values by many).  Indexing or iterating over a ParameterList hands out
+ParameterRows: small views onto one position of the columns, which behave
+like Parameters (the same properties and write_param()) without copying
+anything.
+
+    param_list = ParameterList(ParameterTree(file_name).parameter_list)
+    for param in param_list:
+        param.write_param()
+
+scripts/benchmark_parameter_memory.py compares the memory used by, and the
+time taken to build, lists of Parameters and ParameterLists.
+"""
+
+import sys
+
+from ParameterTree import Parameter, value_names, _encode_value
+from ParameterTree import _write_parameter
+
+__all__ = ["ParameterList", "ParameterRow"]
+
+
+# the columns of a ParameterList, in the order of the arguments of
+# ParameterList._append_fields
+_columns = ('name', 'doc', 'units', 'source') + value_names
+
+
+class ParameterRow(object):
+    """
+    A view onto one Parameter in a ParameterList.  It has the properties
+    of a Parameter (name, doc, units, values and source) and its
+    write_param() method, read from the columns of the ParameterList when
+    they are asked for.
+    """
+
+    __slots__ = ('_owner', '_index')
+
+    def __init__(self, owner, index):
+        self._owner = owner
+        self._index = index
+
+    def write_param(self, handle=sys.stdout):
+        """
+        Write out the contents of this Parameter to a file handle specified
+        by the kwarg 'handle' (default is to write to stdout)
+        """
+        _write_parameter(self, handle)
+
+    def to_parameter(self):
+        """
+        Return a Parameter holding a copy of the data of this row
+        """
+        return self._owner.parameter(self._index)
+
+    @property
+    def name(self):
+        return self._owner._data['name'][self._index]
+
+    @property
+    def doc(self):
+        return self._owner._data['doc'][self._index]
+
+    @property
+    def units(self):
+        return self._owner._data['units'][self._index]
+
+    @property
+    def source(self):
+        return self._owner._data['source'][self._index]
+
+    @property
+    def values(self):
+        output = {}
+        for val_name in value_names:
+            vv = self._owner._data[val_name][self._index]
+            if vv is not None:
+                output[val_name] = vv
+        return output
+
+
+class ParameterList(object):
+    """
+    A list of Parameters stored column by column (see the module
+    docstring).  A ParameterList can be built from any iterable of
+    Parameters (or ParameterRows), grown with append() and extend(), and
+    passed anywhere an iterable of Parameters is expected (e.g. to
+    db_from_param_list).
+
+    len(), iteration and indexing work as for a list; indexing with an
+    integer returns a ParameterRow and with a slice a new ParameterList.
+    column(field) returns a whole column, which is the cheapest way to
+    read one field of every Parameter.
+    """
+
+    def __init__(self, param_list=None):
+        """
+        param_list is an iterable of Parameters to start the list with
+        """
+        self._data = dict([(column, []) for column in _columns])
+        # every distinct string stored in the columns, mapped to itself
+        self._strings = {}
+        if param_list is not None:
+            self.extend(param_list)
+
+    def _intern(self, value):
+        """
+        Return the copy of the string value already stored in the columns
+        (storing value if there is none)
+        """
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def _append_fields(self, name, doc, units, source, default, upper, lower):
+        intern = self._intern
+        data = self._data
+        data['name'].append(intern(name))
+        data['doc'].append(intern(doc))
+        data['units'].append(intern(units))
+        data['source'].append(intern(source))
+        data['defaultValue'].append(intern(default))
+        data['upperValue'].append(intern(upper))
+        data['lowerValue'].append(intern(lower))
+
+    def append(self, param):
+        """
+        Add the Parameter (or ParameterRow) param to the end of the list
+        """
+        if type(param) is Parameter:
+            self._append_fields(param._name, param._doc, param._units,
+                                param._source, param._default, param._upper,
+                                param._lower)
+            return
+        values = param.values
+        self._append_fields(param.name, param.doc, param.units, param.source,
+                            *[_encode_value(values.get(val_name))
+                              for val_name in value_names])
+
+    def extend(self, param_list):
+        """
+        Add the Parameters in the iterable param_list to the end of the list
+        """
+        for param in param_list:
+            self.append(param)
+
+    def __len__(self):
+        return len(self._data['name'])
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield ParameterRow(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            output = ParameterList()
+            output._strings = self._strings
+            for column in _columns:
+                output._data[column] = self._data[column][index]
+            return output
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("ParameterList index out of range")
+        return ParameterRow(self, index)
+
+    def column(self, field):
+        """
+        Return a list of the field field ('name', 'doc', 'units', 'source',
+        'defaultValue', 'upperValue' or 'lowerValue') of every Parameter in
+        the list, in order (None where a Parameter has no doc or value)
+        """
+        if field not in self._data:
+            raise RuntimeError("%s is not a column of a ParameterList (%s)"
+                               % (field, ", ".join(_columns)))
+        return list(self._data[field])
+
+    def parameter(self, index):
+        """
+        Return a Parameter holding a copy of the data at position index
+        """
+        param = Parameter.__new__(Parameter)
+        (param._name, param._doc, param._units, param._source,
+         param._default, param._upper, param._lower) = \
+            [self._data[column][index] for column in _columns]
+        return param
+
+    def parameters(self):
+        """
+        Generator yielding the contents of the list as Parameters
+        """
+        for index in xrange(len(self)):
+            yield self.parameter(index)
@@ -1,7 +1,11 @@
 import sys
-import xml.etree.ElementTree as etree
+try:
+    import xml.etree.cElementTree as etree
+except ImportError:
+    import xml.etree.ElementTree as etree
 
-__all__ = ["Parameter", "ParameterTree", "write_keyword_params"]
+__all__ = ["Parameter", "ParameterTree", "write_keyword_params",
+           "iter_parameters"]
 
 prefix = "{http://schema.omg.org/spec/XMI/2.1}"
 id_tag = '%sid' % prefix
@@ -75,6 +79,40 @@ def write_keyword_params(list_of_params, keyword, handle=sys.stdout):
 
 
 
+# the keys a Parameter's values dict may have, in the order write_param
+# writes them
+value_names = ('defaultValue', 'upperValue', 'lowerValue')
+
+
+def _encode_value(vv):
+    """
+    Return the value vv (from a Parameter's values dict) as a str
+    """
+    if isinstance(vv, unicode):
+        vv = vv.encode(errors='ignore')
+    return vv
+
+
+def _write_parameter(param, handle):
+    """
+    Write out the contents of param (a Parameter, or anything with the same
+    properties) to the file handle handle, as Parameter.write_param does
+    """
+    handle.write("\n%s\n" % param.name)
+    if param.doc is not None:
+        handle.write("%s\n" % format_documentation(param.doc))
+
+    handle.write("    ####\n")
+    values = param.values
+    for val_name in value_names:
+        if val_name in values:
+            handle.write("    "+val_name+": "+values[val_name]
+                         +" "+param.units+"\n")
+
+    handle.write("    ####\n")
+    handle.write("    %s\n" % param.source)
+
+
 class Parameter(object):
     """
     A class to store a parameter and all the corresponding desirable
@@ -91,8 +129,17 @@ class Parameter(object):
 
     Parameters also provide the method write_param(), which writes a nicely
     formatted representation of the Parameter to a user-specified file handle.
+
+    Parameters are stored in __slots__ rather than a per-instance __dict__,
+    with the three possible values in slots of their own (None where a value
+    is absent); the values dict is assembled when it is asked for.  A
+    ParameterList (see ParameterList.py) stores many Parameters more
+    compactly still.
     """
 
+    __slots__ = ('_name', '_doc', '_units', '_source', '_default', '_upper',
+                 '_lower')
+
     def __init__(self, name, doc=None, units=None, values=None, source=None):
         """
         Input parameters are
@@ -106,10 +153,7 @@ class Parameter(object):
                   this Parameter came
         """
         self._name = name
-        if doc is not None:
-            self._doc = doc
-        else:
-            self._doc = None
+        self._doc = doc
 
         if units is not None:
             self._units = units
@@ -122,31 +166,43 @@ class Parameter(object):
         else:
             self._source = None
 
-        self._values = {}
-        for val_name in values:
-            vv = values[val_name]
-            if isinstance(vv, unicode):
-                vv = vv.encode(errors='ignore')
-
-            self._values[val_name] = vv
-
+        self._default = None
+        self._upper = None
+        self._lower = None
+        if values is not None:
+            for val_name in values:
+                self._set_value(val_name, _encode_value(values[val_name]))
+
+    def _set_value(self, val_name, vv):
+        if val_name == 'defaultValue':
+            self._default = vv
+        elif val_name == 'upperValue':
+            self._upper = vv
+        elif val_name == 'lowerValue':
+            self._lower = vv
+        else:
+            raise RuntimeError("%s is not one of the values of a Parameter "
+                               "(%s)" % (val_name, ", ".join(value_names)))
+
+    def __getstate__(self):
+        # classes with __slots__ have no __dict__ for pickle to save, so the
+        # state is the contents of the slots of this class and its subclasses
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for slot in state:
+            setattr(self, slot, state[slot])
 
     def write_param(self, handle=sys.stdout):
         """
         Write out the contents of this Parameter to a file handle specified
         by the kwarg 'handle' (default is to write to stdout)
         """
-        handle.write("\n%s\n" % self._name)
-        if self._doc is not None:
-            handle.write("%s\n" % format_documentation(self._doc))
-
-        handle.write("    ####\n")
-        for val_name in self._values:
-            handle.write("    "+val_name+": "+self._values[val_name]
-                         +" "+self._units+"\n")
-
-        handle.write("    ####\n")
-        handle.write("    %s\n" % self._source)
+        _write_parameter(self, handle)
 
     @property
     def name(self):
@@ -166,7 +222,129 @@ class Parameter(object):
 
     @property
     def values(self):
-        return self._values
+        output = {}
+        if self._default is not None:
+            output['defaultValue'] = self._default
+        if self._upper is not None:
+            output['upperValue'] = self._upper
+        if self._lower is not None:
+            output['lowerValue'] = self._lower
+        return output
+
+
+def _read_attribute(element, documentation_dict, units_dict):
+    """
+    Store the documentation and units of an 'attribute' element in
+    documentation_dict and units_dict (both keyed on the element's name)
+    """
+    for ii in element:
+        if ii.tag== 'documentation' and 'value' in ii.attrib:
+            documentation_dict[element.attrib['name']] = ii.attrib['value']
+        if ii.tag == 'properties' and 'type' in ii.attrib:
+            units_dict[element.attrib['name']] = ii.attrib['type']
+
+
+def _element_values(element):
+    """
+    Return a dict of the default, upper, and lower values
+    associated with an element (None if there are none)
+    """
+
+    output = {}
+
+    for ee in element:
+        if ee.tag == 'defaultValue':
+            output['defaultValue'] = ee.attrib['value']
+        elif ee.tag == 'lowerValue':
+            output['lowerValue'] = ee.attrib['value']
+        elif ee.tag == 'upperValue':
+            output['upperValue'] = ee.attrib['value']
+
+    if len(output)==0:
+        return None
+    else:
+        return output
+
+
+def _stream_dicts(file_name):
+    """
+    Make one pass through the .xml file specified by file_name using
+    iterparse.  Return the documentation, units and values dicts that
+    ParameterTree.generate_documentation_dict and ParameterTree.get_values
+    would have produced from the fully parsed tree.
+
+    Elements are cleared as soon as they (and any 'attribute' or
+    'ownedAttribute' element enclosing them) have been read, so memory
+    scales with the number of parameters rather than the size of the file.
+    """
+    documentation_dict = {}
+    units_dict = {}
+    value_dict = {}
+
+    open_elements = []
+    n_open_targets = 0  # number of 'attribute'/'ownedAttribute' still open
+
+    for event, ee in etree.iterparse(file_name, events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(ee)
+            if ee.tag in ('attribute', 'ownedAttribute'):
+                n_open_targets += 1
+            continue
+
+        open_elements.pop()
+
+        if ee.tag == 'attribute':
+            n_open_targets -= 1
+            _read_attribute(ee, documentation_dict, units_dict)
+        elif ee.tag == 'ownedAttribute':
+            n_open_targets -= 1
+            if 'name' in ee.attrib:
+                local_value_dict = _element_values(ee)
+                if local_value_dict is not None:
+                    value_dict[ee.attrib['name']] = local_value_dict
+
+        # Nothing enclosing this element still needs its children, so
+        # drop it (and its already-finished siblings) from the tree.
+        if n_open_targets == 0:
+            ee.clear()
+            if len(open_elements) > 0:
+                del open_elements[-1][:]
+
+    return documentation_dict, units_dict, value_dict
+
+
+def _build_parameters(doc_dict, units_dict, values_dict, file_name):
+    """
+    Generator combining the dicts produced by parsing an .xml file into
+    Parameter objects
+    """
+    for param_name in values_dict:
+        if param_name in doc_dict:
+            doc = doc_dict[param_name]
+        else:
+            doc = None
+        if param_name in units_dict:
+            units = units_dict[param_name]
+        else:
+            units = None
+
+        yield Parameter(param_name, doc=doc, units=units,
+                        values=values_dict[param_name], source=file_name)
+
+
+def iter_parameters(file_name):
+    """
+    Generator yielding the Parameters contained in the .xml file specified by
+    file_name.  The Parameters are the same as those in
+
+    ParameterTree(file_name).parameter_list
+
+    but the file is read in a single streaming pass (see _stream_dicts), so
+    the whole element tree is never held in memory.
+    """
+    doc_dict, units_dict, values_dict = _stream_dicts(file_name)
+    for pp in _build_parameters(doc_dict, units_dict, values_dict, file_name):
+        yield pp
 
 
 class ParameterTree(object):
@@ -177,33 +355,27 @@ class ParameterTree(object):
     accessed from the parameter_list member variable of the ParameterTree.
     """
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, streaming=False):
         """
         Specify the name of an .xml file.  XMI nestedClassifiers will be
         stripped from the file and stored as Parameter objects.
+
+        If streaming is True, the file is read in one pass with iterparse
+        instead of being loaded into a full element tree (see
+        iter_parameters).  The resulting parameter_list is the same.
         """
         words = file_name.split('/')
         self.file_name = words[-1]
-        tree = etree.parse(file_name)
-        doc_dict, units_dict = self.generate_documentation_dict(tree)
-        values_dict = self.get_values(tree)
-
-        self.parameter_list = []
 
-        for param_name in values_dict:
-            if param_name in doc_dict:
-                doc = doc_dict[param_name]
-            else:
-                doc = None
-            if param_name in units_dict:
-                units = units_dict[param_name]
-            else:
-                units = None
-
-            pp = Parameter(param_name, doc=doc, units=units, values=values_dict[param_name],
-                           source=file_name)
+        if streaming:
+            doc_dict, units_dict, values_dict = _stream_dicts(file_name)
+        else:
+            tree = etree.parse(file_name)
+            doc_dict, units_dict = self.generate_documentation_dict(tree)
+            values_dict = self.get_values(tree)
 
-            self.parameter_list.append(pp)
+        self.parameter_list = list(_build_parameters(doc_dict, units_dict,
+                                                     values_dict, file_name))
 
 
     def generate_documentation_dict(self, tree):
@@ -216,11 +388,7 @@ class ParameterTree(object):
 
         for ee in tree.iter():
             if ee.tag == 'attribute':
-                for ii in ee:
-                    if ii.tag== 'documentation' and 'value' in ii.attrib:
-                        documentation_dict[ee.attrib['name']] = ii.attrib['value']
-                    if ii.tag == 'properties' and 'type' in ii.attrib:
-                        units_dict[ee.attrib['name']] = ii.attrib['type']
+                _read_attribute(ee, documentation_dict, units_dict)
 
         return documentation_dict, units_dict
 
@@ -247,20 +415,4 @@ class ParameterTree(object):
         Return a dict of the default, upper, and lower values
         associated with an element
         """
-
-        output = {}
-
-        for ee in element:
-            if ee.tag == 'defaultValue':
-                output['defaultValue'] = ee.attrib['value']
-            elif ee.tag == 'lowerValue':
-                output['lowerValue'] = ee.attrib['value']
-            elif ee.tag == 'upperValue':
-                output['upperValue'] = ee.attrib['value']
-
-        if len(output)==0:
-            return None
-        else:
-            return output
-
-
+        return _element_values(element)
@@ -1,3 +1,14 @@
 from ParameterTree import *
+from ParameterList import *
 from ParameterDB_constructor import *
+from ParameterDB_cache import *
+from ParameterDB_tokens import *
 from ParameterDB_query import *
+from ParameterDB_diff import *
+from ParameterDB_stream import *
+from ParameterDB_versions import *
+from ParameterDB_search import *
+from ParameterDB_keys import *
+from ParameterDB_saved import *
+from ParameterDB_async import *
+from ParameterDB_memory import *
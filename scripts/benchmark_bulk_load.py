@@ -0,0 +1,66 @@
+"""
+This script benchmarks db_from_param_list by loading the same set of
+synthetic Parameters into a scratch database with and without the bulk-load
+mode, reporting the number of rows written per second for each.
+
+    python scripts/benchmark_bulk_load.py [n_parameters]
+
+n_parameters defaults to 200000.  The scratch database is written to a
+temporary directory and deleted afterwards.
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+from lsst.syseng_db import Parameter, db_from_param_list
+from lsst.syseng_db import syseng_db_config
+
+
+def make_parameters(n_parameters):
+    """
+    Return a list of n_parameters synthetic Parameters
+    """
+    param_list = []
+    for ii in range(n_parameters):
+        values = {'defaultValue':'%.4f' % (0.5*ii)}
+        if ii % 3 == 0:
+            values['upperValue'] = '%.4f' % (1.5*ii)
+        if ii % 5 == 0:
+            values['lowerValue'] = '%.4f' % (0.1*ii)
+        param_list.append(Parameter("benchParam_%d" % ii,
+                                    doc="synthetic parameter number %d used "
+                                        "to benchmark database loading" % ii,
+                                    units="m", values=values,
+                                    source="benchmark_%d.xml" % (ii % 70)))
+    return param_list
+
+
+def time_load(param_list, table_name, bulk):
+    """
+    Load param_list into table_name, returning the elapsed time in seconds
+    """
+    t_start = time.time()
+    db_from_param_list(param_list, table_name, bulk=bulk)
+    return time.time()-t_start
+
+
+if __name__ == "__main__":
+
+    n_parameters = 200000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+
+    param_list = make_parameters(n_parameters)
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    try:
+        for label, bulk in (("row-by-row", False), ("bulk", True)):
+            syseng_db_config["db_name"] = "bench_%s_sqlite.db" % label
+            elapsed = time_load(param_list, "bench", bulk)
+            sys.stdout.write("%-12s %8d rows in %7.3f s: %10.0f rows/s\n"
+                             % (label, n_parameters, elapsed,
+                                n_parameters/elapsed))
+    finally:
+        shutil.rmtree(scratch_dir)
@@ -0,0 +1,92 @@
+"""
+This script compares the cost of turning query results into Parameters
+eagerly (_convert_row_to_parameter, as the query functions used to) with
+the LazyParameters the query functions now return, on a scratch database
+of n_parameters synthetic Parameters.  It reports, in milliseconds, the
+time to fetch every row of the version and
+
+    - read the name of each result (as the key numbers page does)
+    - read every field of each result (write_param() to a null handle)
+
+    python scripts/benchmark_lazy_parameters.py [n_parameters]
+
+n_parameters defaults to 100000.  The scratch database is written to a
+temporary directory and deleted afterwards.
+"""
+
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from lsst.syseng_db import db_from_param_list, syseng_db_config
+from lsst.syseng_db.ParameterDB_query import _convert_row_to_parameter
+from lsst.syseng_db.ParameterDB_query import _lazy_parameter_factory
+from lsst.syseng_db.ParameterDB_schema import parameter_columns
+from benchmark_bulk_load import make_parameters
+
+
+class NullHandle(object):
+    def write(self, text):
+        pass
+
+
+def fetch(db_name, lazy):
+    """
+    Return the Parameters of the version 'bench' in db_name
+    """
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    if lazy:
+        cursor.row_factory = _lazy_parameter_factory
+    cursor.execute("SELECT %s FROM bench" % ", ".join(parameter_columns))
+    if lazy:
+        results = cursor.fetchall()
+    else:
+        results = [_convert_row_to_parameter(row) for row in cursor.fetchall()]
+    conn.close()
+    return results
+
+
+def best_time(function):
+    """
+    Return the best time in milliseconds of three calls of function()
+    """
+    best = None
+    for ii in range(3):
+        t_start = time.time()
+        function()
+        elapsed = 1000.0*(time.time()-t_start)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+if __name__ == "__main__":
+
+    n_parameters = 100000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    syseng_db_config["db_name"] = "bench_sqlite.db"
+    db_name = os.path.join(scratch_dir, syseng_db_config["db_name"])
+    try:
+        db_from_param_list(make_parameters(n_parameters), "bench", bulk=True)
+        handle = NullHandle()
+
+        sys.stdout.write("%d Parameters\n" % n_parameters)
+        sys.stdout.write("%-25s %12s %12s\n" % ("", "eager", "lazy"))
+        for label, use in (("names only",
+                            lambda results: [pp.name for pp in results]),
+                           ("every field",
+                            lambda results: [pp.write_param(handle=handle)
+                                             for pp in results])):
+            timings = [best_time(lambda: use(fetch(db_name, lazy)))
+                       for lazy in (False, True)]
+            sys.stdout.write("%-25s %9.1f ms %9.1f ms\n"
+                             % tuple([label] + timings))
+    finally:
+        shutil.rmtree(scratch_dir)
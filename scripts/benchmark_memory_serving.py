@@ -0,0 +1,86 @@
+"""
+This script compares the latency of queries against a database file with
+the latency of the same queries served from an in-memory copy of it (see
+serve_from_memory in ParameterDB_memory).  A scratch database with two
+model versions of n_parameters synthetic Parameters is written, and one
+version is loaded into memory.  The script reports the time to load the
+copy and, in milliseconds per call, the time of keyword_query (in its
+'substring' and 'fulltext' modes) and name_query from the file and from
+memory.  The result cache is left disabled, so every call runs its query.
+
+    python scripts/benchmark_memory_serving.py [n_parameters] [n_calls]
+
+n_parameters defaults to 20000 and n_calls to 200.  The scratch database
+is written to a temporary directory and deleted afterwards.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import timeit
+from lsst.syseng_db import db_from_param_list, keyword_query, name_query
+from lsst.syseng_db import serve_from_memory, stop_serving_from_memory
+from lsst.syseng_db import memory_snapshot_stats, syseng_db_config
+from benchmark_bulk_load import make_parameters
+
+
+def per_call(function, n_calls):
+    """
+    Return the best time in milliseconds per call of function() over three
+    runs of n_calls calls
+    """
+    return 1.0e3*min(timeit.repeat(function, number=n_calls, repeat=3))/n_calls
+
+
+def report(label, disk_ms, memory_ms):
+    sys.stdout.write("%-35s %9.3f ms %9.3f ms\n" % (label, disk_ms, memory_ms))
+
+
+if __name__ == "__main__":
+
+    n_parameters = 20000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+    n_calls = 200
+    if len(sys.argv) > 2:
+        n_calls = int(sys.argv[2])
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    syseng_db_config["db_name"] = "bench_sqlite.db"
+    db_name = os.path.join(scratch_dir, syseng_db_config["db_name"])
+    try:
+        param_list = make_parameters(n_parameters)
+        db_from_param_list(param_list, "bench_old", bulk=True)
+        for pp in param_list[::10]:
+            pp._doc = pp.doc + " (revised)"
+        db_from_param_list(param_list, "bench", bulk=True)
+
+        queries = [("keyword_query, 1 keyword",
+                    lambda: keyword_query(db_name, "bench", ["Param_123"])),
+                   ("keyword_query 'fulltext', 1 keyword",
+                    lambda: keyword_query(db_name, "bench", ["benchParam_123"],
+                                          mode='fulltext')),
+                   ("name_query, 1 name",
+                    lambda: name_query(db_name, "bench", ["benchParam_123"])),
+                   ("name_query, 20 names",
+                    lambda: name_query(db_name, "bench",
+                                       ["benchParam_%d" % ii
+                                        for ii in range(20)]))]
+
+        disk_ms = [per_call(query, n_calls) for label, query in queries]
+
+        serve_from_memory(db_name, versions=["bench"])
+        stats = memory_snapshot_stats(db_name)
+        sys.stdout.write("loaded %s into memory in %.2f s\n\n"
+                         % (", ".join(stats['loaded_versions']),
+                            stats['load_time']))
+        memory_ms = [per_call(query, n_calls) for label, query in queries]
+        stop_serving_from_memory(db_name)
+
+        sys.stdout.write("%-35s %12s %12s\n" % ("", "file", "memory"))
+        for (label, query), disk, memory in zip(queries, disk_ms, memory_ms):
+            report(label, disk, memory)
+    finally:
+        shutil.rmtree(scratch_dir)
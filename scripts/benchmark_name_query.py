@@ -0,0 +1,106 @@
+"""
+This script benchmarks name_query on lists of 10, 1,000 and 100,000 names
+against a scratch database of synthetic Parameters.  For comparison it also
+times the single 'WHERE name = ? OR name = ? ...' statement name_query used
+to build (which SQLite rejects for long lists) and a join against a
+temporary table of the names (which needs a writable connection, so
+name_query cannot use it).  All three return the same sorted list of
+Parameters.
+
+    python scripts/benchmark_name_query.py [n_parameters]
+
+n_parameters defaults to 200000.  The scratch database is written to a
+temporary directory and deleted afterwards.
+"""
+
+import sys
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+from lsst.syseng_db import db_from_param_list, name_query
+from lsst.syseng_db import syseng_db_config
+from lsst.syseng_db.ParameterDB_query import _convert_row_to_parameter
+from lsst.syseng_db.ParameterDB_schema import parameter_columns
+from benchmark_bulk_load import make_parameters
+
+
+def to_parameters(rows):
+    """
+    Convert rows into a list of Parameters sorted as name_query sorts them
+    """
+    return [_convert_row_to_parameter(rr)
+            for rr in sorted(rows, key=lambda rr: rr[0].lower())]
+
+
+def or_chain(db_name, table_name, name_list):
+    """
+    Query name_list with one 'name = ?' term per name, as name_query used to
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        where_statement = " OR ".join(["name = ?"]*len(name_list))
+        return to_parameters(conn.execute("SELECT %s FROM %s WHERE %s"
+                                          % (", ".join(parameter_columns),
+                                             table_name, where_statement),
+                                          tuple(name_list)).fetchall())
+    finally:
+        conn.close()
+
+
+def temp_table_join(db_name, table_name, name_list):
+    """
+    Query name_list by loading it into a temporary table and joining
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        conn.execute("CREATE TEMP TABLE names (name text PRIMARY KEY)")
+        conn.executemany("INSERT OR IGNORE INTO names VALUES(?)",
+                         [(name,) for name in name_list])
+        columns = ", ".join(["t.%s" % column for column in parameter_columns])
+        return to_parameters(conn.execute("SELECT %s FROM temp.names n "
+                                          "JOIN %s t ON t.name = n.name"
+                                          % (columns, table_name)).fetchall())
+    finally:
+        conn.close()
+
+
+def time_query(function, *args):
+    """
+    Return the time in seconds taken by function(*args), or the error it
+    raised
+    """
+    t_start = time.time()
+    try:
+        function(*args)
+    except sqlite3.Error, w:
+        return "failed: %s" % w
+    return "%.4f s" % (time.time()-t_start)
+
+
+if __name__ == "__main__":
+
+    n_parameters = 200000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    syseng_db_config["db_name"] = "bench_sqlite.db"
+    db_name = os.path.join(scratch_dir, syseng_db_config["db_name"])
+    try:
+        db_from_param_list(make_parameters(n_parameters), "bench", bulk=True)
+
+        for n_names in (10, 1000, 100000):
+            # every other Parameter in the table
+            name_list = ["benchParam_%d" % (2*ii) for ii in range(n_names)]
+            for label, function in (("name_query", name_query),
+                                    ("OR chain", or_chain),
+                                    ("temp table", temp_table_join)):
+                sys.stdout.write("%7d names  %-12s %s\n"
+                                 % (n_names, label,
+                                    time_query(function, db_name, "bench",
+                                               name_list)))
+    finally:
+        shutil.rmtree(scratch_dir)
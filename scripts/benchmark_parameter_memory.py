@@ -0,0 +1,119 @@
+"""
+This script compares three ways of holding n_parameters synthetic
+Parameters in memory:
+
+    - a list of objects of the class Parameter had before it used __slots__
+      (a per-instance __dict__ and a values dict each; reproduced below as
+      DictParameter)
+    - a list of Parameters
+    - a ParameterList
+
+For each it reports the memory taken by the objects (the sizes, as given
+by sys.getsizeof, of all of the distinct objects reachable from the list,
+the strings included) and the time it takes to build them.
+
+    python scripts/benchmark_parameter_memory.py [n_parameters]
+
+n_parameters defaults to 200000.
+"""
+
+import sys
+import gc
+import time
+from lsst.syseng_db import Parameter, ParameterList
+
+
+class DictParameter(object):
+    """
+    Parameter as it was before it used __slots__
+    """
+
+    def __init__(self, name, doc=None, units=None, values=None, source=None):
+        self._name = name
+        if doc is not None:
+            self._doc = doc
+        else:
+            self._doc = None
+
+        if units is not None:
+            self._units = units
+        else:
+            self._units = ''
+
+        if source is not None:
+            words = source.split('/')
+            self._source = words[-1]
+        else:
+            self._source = None
+
+        self._values = {}
+        for val_name in values:
+            vv = values[val_name]
+            if isinstance(vv, unicode):
+                vv = vv.encode(errors='ignore')
+
+            self._values[val_name] = vv
+
+
+def make_fields(n_parameters):
+    """
+    Return a list of the (name, doc, units, values, source) of n_parameters
+    synthetic Parameters.  As in the real model, the units, sources and
+    docstrings are shared by many Parameters, but (as when they are read
+    from .xml files or a database) every Parameter has its own copies of
+    the strings.
+    """
+    fields = []
+    for ii in range(n_parameters):
+        values = {'defaultValue': '%.4f' % (0.5*(ii % 1000))}
+        if ii % 3 == 0:
+            values['upperValue'] = '%.4f' % (1.5*(ii % 1000))
+        fields.append(("benchParam_%d" % ii,
+                       "synthetic parameter of kind %d" % (ii % 200),
+                       "%s" % ("m", "mm")[ii % 2],
+                       values,
+                       "/data/v_0_0/benchmark_%d.xml" % (ii % 70)))
+    return fields
+
+
+def build(kind, fields):
+    if kind == 'DictParameter':
+        return [DictParameter(*ff) for ff in fields]
+    if kind == 'Parameter':
+        return [Parameter(*ff) for ff in fields]
+    return ParameterList(Parameter(*ff) for ff in fields)
+
+
+def deep_size(root):
+    """
+    Return the total size in bytes of root and of all of the distinct
+    objects reachable from it (classes excepted)
+    """
+    seen = set()
+    stack = [root]
+    total = 0
+    while len(stack) > 0:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+if __name__ == "__main__":
+
+    n_parameters = 200000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+
+    fields = make_fields(n_parameters)
+    sys.stdout.write("%d Parameters\n" % n_parameters)
+    for kind in ('DictParameter', 'Parameter', 'ParameterList'):
+        t_start = time.time()
+        result = build(kind, fields)
+        elapsed = time.time()-t_start
+        sys.stdout.write("%-15s %8.1f MB %8.3f s\n"
+                         % (kind, deep_size(result)/1048576.0, elapsed))
+        del result
@@ -0,0 +1,94 @@
+"""
+This script measures the per-call overhead of keyword_query and name_query
+on a small scratch database of synthetic Parameters, where building and
+compiling the SQL is a noticeable part of every call.  It reports, in
+microseconds per call,
+
+    - the time to build the SQL text of a query, with the statement cache
+      (see cached_statement in ParameterDB_cache) and without it
+    - the time SQLite takes to run the same statement text repeatedly
+      (reusing the compiled statement) versus a fresh text every time
+      (recompiling it)
+    - the time of complete keyword_query and name_query calls
+
+    python scripts/benchmark_query_overhead.py [n_calls]
+
+n_calls defaults to 10000.  The scratch database is written to a temporary
+directory and deleted afterwards.
+"""
+
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+import timeit
+from lsst.syseng_db import db_from_param_list, keyword_query, name_query
+from lsst.syseng_db import syseng_db_config
+from lsst.syseng_db.ParameterDB_query import _keyword_query_sql
+from lsst.syseng_db.ParameterDB_query import _name_query_sql
+from benchmark_bulk_load import make_parameters
+
+
+def per_call(function, n_calls):
+    """
+    Return the best time in microseconds per call of function() over three
+    runs of n_calls calls
+    """
+    return 1.0e6*min(timeit.repeat(function, number=n_calls, repeat=3))/n_calls
+
+
+def report(label, microseconds):
+    sys.stdout.write("%-45s %9.2f us\n" % (label, microseconds))
+
+
+if __name__ == "__main__":
+
+    n_calls = 10000
+    if len(sys.argv) > 1:
+        n_calls = int(sys.argv[1])
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    syseng_db_config["db_name"] = "bench_sqlite.db"
+    db_name = os.path.join(scratch_dir, syseng_db_config["db_name"])
+    try:
+        db_from_param_list(make_parameters(1000), "bench", bulk=True)
+
+        report("build keyword SQL (3 keywords, 2 files)",
+               per_call(lambda: _keyword_query_sql("bench", 3, 2), n_calls))
+        report("build keyword SQL, uncached",
+               per_call(lambda: _keyword_query_sql.uncached("bench", 3, 2),
+                        n_calls))
+        report("build name SQL (20 names)",
+               per_call(lambda: _name_query_sql("bench", 20), n_calls))
+        report("build name SQL, uncached",
+               per_call(lambda: _name_query_sql.uncached("bench", 20),
+                        n_calls))
+
+        conn = sqlite3.connect(db_name)
+        cmd = _name_query_sql("bench", 20)
+        values = tuple(["benchParam_%d" % ii for ii in range(20)])
+        # the trailing comment changes the text (but not the meaning) of
+        # the statement, so SQLite has to compile it every time
+        counter = [0]
+        def fresh_text():
+            counter[0] += 1
+            return conn.execute(cmd + " -- %d" % counter[0], values).fetchall()
+        report("execute name SQL, same text",
+               per_call(lambda: conn.execute(cmd, values).fetchall(), n_calls))
+        report("execute name SQL, new text every call",
+               per_call(fresh_text, n_calls))
+        conn.close()
+
+        report("keyword_query (3 keywords)",
+               per_call(lambda: keyword_query(db_name, "bench",
+                                              ["Param_1", "Param_2",
+                                               "Param_3"]),
+                        n_calls//10))
+        name_list = ["benchParam_%d" % ii for ii in range(20)]
+        report("name_query (20 names)",
+               per_call(lambda: name_query(db_name, "bench", name_list),
+                        n_calls//10))
+    finally:
+        shutil.rmtree(scratch_dir)
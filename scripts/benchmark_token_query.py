@@ -0,0 +1,126 @@
+"""
+This script times token_query against a scratch database of synthetic
+Parameters with camelCase names built from a vocabulary of engineering
+words and made-up words (e.g. 'slewSettleTime_12'), for keywords that match
+tokens exactly, match the beginning of tokens, and are misspelled, and
+compares it with a 'substring' keyword_query.
+
+    python scripts/benchmark_token_query.py [n_parameters] [n_words]
+
+n_parameters defaults to 200000 and the size of the vocabulary, n_words, to
+3000.  The time token_query takes grows with the number of Parameters
+sharing the tokens of the keywords, so a small vocabulary (making every
+token common) slows it down.  The scratch database is written to a
+temporary directory and deleted afterwards.
+"""
+
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+from lsst.syseng_db import Parameter, db_from_param_list
+from lsst.syseng_db import token_query, keyword_query
+from lsst.syseng_db import syseng_db_config
+
+engineering_words = ["slew", "settle", "time", "mirror", "outer", "inner",
+                     "clear", "aperture", "conic", "constant", "asphere",
+                     "visit", "exposure", "readout", "noise", "filter",
+                     "focal", "plane", "throughput", "camera", "dome",
+                     "azimuth", "elevation", "tracking", "jitter", "thermal",
+                     "gradient", "pressure", "vacuum", "shutter", "wave",
+                     "front", "error", "budget", "pointing", "accuracy",
+                     "lens", "detector", "pixel", "charge", "transfer",
+                     "efficiency", "guider", "wavefront", "sensor",
+                     "actuator", "force", "mass", "stiffness", "frequency",
+                     "vibration", "seeing", "airmass", "sky", "brightness",
+                     "zero", "point", "magnitude", "depth"]
+
+
+def make_vocabulary(n_words, rng):
+    """
+    Return engineering_words followed by made-up words (e.g. 'tobaku'), for
+    a total of n_words distinct words
+    """
+    vocabulary = list(engineering_words)
+    word_set = set(vocabulary)
+    while len(vocabulary) < n_words:
+        word = "".join([rng.choice("bdfgklmnprstvz") + rng.choice("aeiou")
+                        for ii in range(rng.randint(2, 4))])
+        if word not in word_set:
+            word_set.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def make_parameters(n_parameters, n_words=3000):
+    """
+    Return a list of n_parameters synthetic Parameters with names made of two
+    to four words from a vocabulary of n_words words and a number
+    """
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(n_words, rng)
+    param_list = []
+    for ii in range(n_parameters):
+        words = rng.sample(vocabulary, rng.randint(2, 4))
+        name = words[0] + "".join([ww.capitalize() for ww in words[1:]]) \
+             + "_%d" % (ii % 100)
+        param_list.append(Parameter(name, doc=" ".join(words), units="m",
+                                    values={'defaultValue':'%d' % ii},
+                                    source="benchmark_%d.xml" % (ii % 70)))
+    return param_list
+
+
+def time_query(function, *args, **kwargs):
+    """
+    Return the best time in milliseconds of five calls to
+    function(*args, **kwargs), and the number of results
+    """
+    best = None
+    for ii in range(5):
+        t_start = time.time()
+        results = function(*args, **kwargs)
+        elapsed = 1000.0*(time.time()-t_start)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, len(results)
+
+
+if __name__ == "__main__":
+
+    n_parameters = 200000
+    if len(sys.argv) > 1:
+        n_parameters = int(sys.argv[1])
+    n_words = 3000
+    if len(sys.argv) > 2:
+        n_words = int(sys.argv[2])
+
+    scratch_dir = tempfile.mkdtemp()
+    syseng_db_config["db_dir"] = scratch_dir
+    syseng_db_config["db_name"] = "bench_sqlite.db"
+    db_name = os.path.join(scratch_dir, syseng_db_config["db_name"])
+    try:
+        t_start = time.time()
+        db_from_param_list(make_parameters(n_parameters, n_words),
+                           "bench", bulk=True)
+        sys.stdout.write("loaded %d Parameters in %.1f s\n"
+                         % (n_parameters, time.time()-t_start))
+
+        for label, keyword_list in (("exact", ["slew settle time"]),
+                                    ("prefix", ["wavefr sens"]),
+                                    ("typos", ["slwe setle tiem"]),
+                                    ("camelCase", ["outerMirrorAperture"])):
+            for fuzzy in (True, False):
+                elapsed, n_results = time_query(token_query, db_name, "bench",
+                                                keyword_list, fuzzy=fuzzy)
+                sys.stdout.write("token_query %-10s fuzzy=%-5s %8.2f ms "
+                                 "%4d results\n"
+                                 % (label, fuzzy, elapsed, n_results))
+
+        elapsed, n_results = time_query(keyword_query, db_name, "bench",
+                                        ["settle"])
+        sys.stdout.write("keyword_query 'settle' (substring) %8.2f ms "
+                         "%6d results\n" % (elapsed, n_results))
+    finally:
+        shutil.rmtree(scratch_dir)
@@ -0,0 +1,79 @@
+"""
+This script reports the differences between two model versions (tables) of
+$SYSENG_DB_DIR/db/LSST_parameter_sqlite.db, e.g.
+
+    python scripts/diff_versions.py v_0_0 v_0_1
+
+It lists the parameters that were added to or removed from the second
+version, and, for the parameters in both versions whose contents differ,
+the fields that changed and their old and new values.
+
+Pass --xml (possibly several times) to limit the comparison to parameters
+from particular .xml files, e.g.
+
+    python scripts/diff_versions.py v_0_0 v_0_1 --xml "Camera Requirements_v1.xml"
+"""
+
+import sys
+import os
+import time
+import argparse
+from lsst.syseng_db import diff_versions
+from lsst.syseng_db import syseng_db_config
+
+
+def write_change(old_param, new_param, changed, handle=sys.stdout):
+    """
+    Write the fields that changed between old_param and new_param to handle
+    """
+    handle.write("\n%s\n    %s\n" % (new_param.name, new_param.source))
+    for field in changed:
+        if field == 'units':
+            old_value, new_value = old_param.units, new_param.units
+        elif field == 'docstring':
+            old_value, new_value = old_param.doc, new_param.doc
+        else:
+            old_value = old_param.values[field]
+            new_value = new_param.values[field]
+        handle.write("    %s: %s -> %s\n" % (field, old_value, new_value))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare two model versions "
+                                     "of the parameter database")
+    parser.add_argument("old_version", help="the earlier version, e.g. v_0_0")
+    parser.add_argument("new_version", help="the later version, e.g. v_0_1")
+    parser.add_argument("--xml", action="append", default=None,
+                        help="only compare parameters from this .xml file "
+                        "(may be given several times)")
+
+    args = parser.parse_args()
+
+    db_name = os.path.join(syseng_db_config['db_dir'],
+                           syseng_db_config['db_name'])
+
+    if not os.path.exists(db_name):
+        raise RuntimeError("%s does not exist.\n" % db_name
+                           + "Run scripts/update_db.py to create it.")
+
+    t_start = time.time()
+    diff = diff_versions(db_name, args.old_version, args.new_version,
+                         xml_list=args.xml)
+    elapsed = time.time()-t_start
+
+    sys.stdout.write("#### added to %s: %d\n" % (args.new_version,
+                                                len(diff['added'])))
+    for param in diff['added']:
+        param.write_param()
+
+    sys.stdout.write("\n#### removed from %s: %d\n" % (args.old_version,
+                                                      len(diff['removed'])))
+    for param in diff['removed']:
+        param.write_param()
+
+    sys.stdout.write("\n#### modified: %d\n" % len(diff['modified']))
+    for old_param, new_param, changed in diff['modified']:
+        write_change(old_param, new_param, changed)
+
+    sys.stdout.write("\ncompared in %.3f seconds\n" % elapsed)
@@ -2,11 +2,15 @@
 This is an example script which queries LSST_parameter_sqlite.db for all of
 the parameters with the word 'throughput' in either their name or their
 docstring and writes them out to a file 'example_output.txt'
+
+The search is one of the saved queries evaluated by scripts/update_db.py,
+so its results are read straight from the database; if the table was
+loaded without the saved queries, the search is run instead.
 """
 
 from __future__ import with_statement
 import os
-from lsst.syseng_db import keyword_query
+from lsst.syseng_db import keyword_query, saved_query
 from lsst.syseng_db import syseng_db_config
 
 if __name__ == "__main__":
@@ -22,6 +26,9 @@ if __name__ == "__main__":
                            + "table 'v_0_0'.")
 
     with open("example_output.txt", "w") as output_file:
-        results = keyword_query(db_name, 'v_0_0', ["throughput"])
+        try:
+            results = saved_query(db_name, 'v_0_0', "throughput")
+        except RuntimeError:
+            results = keyword_query(db_name, 'v_0_0', ["throughput"])
         for param in results:
             param.write_param(output_file)
@@ -12,25 +12,92 @@ create a table in the database specified by syseng_db_config containing
 the Parameters.  The name of the table will be the same as the name of
 the sub-directory ('v_0_0' in the example above).
 
-An exception will be raised if the table already exists (or if the user
-specifies something other than a sub-directory of $SYSENG_DB_DIR/data/).
+To parse the .xml files in several worker processes at once, pass the
+number of processes with --jobs, e.g.
+
+    python scripts/update_db.py v_0_0 --jobs 8
+
+The resulting table is identical to the one produced by a serial run.
+The time taken to read each .xml file is reported as it is loaded.
+
+The hash of each .xml file's contents is recorded in the database's
+manifest table.  When Enterprise Architect re-exports a few packages, pass
+--update to refresh an existing table in place:
+
+    python scripts/update_db.py v_0_0 --update
+
+Only the .xml files that were changed, added or removed since the table
+was last loaded are read, and only their rows are replaced.
+
+Pass --bulk to load the rows with the bulk-load pragmas described in
+ParameterDB_constructor.bulk_load_pragmas (much faster for large versions,
+but the database can be corrupted if the script dies part way through).
+
+Pass --shadow to build into a copy of the database which is validated and
+renamed over the original only once the build has succeeded, so that the
+web interface never sees a half-built table:
+
+    python scripts/update_db.py v_0_1 --shadow --bulk
+
+Alternatively, pass --wal to build in place with the database in WAL mode,
+so that readers connected during the build keep a consistent snapshot.
+--wal cannot be combined with --bulk.
+
+The saved queries listed in scripts/saved_queries.json (the pages of the
+web interface and the search in scripts/example_query.py; see
+ParameterDB_saved) are evaluated against the table as part of the build,
+and their results stored for saved_query() to read.  Pass
+--saved-queries to read another registry, or --no-saved-queries to skip
+them (any results saved for the table before are then deleted).
+
+Without --update, an exception will be raised if the table already exists
+(or if the user specifies something other than a sub-directory of
+$SYSENG_DB_DIR/data/).
 """
 
 import sys
 import os
-from lsst.syseng_db import ParameterTree
-from lsst.syseng_db import db_from_param_list
-from lsst.syseng_db import syseng_db_config
+import time
+import argparse
+from lsst.syseng_db import db_from_xml_files, read_saved_queries
 
 if __name__ == "__main__":
 
-    arguments = sys.argv
+    parser = argparse.ArgumentParser(description="Load a sub-directory of "
+                                     "$SYSENG_DB_DIR/data/ into the parameter "
+                                     "database")
+    parser.add_argument("sub_dir",
+                        help="sub-directory of $SYSENG_DB_DIR/data/ to read, "
+                        "e.g. v_0_0")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes used to parse the "
+                        ".xml files (default 1)")
+    parser.add_argument("--update", action="store_true",
+                        help="only reload the .xml files that changed since "
+                        "the table was last loaded")
+    parser.add_argument("--shadow", action="store_true",
+                        help="build into a shadow copy of the database and "
+                        "swap it into place once it is complete")
+    # the bulk-load pragmas keep the journal in memory, which would take the
+    # database out of WAL mode for the whole build
+    journal_group = parser.add_mutually_exclusive_group()
+    journal_group.add_argument("--bulk", action="store_true",
+                               help="load the rows with the bulk-load pragmas "
+                               "(journal in memory, no fsync)")
+    journal_group.add_argument("--wal", action="store_true",
+                               help="switch the database to WAL mode before "
+                               "building in place")
+    parser.add_argument("--saved-queries",
+                        default=os.path.join(os.path.dirname(
+                            os.path.abspath(__file__)), "saved_queries.json"),
+                        help="registry of saved queries to evaluate against "
+                        "the table (default scripts/saved_queries.json)")
+    parser.add_argument("--no-saved-queries", action="store_true",
+                        help="do not evaluate the saved queries")
 
-    if len(arguments)<2:
-        raise RuntimeError("This script expects a sub-directory, e.g.:\n"
-                           +"\n    python scripts/update_db.py dir/to/read")
+    args = parser.parse_args()
 
-    sub_dir = arguments[1]
+    sub_dir = args.sub_dir
     data_dir = os.path.join(os.getenv("SYSENG_DB_DIR"), "data", sub_dir)
     if not os.path.exists(data_dir):
         raise RuntimeError("Directory %s does not exist" % data_dir)
@@ -38,11 +105,26 @@ if __name__ == "__main__":
     if not os.path.isdir(data_dir):
         raise RuntimeError("%s is not a directory" % data_dir)
 
-    parameter_list = []
-    list_of_files = os.listdir(data_dir)
-    for file_name in list_of_files:
-        if file_name.endswith(".xml"):
-            local_tree = ParameterTree(os.path.join(data_dir, file_name))
-            parameter_list.extend(local_tree.parameter_list)
+    list_of_files = sorted([os.path.join(data_dir, file_name)
+                            for file_name in os.listdir(data_dir)
+                            if file_name.endswith(".xml")])
+
+    saved_queries = None
+    if not args.no_saved_queries:
+        saved_queries = read_saved_queries(args.saved_queries)
+
+    t_start = time.time()
+    summary = db_from_xml_files(list_of_files, sub_dir, update=args.update,
+                                n_jobs=args.jobs, timing_handle=sys.stdout,
+                                bulk=args.bulk, shadow=args.shadow,
+                                wal=args.wal, saved_queries=saved_queries)
 
-    db_from_param_list(parameter_list, sub_dir)
+    for key in ('added', 'changed', 'removed'):
+        for file_name in summary[key]:
+            sys.stdout.write("%s: %s\n" % (key, file_name))
+    sys.stdout.write("loaded %d of %d files into table %s in %.3f seconds\n"
+                     % (len(summary['added'])+len(summary['changed']),
+                        len(list_of_files), sub_dir, time.time()-t_start))
+    if saved_queries is not None:
+        sys.stdout.write("saved %d queries for table %s\n"
+                         % (len(saved_queries), sub_dir))
@@ -0,0 +1,89 @@
+import unittest
+import os
+import threading
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import keyword_query, name_query, get_table_names
+from lsst.syseng_db import keyword_query_async, name_query_async
+from lsst.syseng_db import get_table_names_async
+from lsst.syseng_db import set_query_workers, shutdown_query_executor
+from lsst.syseng_db import syseng_db_config
+
+class TestAsyncQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "async_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+        data_file = os.path.join(cls.root_dir, "data", "v_0_0",
+                                 "Telescope Requirements_v1.xml")
+        db_from_param_list(ParameterTree(data_file).parameter_list, "test_table")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_query_executor()
+        set_query_workers(None)
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_results(self):
+        """
+        Test that the futures resolve to the same results as the blocking
+        query functions
+        """
+        keyword_list = [['eak'], ['etch'], ['a'], ['e', 'o']]
+        future_list = [keyword_query_async(self.full_db_name, "test_table", kw)
+                       for kw in keyword_list]
+        for kw, future in zip(keyword_list, future_list):
+            self.assertEqual([pp.name for pp in future.result()],
+                             [pp.name for pp in keyword_query(self.full_db_name,
+                                                              "test_table", kw)])
+
+        self.assertEqual(get_table_names_async(self.full_db_name).result(),
+                         get_table_names(self.full_db_name))
+
+        name = future_list[0].result()[0].name
+        self.assertEqual(len(name_query_async(self.full_db_name, "test_table",
+                                              [name]).result()),
+                         len(name_query(self.full_db_name, "test_table", [name])))
+
+
+    def test_errors(self):
+        """
+        Test that exceptions raised by a query are raised by its future
+        """
+        future = keyword_query_async(self.full_db_name, "test_table", ['eak'],
+                                     mode='not_a_mode')
+        self.assertRaises(RuntimeError, future.result)
+
+
+    def test_bounded(self):
+        """
+        Test that no more than the configured number of queries run at once
+        """
+        shutdown_query_executor()
+        set_query_workers(2)
+        thread_set = set()
+        lock = threading.Lock()
+        def record(kw_list):
+            with lock:
+                thread_set.add(threading.current_thread().ident)
+            return kw_list
+        import lsst.syseng_db.ParameterDB_async as async_module
+        future_list = [async_module._query_executor().submit(record, ix)
+                       for ix in range(20)]
+        self.assertEqual([ff.result() for ff in future_list], range(20))
+        self.assertLessEqual(len(thread_set), 2)
+        shutdown_query_executor()
+        set_query_workers(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import time
+import sqlite3
+
+from lsst.syseng_db import db_from_param_list, Parameter, syseng_db_config
+from lsst.syseng_db import get_table_names, get_catalog, catalog_cache_stats
+from lsst.syseng_db import get_parameter_names, get_xml_files
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(self.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "catalog_test_db_sqlite.db"
+        self.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(self.full_db_name):
+            os.unlink(self.full_db_name)
+
+        self.param_list = [Parameter("zeta", values={'defaultValue': '1'},
+                                     source="Telescope Requirements_v1.xml"),
+                           Parameter("Alpha", values={'defaultValue': '2'},
+                                     source="Camera Requirements_v1.xml"),
+                           Parameter("alpha", values={'defaultValue': '3'},
+                                     source="Telescope Requirements_v1.xml")]
+        self.t_start = time.time()
+        db_from_param_list(self.param_list, "version_a")
+        db_from_param_list(list(reversed(self.param_list)), "version_b")
+        db_from_param_list(self.param_list[:2], "version_c")
+
+
+    def tearDown(self):
+        if os.path.exists(self.full_db_name):
+            os.unlink(self.full_db_name)
+
+
+    def test_catalog(self):
+        """
+        Test that the catalog describes each version as it was built
+        """
+        catalog = get_catalog(self.full_db_name)
+        self.assertEqual(sorted(catalog), ["version_a", "version_b", "version_c"])
+        self.assertEqual(catalog["version_a"]["n_parameters"], 3)
+        self.assertEqual(catalog["version_c"]["n_parameters"], 2)
+        self.assertEqual(catalog["version_a"]["sources"],
+                         ["Camera Requirements_v1.xml",
+                          "Telescope Requirements_v1.xml"])
+        for version in catalog:
+            self.assertGreaterEqual(catalog[version]["build_time"], self.t_start)
+            self.assertLessEqual(catalog[version]["build_time"], time.time())
+
+        # the same Parameters in a different order have the same hash
+        self.assertEqual(catalog["version_a"]["content_hash"],
+                         catalog["version_b"]["content_hash"])
+        self.assertNotEqual(catalog["version_a"]["content_hash"],
+                            catalog["version_c"]["content_hash"])
+
+        self.assertEqual(get_xml_files(self.full_db_name, "version_c"),
+                         catalog["version_c"]["sources"])
+        self.assertEqual(get_parameter_names(self.full_db_name, "version_a"),
+                         ["Alpha", "alpha", "zeta"])
+        with self.assertRaises(RuntimeError):
+            get_xml_files(self.full_db_name, "not_a_version")
+
+
+    def test_refresh(self):
+        """
+        Test that the catalog is only read again when the database changes
+        """
+        self.assertEqual(get_table_names(self.full_db_name),
+                         ["version_a", "version_b", "version_c"])
+        loads = catalog_cache_stats()['loads']
+        get_table_names(self.full_db_name)
+        get_xml_files(self.full_db_name, "version_a")
+        get_catalog(self.full_db_name)
+        self.assertEqual(catalog_cache_stats()['loads'], loads)
+
+        db_from_param_list(self.param_list[1:], "version_d")
+        self.assertEqual(get_table_names(self.full_db_name),
+                         ["version_a", "version_b", "version_c", "version_d"])
+        self.assertEqual(get_catalog(self.full_db_name)["version_d"]["n_parameters"], 2)
+        self.assertEqual(catalog_cache_stats()['loads'], loads+1)
+
+
+    def test_missing_rows(self):
+        """
+        Test that versions without a row in the catalog table (e.g. built by
+        an older syseng_db) are still listed, and their .xml files found
+        """
+        conn = sqlite3.connect(self.full_db_name)
+        conn.execute("DROP TABLE syseng_catalog")
+        conn.execute("CREATE TABLE legacy (name text, defaultValue text, "
+                     "upperValue text, lowerValue text, units text, "
+                     "docstring text, source text)")
+        conn.execute("INSERT INTO legacy VALUES ('beta', '1', 'NULL', 'NULL', "
+                     "'m', 'NULL', 'legacy.xml')")
+        conn.commit()
+        conn.close()
+
+        catalog = get_catalog(self.full_db_name)
+        self.assertEqual(sorted(catalog),
+                         ["legacy", "version_a", "version_b", "version_c"])
+        self.assertIsNone(catalog["legacy"]["n_parameters"])
+        self.assertIsNone(catalog["version_a"]["content_hash"])
+        self.assertEqual(get_xml_files(self.full_db_name, "legacy"),
+                         ["legacy.xml"])
+        self.assertEqual(get_xml_files(self.full_db_name, "version_a"),
+                         ["Camera Requirements_v1.xml",
+                          "Telescope Requirements_v1.xml"])
+        self.assertEqual(get_parameter_names(self.full_db_name, "legacy"),
+                         ["beta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import sqlite3
+import threading
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import keyword_query, connection_pool
+from lsst.syseng_db import syseng_db_config
+
+class TestConnectionPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "pool_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+        data_file = os.path.join(cls.root_dir, "data", "v_0_0",
+                                 "Telescope Requirements_v1.xml")
+        cls.param_list = ParameterTree(data_file).parameter_list
+        db_from_param_list(cls.param_list, "test_table")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        for suffix in ("", ".shadow"):
+            if os.path.exists(cls.full_db_name+suffix):
+                os.unlink(cls.full_db_name+suffix)
+
+
+    def test_concurrent_queries(self):
+        """
+        Test that queries from many threads at once return the same results
+        as the same queries run one after another
+        """
+        keyword_list = [['eak'], ['etch'], ['a'], ['e', 'o']]
+        expected = [[pp.name for pp in keyword_query(self.full_db_name,
+                                                      "test_table", kw)]
+                    for kw in keyword_list]
+
+        errors = []
+        def worker():
+            try:
+                for ix in range(20):
+                    kw = keyword_list[ix % len(keyword_list)]
+                    names = [pp.name for pp in keyword_query(self.full_db_name,
+                                                             "test_table", kw)]
+                    if names != expected[ix % len(keyword_list)]:
+                        errors.append("wrong results for %s" % str(kw))
+            except Exception, w:
+                errors.append(str(w))
+
+        thread_list = [threading.Thread(target=worker) for ix in range(8)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+    def test_read_only(self):
+        """
+        Test that pooled connections cannot write to the database
+        """
+        pool = connection_pool()
+        with pool.connection(self.full_db_name) as conn:
+            self.assertRaises(sqlite3.DatabaseError, conn.execute,
+                              "CREATE TABLE should_fail (a int)")
+        pool.close()
+
+
+    def test_bound(self):
+        """
+        Test that the pool never opens more than max_connections connections
+        to a file, and reuses the connections it has
+        """
+        pool = connection_pool(max_connections=2, timeout=0.1)
+        with pool.connection(self.full_db_name) as conn_1:
+            with pool.connection(self.full_db_name) as conn_2:
+                self.assertIsNot(conn_1, conn_2)
+                def checkout():
+                    with pool.connection(self.full_db_name) as conn:
+                        pass
+                self.assertRaises(RuntimeError, checkout)
+        with pool.connection(self.full_db_name) as conn_3:
+            self.assertIn(conn_3, (conn_1, conn_2))
+        pool.close()
+
+
+    def test_health_check(self):
+        """
+        Test that connections which are broken, or whose file has been
+        replaced, are not handed out again
+        """
+        pool = connection_pool(max_connections=1)
+        with pool.connection(self.full_db_name) as conn:
+            first_conn = conn
+        first_conn.close()
+        with pool.connection(self.full_db_name) as conn:
+            self.assertIsNot(conn, first_conn)
+            second_conn = conn
+
+        db_from_param_list(self.param_list[:2], "other_table", shadow=True)
+        with pool.connection(self.full_db_name) as conn:
+            self.assertIsNot(conn, second_conn)
+            rows = conn.execute("SELECT name FROM sqlite_master "
+                                "WHERE name='other_table'").fetchall()
+            self.assertEqual(len(rows), 1)
+        pool.close()
+
+
+    def test_close(self):
+        """
+        Test that close() closes idle connections, and connections checked
+        out at the time once they are returned
+        """
+        pool = connection_pool()
+        with pool.connection(self.full_db_name) as busy_conn:
+            with pool.connection(self.full_db_name) as idle_conn:
+                pass
+            pool.close()
+            self.assertRaises(sqlite3.ProgrammingError, idle_conn.execute,
+                              "SELECT 1")
+            busy_conn.execute("SELECT 1")
+        self.assertRaises(sqlite3.ProgrammingError, busy_conn.execute,
+                          "SELECT 1")
+
+        # the pool can still be used
+        with pool.connection(self.full_db_name) as conn:
+            conn.execute("SELECT 1")
+        pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import os
+import sqlite3
 from lsst.syseng_db import ParameterTree, db_from_param_list, syseng_db_config
 from lsst.syseng_db import db_from_xml_file
 
@@ -51,6 +52,43 @@ class DB_generation_test(unittest.TestCase):
         if os.path.exists(full_out_name):
             os.unlink(full_out_name)
 
+    def test_bulk_load(self):
+        """
+        Test that bulk-loading a table produces the same rows as loading it
+        row-by-row, and that the database's journal mode is restored afterwards
+        """
+        root_dir = os.getenv("SYSENG_DB_DIR")
+        out_dir = os.path.join(root_dir, "tests", "testDb")
+        out_name = "db_bulk_test_sqlite.db"
+
+        full_out_name = os.path.join(out_dir, out_name)
+        if os.path.exists(full_out_name):
+            os.unlink(full_out_name)
+
+        # put the database in WAL mode, which persists across connections
+        conn = sqlite3.connect(full_out_name)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+
+        data_file = os.path.join(root_dir, "data", "v_0_0")
+        data_file = os.path.join(data_file, "Science_Requirements_v1.xml")
+        tree = ParameterTree(data_file)
+        syseng_db_config["db_dir"] = out_dir
+        syseng_db_config["db_name"] = out_name
+        db_from_param_list(tree.parameter_list, 'row_table')
+        db_from_param_list(iter(tree.parameter_list), 'bulk_table', bulk=True)
+
+        conn = sqlite3.connect(full_out_name)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        row_results = conn.execute("SELECT * FROM row_table").fetchall()
+        bulk_results = conn.execute("SELECT * FROM bulk_table").fetchall()
+        conn.close()
+        self.assertEqual(len(row_results), len(tree.parameter_list))
+        self.assertEqual(row_results, bulk_results)
+
+        if os.path.exists(full_out_name):
+            os.unlink(full_out_name)
+
 
 if __name__ == "__main__":
     unittest.main()
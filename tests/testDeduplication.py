@@ -0,0 +1,64 @@
+import unittest
+import os
+import sqlite3
+
+from lsst.syseng_db import db_from_xml_file, db_from_xml_files, name_query
+from lsst.syseng_db import get_parameter_names, get_xml_files
+from lsst.syseng_db import syseng_db_config
+
+class TestDeduplication(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        cls.data_file_1 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_1)
+        cls.data_file_2 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_2)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "dedup_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        # version_a contains source_1; version_b contains source_1 and source_2
+        db_from_xml_file(cls.data_file_1, "version_a")
+        db_from_xml_files([cls.data_file_1, cls.data_file_2], "version_b")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_records_shared(self):
+        """
+        Test that the Parameters common to two versions are only stored once
+        """
+        n_a = len(get_parameter_names(self.full_db_name, "version_a"))
+        conn = sqlite3.connect(self.full_db_name)
+        n_b = conn.execute("SELECT COUNT(*) FROM version_b").fetchone()[0]
+        n_records = conn.execute("SELECT COUNT(*) FROM syseng_records").fetchone()[0]
+        conn.close()
+        self.assertGreater(n_a, 0)
+        self.assertGreater(n_b, n_a)
+        self.assertEqual(n_records, n_b)
+
+
+    def test_versions_independent(self):
+        """
+        Test that each version only returns its own Parameters
+        """
+        self.assertEqual(get_xml_files(self.full_db_name, "version_a"), [self.source_1])
+        self.assertEqual(len(get_xml_files(self.full_db_name, "version_b")), 2)
+
+        results = name_query(self.full_db_name, "version_a", ["m1_6thAsphere"])
+        self.assertEqual([pp.source for pp in results], [self.source_1])
+        results = name_query(self.full_db_name, "version_b", ["m1_6thAsphere"])
+        self.assertEqual(sorted([pp.source for pp in results]),
+                         sorted([self.source_1, self.source_2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
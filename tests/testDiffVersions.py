@@ -0,0 +1,80 @@
+import unittest
+import os
+
+from lsst.syseng_db import db_from_param_list, diff_versions, ParameterTree
+from lsst.syseng_db import Parameter
+from lsst.syseng_db import syseng_db_config
+
+class TestDiffVersions(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source = "Telescope Requirements_v1.xml"
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", cls.source)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "diff_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        old_list = ParameterTree(cls.data_file).parameter_list
+        old_list = sorted(old_list, key=lambda pp: pp.name)
+
+        # the new version drops the first Parameter, changes the default value
+        # and units of the second, and adds a new Parameter
+        cls.removed = old_list[0]
+        cls.modified = old_list[1]
+        changed = Parameter(cls.modified.name, doc=cls.modified.doc, units="furlongs",
+                            values={'defaultValue':'-999.0'}, source=cls.modified.source)
+        cls.added = Parameter("brandNewParameter", doc="a new parameter", units="m",
+                              values={'defaultValue':'1.0'}, source=cls.source)
+        new_list = old_list[2:] + [changed, cls.added]
+
+        db_from_param_list(old_list, "old_version")
+        db_from_param_list(new_list, "new_version")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_diff(self):
+        """
+        Test that diff_versions finds exactly the added, removed and modified
+        Parameters, and the fields that changed
+        """
+        diff = diff_versions(self.full_db_name, "old_version", "new_version")
+        self.assertEqual([pp.name for pp in diff['added']], [self.added.name])
+        self.assertEqual([pp.name for pp in diff['removed']], [self.removed.name])
+        self.assertEqual(len(diff['modified']), 1)
+        old_param, new_param, changed = diff['modified'][0]
+        self.assertEqual(old_param.name, self.modified.name)
+        self.assertEqual(new_param.values['defaultValue'], '-999.0')
+        self.assertIn('defaultValue', changed)
+        self.assertIn('units', changed)
+        self.assertNotIn('docstring', changed)
+
+        # the reverse comparison swaps added and removed
+        diff = diff_versions(self.full_db_name, "new_version", "old_version")
+        self.assertEqual([pp.name for pp in diff['added']], [self.removed.name])
+        self.assertEqual([pp.name for pp in diff['removed']], [self.added.name])
+
+        # a version compared with itself has no differences
+        diff = diff_versions(self.full_db_name, "old_version", "old_version")
+        self.assertEqual(len(diff['added'])+len(diff['removed'])+len(diff['modified']), 0)
+
+
+    def test_diff_xml_list(self):
+        """
+        Test that diff_versions respects xml_list
+        """
+        diff = diff_versions(self.full_db_name, "old_version", "new_version",
+                             xml_list=["not_a_file.xml"])
+        self.assertEqual(len(diff['added'])+len(diff['removed'])+len(diff['modified']), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import copy
+
+from lsst.syseng_db import db_from_param_list, keyword_query, ParameterTree
+from lsst.syseng_db import syseng_db_config
+
+class TestFulltextQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        cls.data_file_1 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_1)
+        cls.data_file_2 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_2)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "fulltext_query_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        cls.reference_tree_1 = ParameterTree(cls.data_file_1)
+        param_list = copy.deepcopy(cls.reference_tree_1.parameter_list)
+        cls.reference_tree_2 = ParameterTree(cls.data_file_2)
+        param_list.extend(cls.reference_tree_2.parameter_list)
+        db_from_param_list(param_list, cls.test_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_fulltext_query(self):
+        """
+        Test that a 'fulltext' keyword_query returns ranked Parameters which
+        are a subset of the 'substring' results for the same keyword, and
+        that it matches the start of words
+        """
+        substring_results = keyword_query(self.full_db_name, self.test_table, ["m1"])
+        fulltext_results = keyword_query(self.full_db_name, self.test_table, ["m1"],
+                                         mode='fulltext')
+        self.assertGreater(len(fulltext_results), 0)
+
+        substring_keys = [(pp.name, pp.source) for pp in substring_results]
+        for pp in fulltext_results:
+            self.assertIn((pp.name, pp.source), substring_keys)
+            self.assertIn('[', pp.snippet)
+
+        for ii in range(len(fulltext_results)-1):
+            self.assertLessEqual(fulltext_results[ii].rank, fulltext_results[ii+1].rank)
+
+        # m1ConicConstant exists in both files and matches 'm1' as a prefix
+        names = [pp.name for pp in fulltext_results]
+        self.assertEqual(names.count("m1ConicConstant"), 2)
+
+
+    def test_fulltext_xml_query(self):
+        """
+        Test that a 'fulltext' keyword_query respects xml_list
+        """
+        results = keyword_query(self.full_db_name, self.test_table, ["m1"],
+                                xml_list=[self.source_1], mode='fulltext')
+        self.assertGreater(len(results), 0)
+        for pp in results:
+            self.assertEqual(pp.source, self.source_1)
+
+
+    def test_bad_mode(self):
+        """
+        Test that an unknown mode raises an exception
+        """
+        self.assertRaises(RuntimeError, keyword_query, self.full_db_name,
+                          self.test_table, ["m1"], mode='fuzzy')
+
+
+if __name__ == "__main__":
+    unittest.main()
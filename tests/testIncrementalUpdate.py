@@ -0,0 +1,95 @@
+import unittest
+import os
+import shutil
+
+from lsst.syseng_db import db_from_xml_files, get_xml_files, get_table_names
+from lsst.syseng_db import name_query, get_parameter_names, keyword_query
+from lsst.syseng_db import syseng_db_config
+
+class TestIncrementalUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = os.getenv("SYSENG_DB_DIR")
+        self.out_dir = os.path.join(self.root_dir, "tests", "testDb")
+        syseng_db_config["db_dir"] = self.out_dir
+        syseng_db_config["db_name"] = "incremental_test_sqlite.db"
+        self.full_db_name = os.path.join(self.out_dir, syseng_db_config["db_name"])
+        if os.path.exists(self.full_db_name):
+            os.unlink(self.full_db_name)
+
+        # work on copies of the .xml files so that we can modify them
+        self.work_dir = os.path.join(self.out_dir, "incremental_xml")
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+        os.mkdir(self.work_dir)
+
+        self.source_1 = "Telescope Requirements_v1.xml"
+        self.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        self.source_3 = "Science_Requirements_v1.xml"
+        for source in (self.source_1, self.source_2, self.source_3):
+            shutil.copy(os.path.join(self.root_dir, "data", "v_0_0", source),
+                        os.path.join(self.work_dir, source))
+
+        self.test_table = "test_table"
+
+
+    def tearDown(self):
+        if os.path.exists(self.full_db_name):
+            os.unlink(self.full_db_name)
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+
+
+    def file_list(self, source_list):
+        return [os.path.join(self.work_dir, source) for source in source_list]
+
+
+    def test_update(self):
+        """
+        Test that updating a table only reloads the .xml files that changed,
+        and that the result is the same as building the table from scratch
+        """
+        summary = db_from_xml_files(self.file_list([self.source_1, self.source_2]),
+                                    self.test_table)
+        self.assertEqual(summary['added'], sorted([self.source_1, self.source_2]))
+        self.assertEqual(get_table_names(self.full_db_name), [self.test_table])
+
+        # nothing changed
+        summary = db_from_xml_files(self.file_list([self.source_1, self.source_2]),
+                                    self.test_table, update=True)
+        self.assertEqual(summary['added'], [])
+        self.assertEqual(summary['changed'], [])
+        self.assertEqual(summary['removed'], [])
+        self.assertEqual(len(summary['unchanged']), 2)
+        results = name_query(self.full_db_name, self.test_table, ["m1_6thAsphere"])
+        self.assertEqual(len(results), 2)
+
+        # replace source_2 with different contents, drop source_1, add source_3
+        shutil.copy(os.path.join(self.root_dir, "data", "v_0_0", self.source_1),
+                    os.path.join(self.work_dir, self.source_2))
+        summary = db_from_xml_files(self.file_list([self.source_2, self.source_3]),
+                                    self.test_table, update=True)
+        self.assertEqual(summary['added'], [self.source_3])
+        self.assertEqual(summary['changed'], [self.source_2])
+        self.assertEqual(summary['removed'], [self.source_1])
+
+        self.assertEqual(get_xml_files(self.full_db_name, self.test_table),
+                         sorted([self.source_2, self.source_3], key=lambda s: s.lower()))
+
+        results = name_query(self.full_db_name, self.test_table, ["m1_6thAsphere"])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].source, self.source_2)
+
+        # the full-text index must have followed the update
+        results = keyword_query(self.full_db_name, self.test_table, ["m1_6thAsphere"],
+                                mode='fulltext')
+        self.assertEqual([pp.source for pp in results], [self.source_2])
+
+        # compare with a table built from scratch
+        db_from_xml_files(self.file_list([self.source_2, self.source_3]), "control_table")
+        self.assertEqual(get_parameter_names(self.full_db_name, self.test_table),
+                         get_parameter_names(self.full_db_name, "control_table"))
+
+
+if __name__ == "__main__":
+    unittest.main()
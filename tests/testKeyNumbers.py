@@ -0,0 +1,78 @@
+import unittest
+import os
+
+from lsst.syseng_db import db_from_param_list, read_key_numbers
+from lsst.syseng_db import key_numbers_query, Parameter, syseng_db_config
+
+class TestKeyNumbers(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "key_numbers_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+        cls.key_file = os.path.join(syseng_db_config["db_dir"], "key_numbers_test.txt")
+
+        cls.test_table = "test_table"
+        param_list = [Parameter("alpha", values={'defaultValue': '1'},
+                                source="Telescope Requirements_v1.xml"),
+                      Parameter("alpha", values={'defaultValue': '2'},
+                                source="Camera Requirements_v1.xml"),
+                      Parameter("alphaBeta", values={'defaultValue': '3'},
+                                source="Telescope Requirements_v1.xml"),
+                      Parameter("gamma", values={'defaultValue': '4'},
+                                source="Camera Requirements_v1.xml")]
+        db_from_param_list(param_list, cls.test_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        for file_name in (cls.full_db_name, cls.key_file):
+            if os.path.exists(file_name):
+                os.unlink(file_name)
+
+
+    def test_read_key_numbers(self):
+        """
+        Test that key numbers files are read in order, skipping comments
+        """
+        with open(self.key_file, 'w') as output_file:
+            output_file.write("# key numbers\n\ngamma = Camera Requirements_v1.xml\n"
+                              "  alpha=Telescope Requirements_v1.xml  \n")
+        self.assertEqual(read_key_numbers(self.key_file),
+                         [('gamma', 'Camera Requirements_v1.xml'),
+                          ('alpha', 'Telescope Requirements_v1.xml')])
+
+        with open(self.key_file, 'w') as output_file:
+            output_file.write("gamma = Camera Requirements_v1.xml\nalpha\n")
+        with self.assertRaises(RuntimeError) as context:
+            read_key_numbers(self.key_file)
+        self.assertIn('Line 2', context.exception.args[0])
+
+
+    def test_key_numbers_query(self):
+        """
+        Test that key numbers match both name and .xml file exactly, and are
+        returned in the order they are listed
+        """
+        key_list = [('gamma', 'Camera Requirements_v1.xml'),
+                    ('alpha', 'Telescope Requirements_v1.xml'),
+                    ('gamma', 'Telescope Requirements_v1.xml'),
+                    ('alphaBet', 'Telescope Requirements_v1.xml'),
+                    ('alpha', 'Camera Requirements_v1.xml')]
+        results = key_numbers_query(self.full_db_name, self.test_table, key_list)
+        self.assertEqual([(pp.name, pp.source, pp.values['defaultValue'])
+                          for pp in results],
+                         [('gamma', 'Camera Requirements_v1.xml', '4'),
+                          ('alpha', 'Telescope Requirements_v1.xml', '1'),
+                          ('alpha', 'Camera Requirements_v1.xml', '2')])
+
+        self.assertEqual(key_numbers_query(self.full_db_name, self.test_table,
+                                           []), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
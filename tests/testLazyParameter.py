@@ -0,0 +1,99 @@
+import unittest
+import os
+import copy
+import pickle
+from cStringIO import StringIO
+
+from lsst.syseng_db import db_from_param_list, keyword_query, name_query
+from lsst.syseng_db import range_query, search_query, iter_keyword_query
+from lsst.syseng_db import ParameterTree, Parameter, LazyParameter
+from lsst.syseng_db import ParameterList, syseng_db_config
+from lsst.syseng_db.ParameterDB_query import _convert_row_to_parameter
+
+class TestLazyParameter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", "Telescope Requirements_v1.xml")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "lazy_parameter_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        cls.param_list = copy.deepcopy(ParameterTree(cls.data_file).parameter_list)
+        cls.param_list.append(Parameter("bareParam", values={}))
+        db_from_param_list(cls.param_list, cls.test_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def assertSameParameter(self, test, control):
+        self.assertEqual(test.name, control.name)
+        self.assertEqual(test.doc, control.doc)
+        self.assertEqual(test.units, control.units)
+        self.assertEqual(test.source, control.source)
+        self.assertEqual(test.values, control.values)
+        test_handle = StringIO()
+        test.write_param(handle=test_handle)
+        control_handle = StringIO()
+        control.write_param(handle=control_handle)
+        self.assertEqual(test_handle.getvalue(), control_handle.getvalue())
+
+
+    def test_decoding(self):
+        """
+        Test that a LazyParameter decodes a row as _convert_row_to_parameter
+        does, 'NULL' placeholders included
+        """
+        rows = [(u'aa', u'1.0', u'NULL', u'NULL', u'm', u'a doc', u'dir/file.xml'),
+                (u'bb', u'NULL', u'2.0', u'NULL', u'NULL', u'NULL', u'NULL'),
+                (u'cc', None, None, None, None, None, None)]
+        for row in rows:
+            lazy = LazyParameter(row)
+            self.assertIsInstance(lazy, Parameter)
+            self.assertSameParameter(lazy, _convert_row_to_parameter(row))
+
+        lazy = LazyParameter(rows[0])
+        self.assertSameParameter(copy.deepcopy(lazy), lazy)
+        self.assertSameParameter(pickle.loads(pickle.dumps(lazy, 2)), lazy)
+        self.assertSameParameter(ParameterList([lazy])[0], lazy)
+
+
+    def test_query_results(self):
+        """
+        Test that the query functions return LazyParameters matching the
+        Parameters that were loaded
+        """
+        control = dict([(pp.name, pp) for pp in self.param_list])
+        results = [keyword_query(self.full_db_name, self.test_table, ['m1']),
+                   name_query(self.full_db_name, self.test_table,
+                              list(control)),
+                   range_query(self.full_db_name, self.test_table,
+                               'defaultValue', None, None),
+                   search_query(self.full_db_name, self.test_table, 'name:m1*'),
+                   list(iter_keyword_query(self.full_db_name, self.test_table,
+                                           ['m1']))]
+        self.assertEqual(len(results[1]), len(self.param_list))
+        for result_list in results:
+            self.assertGreater(len(result_list), 0)
+            for pp in result_list:
+                self.assertIsInstance(pp, LazyParameter)
+                loaded = control[pp.name]
+                self.assertEqual(pp.doc, loaded.doc)
+                self.assertEqual(pp.units, loaded.units)
+                self.assertEqual(pp.source, loaded.source)
+                # missing values are stored as 'NULL'
+                for val_name in ('defaultValue', 'upperValue', 'lowerValue'):
+                    self.assertEqual(pp.values[val_name],
+                                     loaded.values.get(val_name, 'NULL'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+import os
+import copy
+import time
+
+from lsst.syseng_db import db_from_param_list, keyword_query, name_query
+from lsst.syseng_db import db_from_xml_files
+from lsst.syseng_db import enable_result_cache, disable_result_cache
+from lsst.syseng_db import get_table_names, search_query, token_query
+from lsst.syseng_db import serve_from_memory, stop_serving_from_memory
+from lsst.syseng_db import memory_snapshot_stats
+from lsst.syseng_db import ParameterTree, Parameter, syseng_db_config
+
+class TestMemoryServing(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        cls.data_file_1 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_1)
+        cls.data_file_2 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_2)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "memory_serving_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        cls.reference_tree_1 = ParameterTree(cls.data_file_1)
+        param_list = copy.deepcopy(cls.reference_tree_1.parameter_list)
+        cls.reference_tree_2 = ParameterTree(cls.data_file_2)
+        param_list.extend(cls.reference_tree_2.parameter_list)
+        cls.param_list = param_list
+        db_from_param_list(param_list, cls.test_table)
+
+        cls.second_table = "second_table"
+        db_from_param_list(copy.deepcopy(cls.reference_tree_2.parameter_list),
+                           cls.second_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_serving_from_memory()
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def tearDown(self):
+        stop_serving_from_memory()
+
+
+    def assertSameParameters(self, list_1, list_2):
+        self.assertEqual(len(list_1), len(list_2))
+        for p1, p2 in zip(list_1, list_2):
+            self.assertEqual(p1.name, p2.name)
+            self.assertEqual(p1.doc, p2.doc)
+            self.assertEqual(p1.units, p2.units)
+            self.assertEqual(p1.source, p2.source)
+            self.assertEqual(p1.values, p2.values)
+
+
+    def test_same_results(self):
+        """
+        Test that the in-memory copy gives the same results as the file
+        """
+        queries = [lambda: keyword_query(self.full_db_name, self.test_table,
+                                         ['m1', 'time']),
+                   lambda: keyword_query(self.full_db_name, self.test_table,
+                                         ['asphere'], mode='fulltext'),
+                   lambda: name_query(self.full_db_name, self.test_table,
+                                      ['m1OuterCa', 'slewSettle_time']),
+                   lambda: search_query(self.full_db_name, self.test_table,
+                                        'name:m1* OR upper > 10'),
+                   lambda: token_query(self.full_db_name, self.test_table,
+                                       ['outer'])]
+
+        from_disk = [query() for query in queries]
+        disk_versions = get_table_names(self.full_db_name)
+        self.assertGreater(len(from_disk[0]), 0)
+        self.assertGreater(len(from_disk[2]), 0)
+
+        serve_from_memory(self.full_db_name)
+        stats = memory_snapshot_stats(self.full_db_name)
+        self.assertEqual(stats['loaded_versions'], sorted(disk_versions))
+        self.assertEqual(get_table_names(self.full_db_name), disk_versions)
+        self.assertTrue(stats['uri'].startswith('file:'))
+
+        for query, disk_results in zip(queries, from_disk):
+            self.assertSameParameters(query(), disk_results)
+
+
+    def test_selected_versions(self):
+        """
+        Test that only the selected versions are loaded
+        """
+        serve_from_memory(self.full_db_name, versions=[self.second_table])
+        self.assertEqual(get_table_names(self.full_db_name),
+                         [self.second_table])
+        results = name_query(self.full_db_name, self.second_table,
+                             [pp.name for pp in
+                              self.reference_tree_2.parameter_list])
+        self.assertEqual(len(results),
+                         len(self.reference_tree_2.parameter_list))
+
+        stop_serving_from_memory(self.full_db_name)
+        self.assertIsNone(memory_snapshot_stats(self.full_db_name))
+        self.assertIn(self.test_table, get_table_names(self.full_db_name))
+
+        with self.assertRaises(RuntimeError) as context:
+            serve_from_memory(self.full_db_name, versions=['not_a_version'])
+        self.assertIn('not_a_version', context.exception.args[0])
+
+
+    def test_reload(self):
+        """
+        Test that the copy is replaced when the file changes
+        """
+        serve_from_memory(self.full_db_name, check_interval=0.0)
+        self.assertEqual(memory_snapshot_stats(self.full_db_name)['reloads'], 0)
+        self.assertNotIn('third_table', get_table_names(self.full_db_name))
+
+        db_from_param_list([Parameter("memoryOnlyParam", doc="new", values={},
+                                      source=self.source_1)], 'third_table')
+        self.assertIn('third_table', get_table_names(self.full_db_name))
+        self.assertEqual(memory_snapshot_stats(self.full_db_name)['reloads'], 1)
+        results = name_query(self.full_db_name, 'third_table',
+                             ['memoryOnlyParam'])
+        self.assertEqual([pp.name for pp in results], ['memoryOnlyParam'])
+
+
+    def test_result_cache_reload(self):
+        """
+        Test that results cached from a snapshot are not reused once the
+        snapshot has been replaced, even if they were cached after the file
+        changed (but before the snapshot was reloaded)
+        """
+        db_from_xml_files([self.data_file_1, self.data_file_2], 'cached_table')
+        name = self.reference_tree_2.parameter_list[0].name
+        enable_result_cache(ttl=None)
+        try:
+            serve_from_memory(self.full_db_name, check_interval=0.5)
+            results = keyword_query(self.full_db_name, 'cached_table', [name],
+                                    xml_list=[self.source_2])
+            self.assertGreater(len(results), 0)
+
+            db_from_xml_files([self.data_file_1], 'cached_table', update=True)
+            # still answered from the old snapshot
+            keyword_query(self.full_db_name, 'cached_table', [name],
+                          xml_list=[self.source_2])
+
+            time.sleep(0.6)
+            results = keyword_query(self.full_db_name, 'cached_table', [name],
+                                    xml_list=[self.source_2])
+            self.assertEqual(memory_snapshot_stats(self.full_db_name)['reloads'],
+                             1)
+            self.assertEqual(results, [])
+        finally:
+            disable_result_cache()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import os
 import copy
 
 from lsst.syseng_db import db_from_param_list, name_query, ParameterTree
+from lsst.syseng_db import get_parameter_names
 from lsst.syseng_db import syseng_db_config
 
 class TestNamequeries(unittest.TestCase):
@@ -73,5 +74,24 @@ class TestNamequeries(unittest.TestCase):
         self.assertIn("Telescope Requirements_v1.xml", xml_dict["10min_track_goal"])
 
 
+    def test_large_name_query(self):
+        """
+        Test that a list of names longer than SQLite's limit on bound
+        variables (and containing duplicates) returns every instance of each
+        name exactly once
+        """
+        name_list = get_parameter_names(self.full_db_name, self.test_table)
+        query_list = ["not_a_parameter_%d" % ii for ii in range(40000)]
+        query_list.extend(name_list)
+        query_list.extend(name_list)
+
+        results = name_query(self.full_db_name, self.test_table, query_list)
+        n_params = len(self.reference_tree_1.parameter_list) \
+                   + len(self.reference_tree_2.parameter_list)
+        self.assertEqual(len(results), n_params)
+        self.assertEqual([rr.name.lower() for rr in results],
+                         sorted([rr.name.lower() for rr in results]))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import os
+
+from lsst.syseng_db import parameters_from_xml_files
+
+class TestParallelIngest(unittest.TestCase):
+
+    def test_parallel_matches_serial(self):
+        """
+        Test that parsing .xml files in worker processes yields the same
+        Parameters, in the same order, as parsing them serially
+        """
+        root_dir = os.getenv("SYSENG_DB_DIR")
+        file_list = [os.path.join(root_dir, "data", "v_0_0", file_name)
+                     for file_name in ("Telescope Requirements_v1.xml",
+                                       "OSS_Detail_OpticalSystem_v1.xml",
+                                       "Science_Requirements_v1.xml")]
+
+        serial_list = list(parameters_from_xml_files(file_list))
+        parallel_list = list(parameters_from_xml_files(file_list, n_jobs=2))
+
+        self.assertGreater(len(serial_list), 0)
+        self.assertEqual(len(serial_list), len(parallel_list))
+        for serial, parallel in zip(serial_list, parallel_list):
+            self.assertEqual(serial.name, parallel.name)
+            self.assertEqual(serial.doc, parallel.doc)
+            self.assertEqual(serial.units, parallel.units)
+            self.assertEqual(serial.source, parallel.source)
+            self.assertEqual(serial.values, parallel.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
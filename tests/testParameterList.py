@@ -0,0 +1,106 @@
+import unittest
+import os
+import copy
+import pickle
+from cStringIO import StringIO
+
+from lsst.syseng_db import ParameterTree, Parameter, ParameterList
+from lsst.syseng_db import ParameterRow
+
+class TestParameterList(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", "Telescope Requirements_v1.xml")
+        cls.reference_tree = ParameterTree(cls.data_file)
+
+
+    def compare_parameter_lists(self, test_list, control_list):
+        """
+        Verify that two lists of Parameters contain exactly the same information
+        """
+        self.assertEqual(len(test_list), len(control_list))
+        self.assertGreater(len(control_list), 0)
+        for pp, control in zip(test_list, control_list):
+            self.assertEqual(pp.name, control.name)
+            self.assertEqual(pp.doc, control.doc)
+            self.assertEqual(pp.units, control.units)
+            self.assertEqual(pp.source, control.source)
+            self.assertEqual(pp.values, control.values)
+
+
+    def test_slots(self):
+        """
+        Test that Parameters have no __dict__ and only hold the values they
+        were given
+        """
+        pp = Parameter("aa", doc="a parameter", units="m",
+                       values={'upperValue': u'2.0', 'defaultValue': '1.0'},
+                       source="/a/dir/file.xml")
+        self.assertFalse(hasattr(pp, '__dict__'))
+        self.assertEqual(pp.values, {'defaultValue': '1.0', 'upperValue': '2.0'})
+        self.assertIsInstance(pp.values['upperValue'], str)
+        self.assertEqual(pp.source, "file.xml")
+
+        handle = StringIO()
+        pp.write_param(handle=handle)
+        self.assertEqual(handle.getvalue(),
+                         "\naa\n    a parameter\n    ####\n"
+                         "    defaultValue: 1.0 m\n    upperValue: 2.0 m\n"
+                         "    ####\n    file.xml\n")
+
+        with self.assertRaises(RuntimeError):
+            Parameter("bb", values={'medianValue': '1.0'})
+
+
+    def test_copy_and_pickle(self):
+        """
+        Test that Parameters survive deepcopy and pickling
+        """
+        param_list = self.reference_tree.parameter_list
+        self.compare_parameter_lists(copy.deepcopy(param_list), param_list)
+        for protocol in (0, 2):
+            self.compare_parameter_lists(pickle.loads(pickle.dumps(param_list,
+                                                                   protocol)),
+                                         param_list)
+
+
+    def test_parameter_list(self):
+        """
+        Test that a ParameterList holds the same Parameters as the list it
+        was built from, and shares repeated strings
+        """
+        param_list = self.reference_tree.parameter_list
+        columns = ParameterList(param_list)
+        self.compare_parameter_lists(list(columns), param_list)
+        self.compare_parameter_lists(list(columns.parameters()), param_list)
+        self.assertIsInstance(columns[0], ParameterRow)
+        self.assertEqual(columns[-1].name, param_list[-1].name)
+        self.assertEqual(columns.column('name'), [pp.name for pp in param_list])
+        with self.assertRaises(IndexError):
+            columns[len(param_list)]
+        with self.assertRaises(RuntimeError):
+            columns.column('velocity')
+
+        sources = columns.column('source')
+        for source in sources:
+            self.assertIs(source, sources[0])
+
+        self.compare_parameter_lists(list(columns[2:5]), param_list[2:5])
+        self.compare_parameter_lists(list(pickle.loads(pickle.dumps(columns, 2))),
+                                     param_list)
+
+        for row, pp in zip(columns, param_list):
+            row_handle = StringIO()
+            row.write_param(handle=row_handle)
+            param_handle = StringIO()
+            pp.write_param(handle=param_handle)
+            self.assertEqual(row_handle.getvalue(), param_handle.getvalue())
+
+        # a ParameterList can be built from the rows of another
+        self.compare_parameter_lists(list(ParameterList(columns)), param_list)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+
+from lsst.syseng_db import db_from_xml_file, range_query, ParameterTree
+from lsst.syseng_db import syseng_db_config
+
+class TestRangeQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source = "Telescope Requirements_v1.xml"
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", cls.source)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "range_query_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        db_from_xml_file(cls.data_file, cls.test_table)
+        cls.reference_tree = ParameterTree(cls.data_file)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def reference_names(self, field, lo, hi):
+        """
+        Return the sorted names of the Parameters in the reference tree whose
+        value field is a number within [lo, hi]
+        """
+        name_list = []
+        for pp in self.reference_tree.parameter_list:
+            if field not in pp.values:
+                continue
+            try:
+                value = float(pp.values[field])
+            except ValueError:
+                continue
+            if (lo is None or value >= lo) and (hi is None or value <= hi):
+                name_list.append(pp.name)
+        return sorted(name_list, key=lambda s: s.lower())
+
+
+    def test_range_query(self):
+        """
+        Test that range_query returns exactly the Parameters whose numeric
+        values lie in the requested range
+        """
+        for field, lo, hi in (('defaultValue', 0.0, 10.0),
+                              ('defaultValue', None, 0.0),
+                              ('defaultValue', 10.0, None),
+                              ('upperValue', None, None)):
+            results = range_query(self.full_db_name, self.test_table, field, lo, hi)
+            self.assertEqual([pp.name for pp in results],
+                             self.reference_names(field, lo, hi))
+            for pp in results:
+                self.assertEqual(pp.source, self.source)
+
+        self.assertGreater(len(self.reference_names('defaultValue', 0.0, 10.0)), 0)
+
+
+    def test_range_query_xml_list(self):
+        """
+        Test that range_query respects xml_list and rejects unknown fields
+        """
+        results = range_query(self.full_db_name, self.test_table, 'defaultValue',
+                              None, None, xml_list=["not_a_file.xml"])
+        self.assertEqual(len(results), 0)
+        self.assertRaises(RuntimeError, range_query, self.full_db_name,
+                          self.test_table, 'docstring', 0.0, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import time
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import keyword_query, name_query
+from lsst.syseng_db import enable_result_cache, disable_result_cache
+from lsst.syseng_db import result_cache_stats
+from lsst.syseng_db import syseng_db_config
+
+class TestResultCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "cache_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+        data_file = os.path.join(cls.root_dir, "data", "v_0_0",
+                                 "Telescope Requirements_v1.xml")
+        cls.param_list = ParameterTree(data_file).parameter_list
+        db_from_param_list(cls.param_list, "test_table")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def tearDown(self):
+        disable_result_cache()
+
+
+    def test_disabled(self):
+        """
+        Test that nothing is cached unless the cache is enabled
+        """
+        keyword_query(self.full_db_name, "test_table", ['eak'])
+        keyword_query(self.full_db_name, "test_table", ['eak'])
+        stats = result_cache_stats()
+        self.assertEqual(stats['hits'], 0)
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['size'], 0)
+
+
+    def test_hits(self):
+        """
+        Test that repeated queries are answered from the cache with the same
+        results, and that callers get their own copy of the results
+        """
+        enable_result_cache()
+        control = keyword_query(self.full_db_name, "test_table", ['eak'])
+        self.assertGreater(len(control), 0)
+        control.pop()
+        test = keyword_query(self.full_db_name, "test_table", ['eak'])
+        self.assertEqual(len(test), len(control)+1)
+        stats = result_cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+        # different arguments are different results
+        keyword_query(self.full_db_name, "test_table", ['etch'])
+        keyword_query(self.full_db_name, "test_table", ['eak'], mode='fulltext')
+        self.assertEqual(result_cache_stats()['misses'], 3)
+
+
+    def test_normalized_keys(self):
+        """
+        Test that calls passing the same arguments positionally, by keyword,
+        through the defaults or with a relative path to the database share
+        one cached result
+        """
+        enable_result_cache()
+        control = keyword_query(self.full_db_name, "test_table", ['eak'])
+        keyword_query(self.full_db_name, "test_table", ['eak'], None)
+        keyword_query(self.full_db_name, "test_table", ['eak'], xml_list=None)
+        keyword_query(self.full_db_name, table_name="test_table",
+                      keyword_list=['eak'], mode='substring')
+        test = keyword_query(os.path.relpath(self.full_db_name), "test_table",
+                             ['eak'])
+        self.assertEqual(len(test), len(control))
+        stats = result_cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['size'], 1)
+
+
+    def test_invalidation(self):
+        """
+        Test that results are not reused once the database has changed or
+        the results have expired
+        """
+        enable_result_cache(ttl=None)
+        control = keyword_query(self.full_db_name, "test_table", ['eak'])
+        db_from_param_list(self.param_list[:2], "other_table")
+        self.assertEqual(len(keyword_query(self.full_db_name, "test_table",
+                                           ['eak'])), len(control))
+        stats = result_cache_stats()
+        self.assertEqual(stats['hits'], 0)
+        self.assertEqual(stats['invalidations'], 1)
+
+        enable_result_cache(ttl=0.05)
+        name = self.param_list[0].name
+        name_query(self.full_db_name, "test_table", [name])
+        name_query(self.full_db_name, "test_table", [name])
+        time.sleep(0.1)
+        name_query(self.full_db_name, "test_table", [name])
+        stats = result_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['invalidations'], 2)
+
+
+    def test_eviction(self):
+        """
+        Test that the least recently used results are evicted first
+        """
+        enable_result_cache(max_entries=2)
+        keyword_query(self.full_db_name, "test_table", ['a'])
+        keyword_query(self.full_db_name, "test_table", ['b'])
+        keyword_query(self.full_db_name, "test_table", ['a'])
+        keyword_query(self.full_db_name, "test_table", ['c'])
+        stats = result_cache_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['size'], 2)
+        keyword_query(self.full_db_name, "test_table", ['a'])
+        self.assertEqual(result_cache_stats()['hits'], 2)
+        keyword_query(self.full_db_name, "test_table", ['b'])
+        self.assertEqual(result_cache_stats()['hits'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import unittest
+import os
+import json
+
+from lsst.syseng_db import db_from_xml_files, read_saved_queries, saved_query
+from lsst.syseng_db import saved_query_names, search_query, keyword_query
+from lsst.syseng_db import key_numbers_query, get_xml_files, syseng_db_config
+from lsst.syseng_db import serve_from_memory, stop_serving_from_memory
+
+class TestSavedQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.data_dir = os.path.join(cls.root_dir, "data", "v_0_0")
+        cls.out_dir = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_dir"] = cls.out_dir
+        syseng_db_config["db_name"] = "saved_query_test_sqlite.db"
+        cls.full_db_name = os.path.join(cls.out_dir, syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.registry_file = os.path.join(cls.out_dir, "saved_queries_test.json")
+        cls.key_file = os.path.join(cls.out_dir, "saved_key_numbers_test.txt")
+        cls.xml_list = ["OSS_Detail_OpticalSystem_v1.xml",
+                        "Telescope Requirements_v1.xml"]
+        cls.file_list = sorted([os.path.join(cls.data_dir, file_name)
+                                for file_name in os.listdir(cls.data_dir)
+                                if file_name.endswith(".xml")])
+
+        cls.test_table = "test_table"
+        db_from_xml_files(cls.file_list, cls.test_table)
+
+        # key numbers taken from the table itself, listed out of order
+        params = keyword_query(cls.full_db_name, cls.test_table, ['m1'])
+        cls.key_list = [(pp.name, pp.source) for pp in params[:3]]
+        cls.key_list.reverse()
+        cls.key_list.append(('notAParameter', cls.xml_list[0]))
+        with open(cls.key_file, 'w') as output_file:
+            for name, source in cls.key_list:
+                output_file.write("%s = %s\n" % (name, source))
+
+        with open(cls.registry_file, 'w') as output_file:
+            json.dump({"throughput": {"search": "throughput"},
+                       "optical_m1": {"search": "m1", "xml_list": cls.xml_list},
+                       "key_numbers": {"key_numbers":
+                                       os.path.basename(cls.key_file)}},
+                      output_file)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_serving_from_memory()
+        for file_name in (cls.full_db_name, cls.registry_file, cls.key_file):
+            if os.path.exists(file_name):
+                os.unlink(file_name)
+
+
+    def setUp(self):
+        syseng_db_config["db_dir"] = self.out_dir
+        syseng_db_config["db_name"] = "saved_query_test_sqlite.db"
+        self.saved_queries = read_saved_queries(self.registry_file)
+        db_from_xml_files(self.file_list, self.test_table, update=True,
+                          saved_queries=self.saved_queries)
+
+
+    def summarize(self, param_list):
+        return [(pp.name, pp.source, pp.units, pp.doc, pp.values)
+                for pp in param_list]
+
+
+    def test_read_saved_queries(self):
+        """
+        Test that key numbers files in the registry are read relative to it
+        """
+        self.assertEqual(sorted(self.saved_queries),
+                         ['key_numbers', 'optical_m1', 'throughput'])
+        self.assertEqual(self.saved_queries['key_numbers']['key_numbers'],
+                         self.key_list)
+
+
+    def test_search_each(self):
+        """
+        Test that a 'search_each' entry stands for one search per term
+        """
+        each_file = os.path.join(self.out_dir, "saved_queries_each_test.json")
+        with open(each_file, 'w') as output_file:
+            json.dump({"optical": {"search_each": ["m1", "m2"],
+                                   "xml_list": self.xml_list}},
+                      output_file)
+        try:
+            query_dict = read_saved_queries(each_file)
+        finally:
+            os.unlink(each_file)
+        self.assertEqual(query_dict,
+                         {'optical_m1': {'search': 'm1', 'xml_list': self.xml_list},
+                          'optical_m2': {'search': 'm2', 'xml_list': self.xml_list}})
+        # the same definition as the 'optical_m1' entry of the registry
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'optical_m1',
+                                                    definition=query_dict['optical_m1'])),
+                         self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'optical_m1')))
+
+
+    def test_saved_results(self):
+        """
+        Test that saved queries return what the live queries return
+        """
+        self.assertEqual(saved_query_names(self.full_db_name, self.test_table),
+                         ['key_numbers', 'optical_m1', 'throughput'])
+
+        control = search_query(self.full_db_name, self.test_table, 'throughput')
+        self.assertGreater(len(control), 0)
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'throughput')),
+                         self.summarize(control))
+
+        control = keyword_query(self.full_db_name, self.test_table, ['m1'],
+                                xml_list=self.xml_list)
+        self.assertGreater(len(control), 0)
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'optical_m1')),
+                         self.summarize(control))
+
+        control = key_numbers_query(self.full_db_name, self.test_table,
+                                    self.key_list)
+        self.assertEqual(len(control), 3)
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'key_numbers')),
+                         self.summarize(control))
+
+        with self.assertRaises(RuntimeError):
+            saved_query(self.full_db_name, self.test_table, 'not_saved')
+        with self.assertRaises(RuntimeError):
+            saved_query(self.full_db_name, 'not_a_table', 'throughput')
+
+
+    def test_definition(self):
+        """
+        Test that saved results are only returned for the definition they
+        were materialized for
+        """
+        definition = self.saved_queries['key_numbers']
+        control = self.summarize(saved_query(self.full_db_name, self.test_table,
+                                             'key_numbers'))
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'key_numbers',
+                                                    definition=definition)),
+                         control)
+        # the key numbers as read from the file, rather than the registry
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'key_numbers',
+                                                    definition={'key_numbers':
+                                                                self.key_list})),
+                         control)
+        with self.assertRaises(RuntimeError):
+            saved_query(self.full_db_name, self.test_table, 'key_numbers',
+                        definition={'key_numbers': self.key_list[1:]})
+        with self.assertRaises(RuntimeError):
+            saved_query(self.full_db_name, self.test_table, 'optical_m1',
+                        definition={'search': 'm1'})
+
+
+    def test_forgotten_on_update(self):
+        """
+        Test that changing a table without the saved queries deletes the
+        results saved for it
+        """
+        db_from_xml_files(self.file_list[:-1], self.test_table, update=True)
+        self.assertEqual(saved_query_names(self.full_db_name, self.test_table),
+                         [])
+        with self.assertRaises(RuntimeError):
+            saved_query(self.full_db_name, self.test_table, 'throughput')
+        db_from_xml_files(self.file_list, self.test_table, update=True)
+
+
+    def test_failed_materialization(self):
+        """
+        Test that the saved results are written in the same transaction as
+        the rows of the build, so that a saved query which cannot be
+        evaluated rolls the whole build back
+        """
+        control = self.summarize(saved_query(self.full_db_name, self.test_table,
+                                             'throughput'))
+        xml_files = get_xml_files(self.full_db_name, self.test_table)
+        with self.assertRaises(RuntimeError):
+            db_from_xml_files(self.file_list[:-1], self.test_table, update=True,
+                              saved_queries={'bad': {'search': 'name:('}})
+        self.assertEqual(get_xml_files(self.full_db_name, self.test_table),
+                         xml_files)
+        self.assertEqual(saved_query_names(self.full_db_name, self.test_table),
+                         ['key_numbers', 'optical_m1', 'throughput'])
+        self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                    self.test_table,
+                                                    'throughput')),
+                         control)
+
+
+    def test_memory_serving(self):
+        """
+        Test that the saved results are served from memory too
+        """
+        control = self.summarize(saved_query(self.full_db_name, self.test_table,
+                                             'optical_m1'))
+        serve_from_memory(self.full_db_name, versions=[self.test_table])
+        try:
+            self.assertEqual(self.summarize(saved_query(self.full_db_name,
+                                                        self.test_table,
+                                                        'optical_m1')),
+                             control)
+        finally:
+            stop_serving_from_memory(self.full_db_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import sqlite3
+
+from lsst.syseng_db import db_from_xml_file, ParameterTree
+from lsst.syseng_db import get_table_names, get_column_names, get_xml_files
+from lsst.syseng_db import get_parameter_names, keyword_query, name_query
+from lsst.syseng_db import syseng_db_config
+
+class TestSchema(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source = "Telescope Requirements_v1.xml"
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", cls.source)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "schema_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        db_from_xml_file(cls.data_file, cls.test_table)
+
+        # a version stored in the layout used before versions became views
+        cls.legacy_table = "legacy_table"
+        conn = sqlite3.connect(cls.full_db_name)
+        conn.execute("CREATE TABLE %s (name text, defaultValue text, upperValue text, "
+                     "lowerValue text, units text, docstring text, source text)" % cls.legacy_table)
+        conn.execute("INSERT INTO %s SELECT * FROM %s" % (cls.legacy_table, cls.test_table))
+        conn.commit()
+        conn.close()
+
+        cls.reference_tree = ParameterTree(cls.data_file)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_layout(self):
+        """
+        Test that a version exposes the documented columns, that only the versions
+        are reported as tables, and that the rows are indexed
+        """
+        self.assertEqual(get_table_names(self.full_db_name),
+                         [self.legacy_table, self.test_table])
+        self.assertEqual(get_column_names(self.full_db_name, self.test_table),
+                         get_column_names(self.full_db_name, self.legacy_table))
+
+        conn = sqlite3.connect(self.full_db_name)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM %s WHERE name = ?"
+                            % self.test_table, ("m1OuterCa",)).fetchall()
+        conn.close()
+        self.assertIn("INDEX", " ".join([str(rr[-1]) for rr in plan]))
+
+
+    def test_queries_agree(self):
+        """
+        Test that the query functions return the same results for a version stored
+        as a view and for one stored as a plain table
+        """
+        self.assertEqual(get_xml_files(self.full_db_name, self.test_table), [self.source])
+        self.assertEqual(get_xml_files(self.full_db_name, self.legacy_table), [self.source])
+        self.assertEqual(get_parameter_names(self.full_db_name, self.test_table),
+                         get_parameter_names(self.full_db_name, self.legacy_table))
+        self.assertEqual(len(get_parameter_names(self.full_db_name, self.test_table)),
+                         len(self.reference_tree.parameter_list))
+
+        for test_list, control_list in \
+        ((keyword_query(self.full_db_name, self.test_table, ["m1"], xml_list=[self.source]),
+          keyword_query(self.full_db_name, self.legacy_table, ["m1"], xml_list=[self.source])),
+         (name_query(self.full_db_name, self.test_table, ["m1OuterCa", "slewSettle_time"]),
+          name_query(self.full_db_name, self.legacy_table, ["m1OuterCa", "slewSettle_time"]))):
+
+            self.assertGreater(len(control_list), 0)
+            self.assertEqual(len(test_list), len(control_list))
+            for test, control in zip(test_list, control_list):
+                self.assertEqual(test.name, control.name)
+                self.assertEqual(test.doc, control.doc)
+                self.assertEqual(test.units, control.units)
+                self.assertEqual(test.source, control.source)
+                self.assertEqual(test.values, control.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import os
+import copy
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import search_query, compile_search, keyword_query
+from lsst.syseng_db import syseng_db_config
+
+class TestSearchQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        cls.data_file_1 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_1)
+        cls.data_file_2 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_2)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "search_query_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        param_list = copy.deepcopy(ParameterTree(cls.data_file_1).parameter_list)
+        param_list.extend(ParameterTree(cls.data_file_2).parameter_list)
+        cls.param_list = param_list
+        db_from_param_list(param_list, cls.test_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def query(self, query_string, **kwargs):
+        return sorted([(pp.name, pp.source) for pp in
+                       search_query(self.full_db_name, self.test_table,
+                                    query_string, **kwargs)])
+
+
+    def control(self, function):
+        return sorted([(pp.name, pp.source) for pp in self.param_list
+                       if function(pp)])
+
+
+    @staticmethod
+    def contains(text, value):
+        return text is not None and value.lower() in text.lower()
+
+
+    @staticmethod
+    def number(pp, field):
+        try:
+            return float(pp.values.get(field))
+        except (TypeError, ValueError):
+            return None
+
+
+    def test_bare_terms(self):
+        """
+        Test that a bare word matches as keyword_query does, and that terms
+        written next to each other must all match
+        """
+        control = sorted([(pp.name, pp.source) for pp in
+                          keyword_query(self.full_db_name, self.test_table,
+                                        ["slew"])])
+        self.assertGreater(len(control), 0)
+        self.assertEqual(self.query("slew"), control)
+
+        test = self.query('slew settle')
+        self.assertEqual(test, self.query('slew AND settle'))
+        self.assertEqual(test, self.control(
+            lambda pp: (self.contains(pp.name, 'slew') or
+                        self.contains(pp.doc, 'slew')) and
+                       (self.contains(pp.name, 'settle') or
+                        self.contains(pp.doc, 'settle'))))
+
+
+    def test_fields(self):
+        """
+        Test the field-scoped terms
+        """
+        self.assertEqual(self.query("name:m1*"),
+                         self.control(lambda pp: pp.name.lower().startswith('m1')))
+        self.assertEqual(self.query("name:OUTER"),
+                         self.control(lambda pp: self.contains(pp.name, 'outer')))
+        self.assertEqual(self.query("name=m1OuterCa"),
+                         self.control(lambda pp: pp.name == 'm1OuterCa'))
+        self.assertEqual(self.query("doc:asphere"),
+                         self.control(lambda pp: self.contains(pp.doc, 'asphere')))
+        self.assertEqual(self.query('source="%s"' % self.source_1),
+                         self.control(lambda pp: pp.source == self.source_1))
+        self.assertEqual(self.query("source:OSS"),
+                         self.control(lambda pp: self.contains(pp.source, 'oss')))
+        self.assertGreater(len(self.query("name:m1*")), 0)
+
+
+    def test_boolean(self):
+        """
+        Test AND, OR, NOT and parentheses
+        """
+        self.assertEqual(self.query("name:m1* NOT source:OSS"),
+                         self.control(lambda pp: pp.name.lower().startswith('m1')
+                                      and not self.contains(pp.source, 'oss')))
+        self.assertEqual(self.query("name:m1* AND (doc:asphere OR name:outer)"),
+                         self.control(lambda pp: pp.name.lower().startswith('m1')
+                                      and (self.contains(pp.doc, 'asphere') or
+                                           self.contains(pp.name, 'outer'))))
+        self.assertEqual(self.query("name:outer OR name:conic"),
+                         self.control(lambda pp: self.contains(pp.name, 'outer')
+                                      or self.contains(pp.name, 'conic')))
+        # parameters without docstrings satisfy NOT doc:...
+        self.assertEqual(self.query("NOT doc:e"),
+                         self.control(lambda pp: not self.contains(pp.doc, 'e')))
+
+
+    def test_numbers(self):
+        """
+        Test the numeric comparisons
+        """
+        test = self.query("default > 5")
+        self.assertGreater(len(test), 0)
+        self.assertEqual(test, self.control(
+            lambda pp: self.number(pp, 'defaultValue') is not None and
+                       self.number(pp, 'defaultValue') > 5))
+        self.assertEqual(self.query("upper <= 10 AND lowerValue >= 1"),
+                         self.control(
+            lambda pp: self.number(pp, 'upperValue') is not None and
+                       self.number(pp, 'upperValue') <= 10 and
+                       self.number(pp, 'lowerValue') is not None and
+                       self.number(pp, 'lowerValue') >= 1))
+
+
+    def test_xml_list(self):
+        """
+        Test that search_query respects xml_list
+        """
+        self.assertEqual(self.query("name:m1*", xml_list=[self.source_1]),
+                         self.control(lambda pp: pp.name.lower().startswith('m1')
+                                      and pp.source == self.source_1))
+
+
+    def test_single_statement(self):
+        """
+        Test that the query compiles into one condition whose placeholders
+        match the values, and that LIKE wildcards in values are escaped
+        """
+        condition, values = compile_search('name:m1* AND (doc:"50%" OR upper > 3)')
+        self.assertEqual(condition.count('?'), len(values))
+        self.assertIn('%50\\%%', values)
+        self.assertIn(3.0, values)
+
+
+    def test_errors(self):
+        """
+        Test that malformed queries raise a RuntimeError
+        """
+        for query_string in ("", "name:", "(slew", "slew)", "colour:red",
+                             "upper:3", "upper > x", "name < 3", "AND slew"):
+            self.assertRaises(RuntimeError, compile_search, query_string)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import os
+import sqlite3
+
+from lsst.syseng_db import db_from_param_list, db_from_xml_files, ParameterTree
+from lsst.syseng_db import get_table_names, name_query
+from lsst.syseng_db import syseng_db_config
+from lsst.syseng_db.ParameterDB_constructor import _bulk_load_pragmas
+
+class TestShadowBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(self.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "shadow_test_sqlite.db"
+        self.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                         syseng_db_config["db_name"])
+        self.tearDown()
+        self.data_file = os.path.join(self.root_dir, "data", "v_0_0",
+                                      "Telescope Requirements_v1.xml")
+        self.param_list = ParameterTree(self.data_file).parameter_list
+
+
+    def tearDown(self):
+        for suffix in ("", "-journal", "-wal", "-shm", ".shadow"):
+            if os.path.exists(self.full_db_name+suffix):
+                os.unlink(self.full_db_name+suffix)
+
+
+    def test_swap(self):
+        """
+        Test that a shadow build replaces the database, that connections
+        opened before the swap keep reading the old file, and that the
+        query functions see the new one
+        """
+        db_from_param_list(self.param_list, "first_table", shadow=True)
+        self.assertEqual(get_table_names(self.full_db_name), ["first_table"])
+        self.assertFalse(os.path.exists(self.full_db_name+".shadow"))
+
+        reader = sqlite3.connect(self.full_db_name)
+        reader.execute("BEGIN")
+        reader.execute("SELECT count(*) FROM first_table").fetchall()
+
+        db_xml = db_from_xml_files([self.data_file], "second_table", shadow=True)
+        self.assertEqual(db_xml['added'], ["Telescope Requirements_v1.xml"])
+
+        self.assertEqual(get_table_names(self.full_db_name),
+                         ["first_table", "second_table"])
+        name = self.param_list[0].name
+        self.assertEqual(len(name_query(self.full_db_name, "second_table", [name])),
+                         len(name_query(self.full_db_name, "first_table", [name])))
+
+        rows = reader.execute("SELECT name FROM sqlite_master "
+                              "WHERE name='second_table'").fetchall()
+        self.assertEqual(rows, [])
+        reader.close()
+
+
+    def test_failed_build(self):
+        """
+        Test that a shadow build which fails leaves the database untouched
+        """
+        db_from_param_list(self.param_list, "first_table", shadow=True)
+        with open(self.full_db_name, 'rb') as input_file:
+            contents = input_file.read()
+
+        def broken_list():
+            for param in self.param_list:
+                yield param
+            raise RuntimeError("ingest failed")
+
+        self.assertRaises(RuntimeError, db_from_param_list, broken_list(),
+                          "second_table", shadow=True)
+        self.assertFalse(os.path.exists(self.full_db_name+".shadow"))
+        with open(self.full_db_name, 'rb') as input_file:
+            self.assertEqual(input_file.read(), contents)
+        self.assertEqual(get_table_names(self.full_db_name), ["first_table"])
+
+
+    def test_wal(self):
+        """
+        Test that an in-place build with wal=True leaves the database in WAL
+        mode, and that a shadow build refuses to replace it while its WAL
+        file exists
+        """
+        db_from_param_list(self.param_list, "first_table", wal=True)
+        conn = sqlite3.connect(self.full_db_name)
+        self.assertEqual(str(conn.execute("PRAGMA journal_mode").fetchone()[0]),
+                         "wal")
+        self.assertTrue(os.path.exists(self.full_db_name+"-wal"))
+        self.assertRaises(RuntimeError, db_from_param_list, self.param_list,
+                          "second_table", shadow=True)
+        conn.close()
+        self.assertEqual(get_table_names(self.full_db_name), ["first_table"])
+
+
+    def test_wal_bulk(self):
+        """
+        Test that a bulk load cannot be asked for together with wal=True,
+        and that a bulk load into a database in WAL mode keeps it in WAL
+        mode while it runs
+        """
+        self.assertRaises(RuntimeError, db_from_param_list, self.param_list,
+                          "first_table", bulk=True, wal=True)
+        self.assertRaises(RuntimeError, db_from_xml_files, [self.data_file],
+                          "first_table", bulk=True, wal=True)
+        self.assertFalse(os.path.exists(self.full_db_name))
+
+        db_from_param_list(self.param_list, "first_table", wal=True)
+        conn = sqlite3.connect(self.full_db_name)
+        try:
+            with _bulk_load_pragmas(conn):
+                self.assertEqual(str(conn.execute("PRAGMA journal_mode")
+                                     .fetchone()[0]), "wal")
+                self.assertEqual(conn.execute("PRAGMA synchronous")
+                                 .fetchone()[0], 0)
+        finally:
+            conn.close()
+
+        db_from_param_list(self.param_list, "second_table", bulk=True)
+        conn = sqlite3.connect(self.full_db_name)
+        self.assertEqual(str(conn.execute("PRAGMA journal_mode").fetchone()[0]),
+                         "wal")
+        conn.close()
+        self.assertEqual(get_table_names(self.full_db_name),
+                         ["first_table", "second_table"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import keyword_query, name_query
+from lsst.syseng_db import syseng_db_config
+from lsst.syseng_db.ParameterDB_query import _keyword_condition
+from lsst.syseng_db.ParameterDB_query import _keyword_query_sql
+from lsst.syseng_db.ParameterDB_query import _name_query_sql
+
+class TestStatementCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "statement_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+        data_file = os.path.join(cls.root_dir, "data", "v_0_0",
+                                 "Telescope Requirements_v1.xml")
+        cls.param_list = ParameterTree(data_file).parameter_list
+        db_from_param_list(cls.param_list, "test_table")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_same_shape(self):
+        """
+        Test that queries of the same shape share the same SQL string and
+        that queries of different shapes do not
+        """
+        control, control_chars = _keyword_condition(['eak', 'lat'], ['a.xml'])
+        test, test_chars = _keyword_condition(['oom', 'ime'], ['b.xml'])
+        self.assertIs(test, control)
+        self.assertEqual(test_chars, ['%oom%', '%oom%', '%ime%', '%ime%',
+                                      'b.xml'])
+        self.assertEqual(test.count('?'), len(test_chars))
+
+        other, other_chars = _keyword_condition(['oom'], ['b.xml'])
+        self.assertNotEqual(other, control)
+        self.assertEqual(other.count('?'), len(other_chars))
+
+        self.assertIs(_keyword_query_sql("test_table", 2, 0),
+                      _keyword_query_sql("test_table", 2, 0))
+        self.assertIs(_name_query_sql("test_table", 3),
+                      _name_query_sql("test_table", 3))
+        self.assertNotEqual(_name_query_sql("test_table", 3),
+                            _name_query_sql("other_table", 3))
+        self.assertEqual(_name_query_sql.uncached("test_table", 3),
+                         _name_query_sql("test_table", 3))
+
+
+    def test_results(self):
+        """
+        Test that repeating a query with different values of the same shape
+        returns the right Parameters each time
+        """
+        for kw in ('eak', 'ime', 'lat'):
+            test = keyword_query(self.full_db_name, "test_table", [kw])
+            control = [pp for pp in self.param_list
+                       if kw in pp.name.lower() or
+                       (pp.doc is not None and kw in pp.doc.lower())]
+            self.assertEqual(sorted([pp.name for pp in test]),
+                             sorted([pp.name for pp in control]))
+
+        for pp in self.param_list[:5]:
+            test = name_query(self.full_db_name, "test_table", [pp.name])
+            self.assertGreater(len(test), 0)
+            for tt in test:
+                self.assertEqual(tt.name, pp.name)
+
+
+    def test_no_keywords(self):
+        """
+        Test that a substring query without keywords raises a RuntimeError
+        """
+        self.assertRaises(RuntimeError, keyword_query, self.full_db_name,
+                          "test_table", [])
+
+
+if __name__ == "__main__":
+    unittest.main()
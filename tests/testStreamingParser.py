@@ -0,0 +1,54 @@
+import unittest
+import os
+
+from lsst.syseng_db import ParameterTree, iter_parameters
+
+class TestStreamingParser(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.data_file = os.path.join(cls.root_dir, "data", "v_0_0", "Telescope Requirements_v1.xml")
+        cls.reference_tree = ParameterTree(cls.data_file)
+
+
+    def compare_parameter_lists(self, test_list, control_list):
+        """
+        Verify that two lists of Parameters contain exactly the same information
+        """
+        self.assertEqual(len(test_list), len(control_list))
+        self.assertGreater(len(control_list), 0)
+        control_dict = {}
+        for pp in control_list:
+            control_dict[pp.name] = pp
+
+        for pp in test_list:
+            self.assertIn(pp.name, control_dict)
+            control = control_dict[pp.name]
+            self.assertEqual(pp.doc, control.doc)
+            self.assertEqual(pp.units, control.units)
+            self.assertEqual(pp.source, control.source)
+            self.assertEqual(pp.values, control.values)
+
+
+    def test_streaming_tree(self):
+        """
+        Test that a ParameterTree read in streaming mode contains the same
+        Parameters as one read from the fully parsed element tree
+        """
+        stream_tree = ParameterTree(self.data_file, streaming=True)
+        self.assertEqual(stream_tree.file_name, self.reference_tree.file_name)
+        self.compare_parameter_lists(stream_tree.parameter_list,
+                                     self.reference_tree.parameter_list)
+
+
+    def test_iter_parameters(self):
+        """
+        Test that iter_parameters yields the same Parameters as ParameterTree
+        """
+        self.compare_parameter_lists(list(iter_parameters(self.data_file)),
+                                     self.reference_tree.parameter_list)
+
+
+if __name__ == "__main__":
+    unittest.main()
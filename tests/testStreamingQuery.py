@@ -0,0 +1,129 @@
+import unittest
+import os
+import copy
+
+from lsst.syseng_db import db_from_param_list, ParameterTree
+from lsst.syseng_db import keyword_query, name_query, get_parameter_names
+from lsst.syseng_db import iter_keyword_query, iter_name_query
+from lsst.syseng_db import syseng_db_config
+
+class TestStreamingQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "streaming_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        param_list = []
+        for source in (cls.source_1, cls.source_2):
+            data_file = os.path.join(cls.root_dir, "data", "v_0_0", source)
+            param_list.extend(ParameterTree(data_file).parameter_list)
+        # the same Parameter twice
+        param_list.append(copy.deepcopy(param_list[0]))
+        cls.test_table = "test_table"
+        db_from_param_list(param_list, cls.test_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def signature(self, param_list):
+        return [(pp.name.lower(), pp.source, pp.values['defaultValue'])
+                for pp in param_list]
+
+
+    def page_through(self, query, limit):
+        """
+        Call query(limit, cursor) until it runs out of Parameters, returning
+        all of the Parameters and checking the size of every page
+        """
+        output = []
+        cursor = None
+        while True:
+            results = query(limit, cursor)
+            page = list(results)
+            self.assertLessEqual(len(page), limit)
+            output.extend(page)
+            cursor = results.cursor
+            if cursor is None:
+                return output
+            self.assertEqual(len(page), limit)
+
+
+    def test_iter_keyword_query(self):
+        """
+        Test that iter_keyword_query returns the same Parameters as
+        keyword_query, whether it is read all at once or page by page
+        """
+        for keyword_list, xml_list in ((['eak'], None), (['e', 'o'], None),
+                                       (['e'], [self.source_2])):
+            control = keyword_query(self.full_db_name, self.test_table,
+                                    keyword_list, xml_list=xml_list)
+            self.assertGreater(len(control), 0)
+
+            results = iter_keyword_query(self.full_db_name, self.test_table,
+                                         keyword_list, xml_list=xml_list)
+            test = list(results)
+            self.assertEqual([pp.name.lower() for pp in test],
+                             [pp.name.lower() for pp in control])
+            self.assertEqual(sorted(self.signature(test)),
+                             sorted(self.signature(control)))
+            self.assertIsNone(results.cursor)
+
+            for limit in (1, 3, len(control)):
+                query = lambda limit, cursor: \
+                    iter_keyword_query(self.full_db_name, self.test_table,
+                                       keyword_list, xml_list=xml_list,
+                                       limit=limit, cursor=cursor)
+                self.assertEqual(self.signature(self.page_through(query, limit)),
+                                 self.signature(test))
+
+
+    def test_iter_name_query(self):
+        """
+        Test that iter_name_query returns the same Parameters as name_query,
+        including for lists of names too long for a single query
+        """
+        name_list = get_parameter_names(self.full_db_name, self.test_table)
+        for query_list in (["m1_6thAsphere"], name_list,
+                           ["missing_%d" % ii for ii in range(1200)] + name_list):
+            control = name_query(self.full_db_name, self.test_table, query_list)
+            test = list(iter_name_query(self.full_db_name, self.test_table,
+                                        query_list))
+            self.assertEqual([pp.name.lower() for pp in test],
+                             [pp.name.lower() for pp in control])
+            self.assertEqual(sorted(self.signature(test)),
+                             sorted(self.signature(control)))
+
+            query = lambda limit, cursor: \
+                iter_name_query(self.full_db_name, self.test_table, query_list,
+                                limit=limit, cursor=cursor)
+            self.assertEqual(self.signature(self.page_through(query, 4)),
+                             self.signature(test))
+
+        self.assertEqual(list(iter_name_query(self.full_db_name,
+                                              self.test_table, [])), [])
+
+
+    def test_bad_arguments(self):
+        """
+        Test that invalid cursors and limits are rejected
+        """
+        self.assertRaises(RuntimeError, iter_keyword_query, self.full_db_name,
+                          self.test_table, ['eak'], cursor="not a cursor")
+        self.assertRaises(RuntimeError, iter_name_query, self.full_db_name,
+                          self.test_table, ['eak'], limit=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
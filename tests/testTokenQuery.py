@@ -0,0 +1,161 @@
+import unittest
+import os
+import copy
+
+from lsst.syseng_db import db_from_param_list, keyword_query, token_query
+from lsst.syseng_db import name_tokens, ParameterTree, Parameter
+from lsst.syseng_db import syseng_db_config
+
+class TestTokenQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        cls.source_1 = "Telescope Requirements_v1.xml"
+        cls.source_2 = "OSS_Detail_OpticalSystem_v1.xml"
+        cls.data_file_1 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_1)
+        cls.data_file_2 = os.path.join(cls.root_dir, "data", "v_0_0", cls.source_2)
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "token_query_test_db_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        cls.test_table = "test_table"
+        cls.reference_tree_1 = ParameterTree(cls.data_file_1)
+        param_list = copy.deepcopy(cls.reference_tree_1.parameter_list)
+        cls.reference_tree_2 = ParameterTree(cls.data_file_2)
+        param_list.extend(cls.reference_tree_2.parameter_list)
+        cls.param_list = param_list
+        db_from_param_list(param_list, cls.test_table)
+
+        # loaded after the token index exists, so its new record is indexed
+        # as it is written
+        cls.second_table = "second_table"
+        db_from_param_list([Parameter("CCDReadoutTime", doc="readout", values={},
+                                      source=cls.source_1)],
+                           cls.second_table)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def test_name_tokens(self):
+        """
+        Test that names are split on camelCase, underscores and digits
+        """
+        self.assertEqual(name_tokens("slewSettle_time"),
+                         ["slew", "settle", "time"])
+        self.assertEqual(name_tokens("m1OuterCa"), ["m", "1", "outer", "ca"])
+        self.assertEqual(name_tokens("nVisitExp"), ["n", "visit", "exp"])
+        self.assertEqual(name_tokens("CCDReadoutTime"),
+                         ["ccd", "readout", "time"])
+        self.assertEqual(name_tokens("10min_track_goal"),
+                         ["10", "min", "track", "goal"])
+
+
+    def test_exact_tokens(self):
+        """
+        Test that keywords written in any style find the Parameter whose
+        name has the same tokens, and rank it first
+        """
+        for keyword_list in (["settle time"], ["settleTime"],
+                             ["settle_time"], ["slew", "settle", "time"]):
+            results = token_query(self.full_db_name, self.test_table,
+                                  keyword_list)
+            self.assertGreater(len(results), 0)
+            self.assertEqual(results[0].name, "slewSettle_time")
+            self.assertIn("[Settle]_[time]", results[0].snippet)
+            for ii in range(len(results)-1):
+                self.assertLessEqual(results[ii].rank, results[ii+1].rank)
+
+
+    def test_token_not_substring(self):
+        """
+        Test that tokens only match whole tokens or their beginnings, unlike
+        a substring keyword_query
+        """
+        results = token_query(self.full_db_name, self.test_table, ["ca"],
+                              fuzzy=False)
+        names = set([pp.name for pp in results])
+        self.assertIn("m1OuterCa", names)
+        self.assertIn("cameraSize_8", names)
+        # 'ca' is inside 'fetchCamera', but not at the beginning of a token
+        for pp in results:
+            self.assertTrue(any([token.startswith("ca")
+                                 for token in name_tokens(pp.name)]))
+
+
+    def test_typos(self):
+        """
+        Test that misspelled keywords find the tokens they are close to only
+        when fuzzy is True
+        """
+        results = token_query(self.full_db_name, self.test_table,
+                              ["slew setle tme"])
+        self.assertEqual(results[0].name, "slewSettle_time")
+
+        results = token_query(self.full_db_name, self.test_table,
+                              ["throughptu"])
+        self.assertGreater(len(results), 0)
+        for pp in results:
+            self.assertIn("throughput", name_tokens(pp.name))
+
+        results = token_query(self.full_db_name, self.test_table,
+                              ["throughptu"], fuzzy=False)
+        self.assertEqual(len(results), 0)
+
+
+    def test_limit_and_xml(self):
+        """
+        Test that token_query respects limit and xml_list
+        """
+        all_results = token_query(self.full_db_name, self.test_table, ["m1"],
+                                  limit=None)
+        names = [pp.name for pp in all_results]
+        self.assertEqual(names.count("m1ConicConstant"), 2)
+
+        results = token_query(self.full_db_name, self.test_table, ["m1"],
+                              limit=3)
+        self.assertEqual([pp.name for pp in results], names[:3])
+
+        results = token_query(self.full_db_name, self.test_table, ["m1"],
+                              xml_list=[self.source_1], limit=None)
+        self.assertGreater(len(results), 0)
+        self.assertLess(len(results), len(all_results))
+        for pp in results:
+            self.assertEqual(pp.source, self.source_1)
+
+
+    def test_versions(self):
+        """
+        Test that token_query only returns the Parameters of the version it
+        is asked about, including those loaded after the index was built
+        """
+        results = token_query(self.full_db_name, self.second_table,
+                              ["ccd readout"])
+        self.assertEqual([pp.name for pp in results], ["CCDReadoutTime"])
+        self.assertEqual(results[0].snippet, "[CCD][Readout]Time")
+
+        results = token_query(self.full_db_name, self.test_table, ["ccd"])
+        self.assertEqual(len(results), 0)
+
+
+    def test_keyword_query_mode(self):
+        """
+        Test that keyword_query in 'token' mode returns the same results as
+        token_query
+        """
+        control = token_query(self.full_db_name, self.test_table,
+                              ["readout"])
+        test = keyword_query(self.full_db_name, self.test_table, ["readout"],
+                             mode='token')
+        self.assertEqual([(pp.name, pp.source) for pp in test],
+                         [(pp.name, pp.source) for pp in control])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+
+from lsst.syseng_db import db_from_param_list, ParameterTree, Parameter
+from lsst.syseng_db import keyword_query, name_query
+from lsst.syseng_db import keyword_query_versions, name_query_versions
+from lsst.syseng_db import syseng_db_config
+
+class TestVersionQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = os.getenv("SYSENG_DB_DIR")
+        data_file = os.path.join(cls.root_dir, "data", "v_0_0",
+                                 "Telescope Requirements_v1.xml")
+        syseng_db_config["db_dir"] = os.path.join(cls.root_dir, "tests", "testDb")
+        syseng_db_config["db_name"] = "version_query_test_sqlite.db"
+        cls.full_db_name = os.path.join(syseng_db_config["db_dir"],
+                                        syseng_db_config["db_name"])
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+        old_list = ParameterTree(data_file).parameter_list
+        cls.changed = old_list[0]
+        new_list = [Parameter(cls.changed.name, doc=cls.changed.doc,
+                              units=cls.changed.units,
+                              values={'defaultValue':'-1.0'},
+                              source=cls.changed.source)] + old_list[1:]
+        cls.version_list = ["version_b", "version_a"]
+        db_from_param_list(old_list, "version_a")
+        db_from_param_list(new_list, "version_b")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.full_db_name):
+            os.unlink(cls.full_db_name)
+
+
+    def signature(self, param):
+        return (param.name, param.source, param.values['defaultValue'],
+                param.units, param.doc)
+
+
+    def test_name_query_versions(self):
+        """
+        Test that name_query_versions returns each Parameter once for every
+        version it appears in, tagged with the version and in the order of
+        the versions requested
+        """
+        results = name_query_versions(self.full_db_name, self.version_list,
+                                      [self.changed.name, self.changed.name])
+        self.assertEqual([pp.version for pp in results], self.version_list)
+        self.assertEqual(results[0].values['defaultValue'], '-1.0')
+        self.assertEqual(results[1].values['defaultValue'],
+                         self.changed.values['defaultValue'])
+
+        # all versions, in the order of get_table_names
+        results = name_query_versions(self.full_db_name, None,
+                                      [self.changed.name])
+        self.assertEqual([pp.version for pp in results],
+                         ["version_a", "version_b"])
+
+        self.assertRaises(RuntimeError, name_query_versions, self.full_db_name,
+                          ["version_a", "not_a_version"], [self.changed.name])
+
+
+    def test_matches_single_version(self):
+        """
+        Test that querying several versions at once returns the same
+        Parameters as querying each version separately
+        """
+        for version in self.version_list:
+            control = keyword_query(self.full_db_name, version, ['eak'])
+            test = keyword_query_versions(self.full_db_name, [version], ['eak'])
+            self.assertGreater(len(control), 0)
+            self.assertEqual(sorted([self.signature(pp) for pp in test]),
+                             sorted([self.signature(pp) for pp in control]))
+            self.assertEqual(set([pp.version for pp in test]), set([version]))
+
+            name_list = ["name_%d" % ii for ii in range(600)] \
+                        + [pp.name for pp in control]
+            control = name_query(self.full_db_name, version, name_list)
+            test = name_query_versions(self.full_db_name, [version], name_list)
+            self.assertEqual(sorted([self.signature(pp) for pp in test]),
+                             sorted([self.signature(pp) for pp in control]))
+
+        test = keyword_query_versions(self.full_db_name, self.version_list,
+                                      ['eak'])
+        self.assertEqual(len(test), len(keyword_query(self.full_db_name,
+                                                      "version_a", ['eak']))
+                                    + len(keyword_query(self.full_db_name,
+                                                        "version_b", ['eak'])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
-from tornado.wsgi import WSGIContainer
 from tornado.httpserver import HTTPServer
 from tornado.ioloop import IOLoop
-from syseng_db_web import app
+from syseng_db_tornado import make_app
+from lsst.syseng_db import close_connections, shutdown_query_executor
 
-http_server = HTTPServer(WSGIContainer(app))
+http_server = HTTPServer(make_app())
 http_server.listen(8888)
-IOLoop.instance().start()
+try:
+    IOLoop.instance().start()
+finally:
+    shutdown_query_executor()
+    close_connections()
@@ -0,0 +1,384 @@
+"""
+The pages of the web interface that query the database, shared by the Flask
+application in syseng_db_web.py and the Tornado handlers in
+syseng_db_tornado.py.
+
+Each page is a generator function taking the submitted form (None for a
+GET request; otherwise an object with get(name, default), getlist(name)
+and 'name in form', like Flask's request.form).  It parses the form, and
+every time it needs the database it yields a Query,
+
+    list_of_versions = yield Query(get_table_names, db_name)
+
+The server runs the query and sends its result back into the generator, or
+throws the query's exception into it, so the page handles errors with
+ordinary try/except blocks.  run_page does this by calling the query
+function directly (the Flask application); the Tornado handlers run the
+asynchronous version of the function instead.  The last thing a page yields
+is a Render naming the template to show and the values to render it with.
+"""
+
+import os
+import sys
+import sqlite3
+from collections import namedtuple
+
+from lsst.syseng_db import syseng_db_config, get_table_names
+from lsst.syseng_db import keyword_query, name_query, get_parameter_names
+from lsst.syseng_db import get_xml_files, diff_versions
+from lsst.syseng_db import name_query_versions, keyword_query_versions
+from lsst.syseng_db import search_query, read_key_numbers, key_numbers_query
+from lsst.syseng_db import saved_query, read_saved_queries
+
+__all__ = ["Query", "Render", "run_page", "db_name", "key_numbers",
+           "list_names_page", "list_xml_files_page", "key_numbers_page",
+           "search_page", "optical_system_page", "diff_page", "history_page"]
+
+
+class Query(object):
+    """
+    A call of the query function function(*args, **kwargs) requested by a
+    page
+    """
+
+    def __init__(self, function, *args, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+
+# the template a page is rendered with and the dict of values passed to it
+Render = namedtuple("Render", ["template", "context"])
+
+
+def run_page(page):
+    """
+    Run the page page (a generator returned by one of the page functions)
+    to the end, calling each of the query functions it asks for directly.
+    Returns its Render.
+    """
+    step = next(page)
+    while not isinstance(step, Render):
+        try:
+            result = step.function(*step.args, **step.kwargs)
+        except Exception:
+            step = page.throw(*sys.exc_info())
+        else:
+            step = page.send(result)
+    page.close()
+    return step
+
+
+db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+
+# the parameters shown on the key numbers page, as (name, .xml file it is
+# read from) tuples, read from key_numbers.txt (or the file named by
+# SYSENG_DB_KEY_NUMBERS)
+key_numbers_file = os.getenv("SYSENG_DB_KEY_NUMBERS",
+                             os.path.join(os.path.dirname(
+                                 os.path.abspath(__file__)),
+                                 "key_numbers.txt"))
+key_numbers = read_key_numbers(key_numbers_file)
+
+# the registry of saved queries (scripts/saved_queries.json, or the file
+# named by SYSENG_DB_SAVED_QUERIES); the optical system page runs the search
+# saved as optical_system_<element>
+saved_queries_file = os.getenv("SYSENG_DB_SAVED_QUERIES",
+                               os.path.join(os.path.dirname(
+                                   os.path.dirname(os.path.abspath(__file__))),
+                                   "scripts", "saved_queries.json"))
+saved_queries = read_saved_queries(saved_queries_file)
+
+
+def _split_xml_list(form):
+    """
+    Return the list of .xml files typed, comma-separated, into the xml_list
+    field of form (None if there are none)
+    """
+    xml_list = [str(ww.lstrip().rstrip()) for ww in
+                form.get('xml_list', '').split(',')]
+    if len(xml_list)==1 and xml_list[0]=='':
+        return None
+    return xml_list
+
+
+def list_names_page(form):
+    name_list = []
+    list_of_versions = yield Query(get_table_names, db_name)
+    model_version = None
+    error_message = None
+    if form is not None:
+        if 'version' not in form:
+            error_message = "You must specify a model version to query."
+        else:
+            model_version = form.get('version')
+
+            try:
+                name_list = yield Query(get_parameter_names, db_name,
+                                        model_version)
+            except (sqlite3.OperationalError, RuntimeError), w:
+                error_message = w.message
+                name_list = []
+
+            desired_data = form.getlist('desired_parameters')
+            if len(desired_data)>0:
+                result_param_list = yield Query(name_query, db_name,
+                                                model_version,
+                                                [str(ww) for ww in desired_data])
+
+                yield Render("keyword_search_form.html",
+                             dict(input_list=result_param_list,
+                                  keyword_list=[],
+                                  model_version=model_version,
+                                  xml_list=[],
+                                  available_versions=list_of_versions,
+                                  error_message=error_message))
+
+    yield Render("parameter_name_search_form.html",
+                 dict(model_version=model_version,
+                      input_list=name_list,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def list_xml_files_page(form):
+    name_list = []
+    list_of_versions = yield Query(get_table_names, db_name)
+    model_version = None
+    error_message = None
+    if form is not None:
+        if 'version' not in form:
+            error_message = "You must specify a model version to query."
+        else:
+            model_version = form.get('version')
+
+            try:
+                name_list = yield Query(get_xml_files, db_name, model_version)
+            except (sqlite3.OperationalError, RuntimeError), w:
+                error_message = w.message
+                name_list = []
+
+    yield Render("xml_file_search_form.html",
+                 dict(model_version=model_version,
+                      input_list=name_list,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def key_numbers_page(form):
+    model_version = None
+    error_message = None
+    param_list = []
+    list_of_versions = yield Query(get_table_names, db_name)
+    if form is not None:
+        if 'version' not in form:
+            error_message = "You must specify a model version to query."
+        else:
+            model_version = str(form.get('version'))
+
+            try:
+                try:
+                    param_list = yield Query(saved_query, db_name,
+                                             model_version, 'key_numbers',
+                                             definition={'key_numbers':
+                                                         key_numbers})
+                except RuntimeError:
+                    # the version was loaded without the saved queries, or
+                    # the key numbers have changed since it was loaded
+                    param_list = yield Query(key_numbers_query, db_name,
+                                             model_version, key_numbers)
+            except sqlite3.OperationalError, w:
+                error_message = w.message
+                param_list = []
+
+    yield Render("key_numbers.html",
+                 dict(model_version=model_version,
+                      input_list=param_list,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def search_page(form):
+    result_param_list = []
+    list_of_versions = yield Query(get_table_names, db_name)
+    kwrd = None
+    model_version = None
+    error_message = None
+    xml_list = None
+    search_mode = 'substring'
+    if form is not None:
+        if 'version' not in form:
+            error_message = "You must specify a model version to query."
+        else:
+            model_version = form.get('version')
+            search_mode = str(form.get('mode', 'substring'))
+
+            if search_mode == 'query':
+                # the query language has its own syntax; pass it on whole
+                kwrd = [form.get('keyword', '')]
+            else:
+                kwrd = [str(ww) for ww in
+                        form.get('keyword', '').replace(' ','').split(',')]
+            xml_list = _split_xml_list(form)
+
+            try:
+                if search_mode == 'query':
+                    result_param_list = yield Query(search_query, db_name,
+                                                    model_version, kwrd[0],
+                                                    xml_list=xml_list)
+                else:
+                    result_param_list = yield Query(keyword_query, db_name,
+                                                    model_version, kwrd,
+                                                    xml_list=xml_list,
+                                                    mode=search_mode)
+            except sqlite3.OperationalError, w:
+                error_message = w.message
+                result_param_list = []
+            except RuntimeError, w:
+                error_message = w.message
+                result_param_list = []
+
+    yield Render("keyword_search_form.html",
+                 dict(input_list=result_param_list,
+                      keyword_list=kwrd,
+                      model_version=model_version,
+                      xml_list=xml_list,
+                      search_mode=search_mode,
+                      show_snippets=(search_mode in ('fulltext', 'token')),
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def optical_system_page(form):
+    result_param_list = []
+    title = None
+    model_version = None
+    error_message = None
+    list_of_versions = yield Query(get_table_names, db_name)
+    if form is not None:
+        if 'version' not in form:
+            error_message = "You must specify a model version to browse."
+        else:
+            model_version = str(form.get('version'))
+
+            title = str(form.get('element', ''))
+            name = 'optical_system_' + title
+            definition = saved_queries.get(name)
+            try:
+                if definition is None:
+                    raise RuntimeError("%s is not an element of the optical "
+                                       "system" % title)
+                try:
+                    result_param_list = yield Query(saved_query, db_name,
+                                                    model_version, name,
+                                                    definition=definition)
+                except RuntimeError:
+                    # the version was loaded without the saved queries, or
+                    # the search has changed since it was loaded
+                    result_param_list = yield Query(search_query, db_name,
+                                                    model_version,
+                                                    definition['search'],
+                                                    xml_list=definition.get(
+                                                        'xml_list'))
+            except (sqlite3.OperationalError, RuntimeError), w:
+                error_message = w.message
+                result_param_list = []
+
+    yield Render("optical_system.html",
+                 dict(input_list=result_param_list, title=title,
+                      model_version=model_version,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def diff_page(form):
+    diff = None
+    list_of_versions = yield Query(get_table_names, db_name)
+    old_version = None
+    new_version = None
+    error_message = None
+    xml_list = None
+    if form is not None:
+        if 'old_version' not in form or 'new_version' not in form:
+            error_message = "You must specify two model versions to compare."
+        else:
+            old_version = str(form.get('old_version'))
+            new_version = str(form.get('new_version'))
+
+            xml_list = _split_xml_list(form)
+
+            try:
+                diff = yield Query(diff_versions, db_name, old_version,
+                                   new_version, xml_list=xml_list)
+            except sqlite3.OperationalError, w:
+                error_message = w.message
+            except RuntimeError, w:
+                error_message = w.message
+
+    yield Render("version_diff.html",
+                 dict(diff=diff,
+                      old_version=old_version,
+                      new_version=new_version,
+                      xml_list=xml_list,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
+
+
+def _mark_changes(param_list):
+    """
+    Pair each of the VersionedParameters in param_list (ordered by name,
+    source and version) with True if it differs from the previous version
+    of the same Parameter
+    """
+    output = []
+    previous = None
+    for param in param_list:
+        state = (param.units, param.doc, param.values['defaultValue'],
+                 param.values['upperValue'], param.values['lowerValue'])
+        changed = previous is not None \
+                  and previous[0] == (param.name, param.source) \
+                  and previous[1] != state
+        output.append((param, changed))
+        previous = ((param.name, param.source), state)
+    return output
+
+
+def history_page(form):
+    history = None
+    list_of_versions = yield Query(get_table_names, db_name)
+    versions = list_of_versions
+    names = ''
+    by_keyword = False
+    error_message = None
+    if form is not None:
+        versions = [str(ww) for ww in form.getlist('versions')]
+        names = form.get('names', '')
+        by_keyword = 'by_keyword' in form
+        name_list = [str(ww.lstrip().rstrip()) for ww in names.split(',')
+                     if len(ww.strip()) > 0]
+
+        if len(versions) == 0:
+            error_message = "You must specify at least one model version."
+        elif len(name_list) == 0:
+            error_message = "You must specify at least one parameter."
+        else:
+            try:
+                if by_keyword:
+                    param_list = yield Query(keyword_query_versions, db_name,
+                                             versions, name_list)
+                else:
+                    param_list = yield Query(name_query_versions, db_name,
+                                             versions, name_list)
+                history = _mark_changes(param_list)
+            except sqlite3.OperationalError, w:
+                error_message = w.message
+            except RuntimeError, w:
+                error_message = w.message
+
+    yield Render("version_history.html",
+                 dict(history=history,
+                      names=names,
+                      by_keyword=by_keyword,
+                      versions=versions,
+                      available_versions=list_of_versions,
+                      error_message=error_message))
@@ -0,0 +1,161 @@
+"""
+Native Tornado handlers for the pages of the web interface that query the
+database.  The queries run on the worker threads of the asynchronous query
+functions in lsst.syseng_db (see ParameterDB_async), so a slow query only
+holds up the request that made it; the IOLoop keeps serving every other
+client in the meantime.  The pages are rendered from the same templates as
+the Flask application in syseng_db_web.py, which still serves the pages that
+do not touch the database, and both servers share the code of each page
+(syseng_db_pages.py): only the way the queries are run differs.
+
+Start the server with
+
+    python prototype_tornado_server.py
+"""
+
+import os
+import sys
+
+from jinja2 import Environment, FileSystemLoader
+from tornado import gen
+from tornado.web import Application, RequestHandler, FallbackHandler
+from tornado.wsgi import WSGIContainer
+
+from lsst.syseng_db import get_table_names, get_table_names_async
+from lsst.syseng_db import get_parameter_names, get_parameter_names_async
+from lsst.syseng_db import get_xml_files, get_xml_files_async
+from lsst.syseng_db import keyword_query, keyword_query_async
+from lsst.syseng_db import name_query, name_query_async
+from lsst.syseng_db import diff_versions, diff_versions_async
+from lsst.syseng_db import keyword_query_versions, keyword_query_versions_async
+from lsst.syseng_db import name_query_versions, name_query_versions_async
+from lsst.syseng_db import search_query, search_query_async
+from lsst.syseng_db import key_numbers_query, key_numbers_query_async
+from lsst.syseng_db import saved_query, saved_query_async
+
+from syseng_db_web import app
+from syseng_db_pages import Render
+from syseng_db_pages import list_names_page, list_xml_files_page
+from syseng_db_pages import key_numbers_page, search_page
+from syseng_db_pages import optical_system_page, diff_page, history_page
+
+web_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Flask escapes the values rendered into .html templates, so this does too
+_templates = Environment(loader=FileSystemLoader(os.path.join(web_dir,
+                                                              "templates")),
+                         autoescape=True)
+
+# the asynchronous version of each query function the pages ask for
+_async_functions = {get_table_names: get_table_names_async,
+                    get_parameter_names: get_parameter_names_async,
+                    get_xml_files: get_xml_files_async,
+                    keyword_query: keyword_query_async,
+                    name_query: name_query_async,
+                    diff_versions: diff_versions_async,
+                    keyword_query_versions: keyword_query_versions_async,
+                    name_query_versions: name_query_versions_async,
+                    search_query: search_query_async,
+                    key_numbers_query: key_numbers_query_async,
+                    saved_query: saved_query_async}
+
+
+class _BodyForm(object):
+    """
+    The body arguments of a Tornado request, read like Flask's request.form
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def get(self, name, default=None):
+        return self.handler.get_body_argument(name, default)
+
+    def getlist(self, name):
+        return self.handler.get_body_arguments(name)
+
+    def __contains__(self, name):
+        return self.handler.get_body_argument(name, None) is not None
+
+
+class QueryHandler(RequestHandler):
+    """
+    Base class of the handlers: GET shows the page's empty form and POST
+    runs the query and shows its results.  Subclasses set page to one of
+    the page functions of syseng_db_pages (as a staticmethod).
+    """
+
+    page = None
+
+    @gen.coroutine
+    def render_page(self, form):
+        """
+        Run the page, running each query it asks for on the worker threads,
+        and write the template it ends with
+        """
+        page = self.page(form)
+        step = next(page)
+        while not isinstance(step, Render):
+            try:
+                result = yield _async_functions[step.function](*step.args,
+                                                                **step.kwargs)
+            except Exception:
+                step = page.throw(*sys.exc_info())
+            else:
+                step = page.send(result)
+        page.close()
+        self.write(_templates.get_template(step.template).render(**step.context))
+
+    @gen.coroutine
+    def get(self):
+        yield self.render_page(None)
+
+    @gen.coroutine
+    def post(self):
+        yield self.render_page(_BodyForm(self))
+
+
+class ListNamesHandler(QueryHandler):
+    page = staticmethod(list_names_page)
+
+
+class ListXmlFilesHandler(QueryHandler):
+    page = staticmethod(list_xml_files_page)
+
+
+class KeyNumbersHandler(QueryHandler):
+    page = staticmethod(key_numbers_page)
+
+
+class SearchHandler(QueryHandler):
+    page = staticmethod(search_page)
+
+
+class OpticalSystemHandler(QueryHandler):
+    page = staticmethod(optical_system_page)
+
+
+class DiffHandler(QueryHandler):
+    page = staticmethod(diff_page)
+
+
+class HistoryHandler(QueryHandler):
+    page = staticmethod(history_page)
+
+
+def make_app():
+    """
+    Return the Tornado Application serving the web interface: the handlers
+    above for the pages that query the database, and the Flask application
+    for everything else
+    """
+    return Application([(r"/list-names", ListNamesHandler),
+                        (r"/list-xml-files", ListXmlFilesHandler),
+                        (r"/key_numbers", KeyNumbersHandler),
+                        (r"/search", SearchHandler),
+                        (r"/optical_system", OpticalSystemHandler),
+                        (r"/diff", DiffHandler),
+                        (r"/history", HistoryHandler),
+                        (r".*", FallbackHandler,
+                         dict(fallback=WSGIContainer(app)))],
+                       static_path=os.path.join(web_dir, "static"))
@@ -1,209 +1,83 @@
 import os
-import sqlite3
-from collections import OrderedDict
 from flask import Flask, render_template, request
 
-from lsst.syseng_db import syseng_db_config, get_table_names
-from lsst.syseng_db import keyword_query, name_query, get_parameter_names
-from lsst.syseng_db import get_xml_files
+from lsst.syseng_db import close_connections, enable_result_cache
+from lsst.syseng_db import serve_from_memory
+
+from syseng_db_pages import db_name, run_page
+from syseng_db_pages import list_names_page, list_xml_files_page
+from syseng_db_pages import key_numbers_page, search_page
+from syseng_db_pages import optical_system_page, diff_page, history_page
 
 app = Flask(__name__)
 
+# pages such as /key_numbers run the same queries on every visit; cached
+# results are dropped as soon as the database is rebuilt
+enable_result_cache()
+
+# with SYSENG_DB_MEMORY_VERSIONS set to 'all' or a comma-separated list of
+# model versions, the queries are served from an in-memory copy of those
+# versions, reloaded whenever the database is rebuilt
+_memory_versions = os.getenv("SYSENG_DB_MEMORY_VERSIONS")
+if _memory_versions is not None and os.path.exists(db_name):
+    if _memory_versions.strip() == 'all':
+        serve_from_memory(db_name)
+    else:
+        serve_from_memory(db_name, versions=[str(ww.strip()) for ww in
+                                             _memory_versions.split(',')
+                                             if len(ww.strip()) > 0])
+
+
+def _form():
+    """
+    Return the submitted form of the request, or None for GET
+    """
+    if request.method == 'POST':
+        return request.form
+    return None
+
 
-db_name = os.path.join(syseng_db_config["db_dir"], syseng_db_config["db_name"])
+def _render(page):
+    """
+    Run page (see syseng_db_pages) and render the template it ends with
+    """
+    step = run_page(page)
+    return render_template(step.template, **step.context)
 
 
 @app.route("/list-names", methods=['POST', 'GET'])
 def list_param_names():
-    name_list = []
-    list_of_versions = get_table_names(db_name)
-    model_version = None
-    error_message = None
-    if request.method == 'POST':
-        if 'version' not in request.form:
-            error_message = "You must specify a model version to query."
-        else:
-
-            model_version = request.form['version']
-
-            try:
-                name_list = get_parameter_names(db_name, model_version)
-            except sqlite3.OperationalError, w:
-                error_message = w.message
-                name_list = []
-
-            desired_data = request.form.getlist('desired_parameters')
-            if len(desired_data)>0:
-                result_param_list = name_query(db_name, model_version,
-                                               [str(ww) for ww in desired_data])
-
-                return render_template("keyword_search_form.html",
-                                       input_list=result_param_list,
-                                       keyword_list=[],
-                                       model_version=model_version,
-                                       xml_list=[],
-                                       available_versions=list_of_versions,
-                                       error_message=error_message)
-
-    return render_template("parameter_name_search_form.html",
-                           model_version=model_version,
-                           input_list=name_list,
-                           available_versions=list_of_versions,
-                           error_message=error_message)
+    return _render(list_names_page(_form()))
 
 
 @app.route("/list-xml-files", methods=['POST', 'GET'])
 def list_xml_files():
-    name_list = []
-    list_of_versions = get_table_names(db_name)
-    model_version = None
-    error_message = None
-    if request.method == 'POST':
-        if 'version' not in request.form:
-            error_message = "You must specify a model version to query."
-
-        else:
-            model_version = request.form['version']
-
-            try:
-                name_list = get_xml_files(db_name, model_version)
-            except sqlite3.OperationalError, w:
-                error_message = w.message
-                name_list = []
-
-    return render_template("xml_file_search_form.html",
-                           model_version=model_version,
-                           input_list=name_list,
-                           available_versions=list_of_versions,
-                           error_message=error_message)
+    return _render(list_xml_files_page(_form()))
 
 
 @app.route("/key_numbers", methods=['POST', 'GET'])
 def generate_key_numbers():
-    model_version = None
-    error_message = None
-    param_list = []
-    list_of_versions = get_table_names(db_name)
-    if request.method == 'POST':
-        if 'version' not in request.form:
-            error_message = "You must specify a model version to query."
-        else:
-            model_version = str(request.form['version'])
-
-            param_name_map = OrderedDict()
-            param_name_map['etendueRec'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['FieldOfView'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['m1OuterCa'] = 'Telescope Requirements_v1.xml'
-            param_name_map['effAperture'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['minPixelSize'] = 'Science_Requirements_v1.xml'
-            param_name_map['pixelSize'] = 'OSS_Detail_OpticalSystem_v1.xml'
-            param_name_map['visitExpTime'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['nVisitExp'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['slewSettle_time'] = 'Telescope Requirements_v1.xml'
-            param_name_map['nCalibExpDay'] = 'OSS_Detail_ScienceBulkData_v1.xml'
-            param_name_map['PixelPitch'] = 'Camera Requirements_v1.xml'
-            param_name_map['camDynamicRange'] = 'Camera Requirements_v1.xml'
-            param_name_map['DRT1'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['drProcessingPeriod'] = 'Data Management Requirements_v1.xml'
-            param_name_map['uNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['uNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['gNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['gNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['rNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['rNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['iNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['iNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['zNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['zNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['yNomRed_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['yNomBlue_50'] = 'Camera Requirements_v1.xml'
-            param_name_map['nAlertNightAvg'] = 'OSS_Issues.xml'
-            param_name_map['OTT1'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['Asky'] = 'Science_Based_System_Requirements_v1.xml'
-            param_name_map['Nv1Sum'] = 'Science_Based_System_Requirements_v1.xml'
-
-            for name in param_name_map:
-                try:
-                    results = keyword_query(db_name, model_version, [name],
-                                            xml_list=[param_name_map[name]])
-
-                except sqlite3.OperationalError, w:
-                    error_message = w.error_message
-                    results = []
-
-
-                for pp in results:
-                    if pp.name==name:
-                        param_list.append(pp)
-
-    return render_template("key_numbers.html",
-                           model_version=model_version,
-                           input_list=param_list,
-                           available_versions=list_of_versions,
-                           error_message=error_message)
-
+    return _render(key_numbers_page(_form()))
 
 
 @app.route("/search", methods=['POST', 'GET'])
 def search_params():
-    result_param_list = []
-    list_of_versions = get_table_names(db_name)
-    kwrd = None
-    model_version = None
-    error_message = None
-    xml_list = None
-    if request.method == 'POST':
-        if 'version' not in request.form:
-            error_message = "You must specify a model version to query."
-        else:
-            model_version = request.form['version']
-
-            kwrd = [str(ww) for ww in request.form['keyword'].replace(' ','').split(',')]
-            xml_list = [str(ww.lstrip().rstrip()) for ww in request.form['xml_list'].split(',')]
-
-            if len(xml_list)==1 and xml_list[0]=='':
-                xml_list = None
-
-            try:
-                result_param_list = keyword_query(db_name, model_version, kwrd,
-                                              xml_list=xml_list)
-            except sqlite3.OperationalError, w:
-                error_message = w.message
-                result_param_list = []
-
-    return render_template("keyword_search_form.html",
-                           input_list=result_param_list,
-                           keyword_list=kwrd,
-                           model_version=model_version,
-                           xml_list=xml_list,
-                           available_versions=list_of_versions,
-                           error_message=error_message)
+    return _render(search_page(_form()))
 
 
 @app.route("/optical_system", methods=['POST', 'GET'])
 def get_optical_system():
+    return _render(optical_system_page(_form()))
 
-    result_param_list = []
-    title = None
-    model_version = None
-    error_message = None
-    list_of_versions = get_table_names(db_name)
-    xml_list = ['OSS_Detail_OpticalSystem_v1.xml', 'Telescope Requirements_v1.xml',
-                 'Camera Requirements_v1.xml']
-    if request.method == 'POST':
-        if 'version' not in request.form:
-            error_message = "You must specify a model version to browse."
-        else:
-            model_version = str(request.form['version'])
 
-            kwrd = [str(request.form['element'])]
-            title = kwrd[0]
-            result_param_list = keyword_query(db_name, 'v_0_0', kwrd, xml_list=xml_list)
+@app.route("/diff", methods=['POST', 'GET'])
+def compare_versions():
+    return _render(diff_page(_form()))
+
 
-    return render_template("optical_system.html", input_list=result_param_list, title=title,
-                           model_version=model_version,
-                           available_versions=list_of_versions,
-                           error_message=error_message)
+@app.route("/history", methods=['POST', 'GET'])
+def parameter_history():
+    return _render(history_page(_form()))
 
 
 @app.route("/")
@@ -211,4 +85,9 @@ def index():
     return render_template("main.html")
 
 if __name__ == "__main__":
-    app.run()
+    # each request thread checks out its own database connection, so
+    # concurrent requests are served in parallel
+    try:
+        app.run(threaded=True)
+    finally:
+        close_connections()